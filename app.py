@@ -1,10 +1,13 @@
 import streamlit as st
+import importlib
 import sys
 import os
-import plotly.express as px
+import threading
 
 sys.path.append(os.path.dirname(__file__))
 
+from utils.instrumentation import finish_rerun, show_admin_panel, start_rerun, timed
+
 # Important: st.set_page_config must be the first Streamlit command
 st.set_page_config(
     page_title="Manhattan Real Estate Sales Analysis",
@@ -12,8 +15,39 @@ st.set_page_config(
     menu_items=None
 )
 
-from modules import _Home, _Pricechanges, _Health, _PriceMap, _DataOverview, _Introduction
-from modules._Demographics.main import show as _Demographics_show
+# Page modules are imported the first time someone opens them, so a cold worker
+# does not pay for geopandas, shapely, scipy and plotly just to draw Home
+PAGES = {
+    "home": "modules._Home",
+    "Introduction": "modules._Introduction",
+    "DataOverview": "modules._DataOverview",
+    "PriceMap": "modules._PriceMap",
+    "Pricechanges": "modules._Pricechanges",
+    "Demographics": "modules._Demographics.main",
+    "Health": "modules._Health",
+}
+
+# Set WARM_UP_PAGES=0 to skip importing the remaining pages in the background
+WARM_UP_PAGES = os.environ.get("WARM_UP_PAGES", "1") != "0"
+
+def load_page(page):
+    """Import a page's module on first use and return its show() function"""
+    return importlib.import_module(PAGES[page]).show
+
+def _import_pages():
+    for module_name in PAGES.values():
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            # The page will raise again, visibly, when it is opened
+            pass
+
+@st.cache_resource(show_spinner=False)
+def start_page_warmup():
+    """Import every page module on a daemon thread, once per process"""
+    thread = threading.Thread(target=_import_pages, name="page-warmup", daemon=True)
+    thread.start()
+    return thread
 
 def create_sidebar():
     with st.sidebar:
@@ -47,17 +81,17 @@ if 'page' not in st.session_state:
 
 create_sidebar()
 
-if st.session_state.page == "home":
-    _Home.show()
-elif st.session_state.page == "Introduction":
-    _Introduction.show()
-elif st.session_state.page == "DataOverview":
-    _DataOverview.show()
-elif st.session_state.page == "PriceMap":
-    _PriceMap.show()
-elif st.session_state.page == "Pricechanges":
-    _Pricechanges.show()
-elif st.session_state.page == "Demographics":
-    _Demographics_show()
-elif st.session_state.page == "Health":
-    _Health.show()
\ No newline at end of file
+# Each rerun's timings and cache hits are logged as one JSON line; add ?admin=1
+# to the URL to see them in the sidebar
+start_rerun(st.session_state.page)
+try:
+    with timed(f"page.{st.session_state.page}"):
+        load_page(st.session_state.page)()
+finally:
+    rerun_summary = finish_rerun()
+
+show_admin_panel(rerun_summary)
+
+# The current page has been drawn; preload the others while the user reads it
+if WARM_UP_PAGES:
+    start_page_warmup()
\ No newline at end of file
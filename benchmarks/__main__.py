@@ -0,0 +1,58 @@
+# benchmarks/__main__.py
+"""Headless benchmarks for the data paths behind every page.
+
+Run from the repository root:
+
+    python -m benchmarks                      # compare against baseline.json
+    python -m benchmarks --scales 1 10        # skip the 100x cases
+    python -m benchmarks --filter cube        # only cases whose name matches
+    python -m benchmarks --update-baseline    # record this machine's numbers
+
+Exits with status 1 when any case regressed past ``--threshold``.
+"""
+import argparse
+import sys
+import warnings
+
+from streamlit import config, logger
+
+# Without a running app Streamlit logs a "no runtime" notice for every cached
+# call. Parsing the config resets the log level, so parse it first.
+config.get_config_options()
+logger.set_log_level("error")
+warnings.filterwarnings("ignore")
+
+from benchmarks import cases  # noqa: E402,F401  (registers the cases)
+from benchmarks.harness import (  # noqa: E402
+    BASELINE_PATH, DEFAULT_THRESHOLD, compare, format_report, load_baseline, run_cases, save_baseline,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (the fastest is kept)")
+    parser.add_argument("--scales", type=int, nargs="+", help="only run these scale factors")
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown/growth over baseline, as a fraction")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run_cases(repeat=args.repeat, scales=args.scales, name_filter=args.filter)
+
+    if args.update_baseline:
+        baseline = load_baseline(args.baseline)
+        baseline.update(results)
+        save_baseline(baseline, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    rows = compare(results, load_baseline(args.baseline), args.threshold)
+    print(format_report(rows))
+    return 1 if any(row[-1] == 'REGRESSION' for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# benchmarks/cases.py
+import functools
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import case
+from utils.acs_loader import load_acs_indicators
+from utils.filter_index import build_filter_index, query_filter_index
+from utils.geometry import load_neighborhood_geojson_levels, load_neighborhood_geometries
+from utils.ingest import ingest_workbook
+from utils.neighborhoods import CONSOLIDATED_KEYWORDS, attach_zip_info, classify_neighborhoods
+from utils.price_cube import aggregate_sales, build_price_cube, load_price_cube
+from utils.sales_store import read_sales_year, sales_workbook_path
+from utils.sketch import merge_sketches, sketch_quantile, sketch_values
+from utils.spatial import access_metrics, build_point_index, hexbin_levels, join_points
+from utils.table import sorted_positions
+
+SCALES = (1, 10, 100)
+
+
+@functools.lru_cache(maxsize=None)
+def scaled_sales(year, scale):
+    """``scale`` stacked copies of a year's sales; every copy after the first has
+    its prices jittered by a few percent so sorts and quantiles see distinct values"""
+    df = read_sales_year(year)
+    if scale == 1:
+        return df.reset_index(drop=True)
+
+    rng = np.random.default_rng(scale)
+    copies = [df]
+    for _ in range(scale - 1):
+        copy = df.copy()
+        copy['sale_price'] = (copy['sale_price'] * rng.lognormal(0, 0.05, len(copy))).round()
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+# Loaders over the bundled datasets/
+
+@case('read_sales_year[2023]')
+def _(scale):
+    return lambda: read_sales_year(2023)
+
+
+@case('ingest_workbook[2015 .xls, cold]')
+def _(scale):
+    def run():
+        cache_dir = tempfile.mkdtemp()
+        try:
+            ingest_workbook(sales_workbook_path(2015), cache_dir)
+        finally:
+            shutil.rmtree(cache_dir)
+    return run
+
+
+@case('load_acs_indicators')
+def _(scale):
+    return load_acs_indicators
+
+
+@case('load_neighborhood_geometries')
+def _(scale):
+    return lambda: load_neighborhood_geometries('zip')
+
+
+@case('load_neighborhood_geojson_levels')
+def _(scale):
+    return lambda: load_neighborhood_geojson_levels('zip')
+
+
+@case('build_price_cube[cold]')
+def _(scale):
+    def run():
+        cube_dir = tempfile.mkdtemp()
+        try:
+            build_price_cube(cube_dir=cube_dir)
+        finally:
+            shutil.rmtree(cube_dir)
+    return run
+
+
+@case('load_price_cube[partitions on disk]')
+def _(scale):
+    build_price_cube()
+    return load_price_cube
+
+
+@case('Pricechanges.load_yearly_data')
+def _(scale):
+    from modules._Pricechanges import load_yearly_data
+    build_price_cube()
+    return load_yearly_data
+
+
+@case('Health.load_health_facilities')
+def _(scale):
+    from modules._Health import load_health_facilities
+    return load_health_facilities
+
+
+@case('Health.load_geospatial_data')
+def _(scale):
+    from modules._Health import load_geospatial_data
+    return load_geospatial_data
+
+
+# Aggregations and filters over 2023 sales, stacked 1x/10x/100x
+
+@case('aggregate_sales[2023]', scales=SCALES)
+def _(scale):
+    df = scaled_sales(2023, scale)
+    return lambda: aggregate_sales(df, 2023)
+
+
+@case('classify_neighborhoods', scales=SCALES)
+def _(scale):
+    names = scaled_sales(2023, scale)['neighborhood']
+    return lambda: classify_neighborhoods(names, CONSOLIDATED_KEYWORDS)
+
+
+@case('attach_zip_info', scales=SCALES)
+def _(scale):
+    df = scaled_sales(2023, scale)[['ZIP CODE', 'sale_price']]
+    return lambda: attach_zip_info(df, 'zip')
+
+
+@case('sorted_positions[ADDRESS]', scales=SCALES)
+def _(scale):
+    df = scaled_sales(2023, scale)
+    return lambda: sorted_positions(df, f"bench_{scale}", 'ADDRESS', False)
+
+
+@case('build_filter_index', scales=SCALES)
+def _(scale):
+    df = scaled_sales(2023, scale)
+    return lambda: build_filter_index(df, 'sale_price', 'neighborhood')
+
+
+@case('query_filter_index[narrow]', scales=SCALES)
+def _(scale):
+    df = scaled_sales(2023, scale)
+    index = build_filter_index(df, 'sale_price', 'neighborhood')
+    names = list(df['neighborhood'].dropna().unique()[:3])
+
+    def run():
+        for _ in range(100):
+            query_filter_index(index, 1000000, 1500000, names)
+    return run
+
+
+@case('sketch_values+quantile', scales=SCALES)
+def _(scale):
+    prices = scaled_sales(2023, scale)['sale_price'].to_numpy()
+    chunks = np.array_split(prices, 50)
+
+    def run():
+        sketch_quantile(merge_sketches([sketch_values(chunk) for chunk in chunks]), 0.5)
+    return run
+
+
+@functools.lru_cache(maxsize=None)
+def jittered_facilities(scale):
+    """``scale`` copies of the Manhattan facilities' coordinates, each moved by up to ~50 m"""
+    from modules._Health import load_health_facilities
+    facilities = load_health_facilities()
+    rng = np.random.default_rng(scale)
+    lon = np.repeat(facilities['LONGITUDE'].to_numpy(), scale)
+    lat = np.repeat(facilities['LATITUDE'].to_numpy(), scale)
+    return pd.DataFrame({'lon': lon + rng.uniform(-0.0005, 0.0005, len(lon)),
+                         'lat': lat + rng.uniform(-0.0005, 0.0005, len(lat))})
+
+
+@case('join_points[facility coordinates]', scales=(1, 100, 1000))
+def _(scale):
+    points = jittered_facilities(scale)
+    return lambda: join_points(points, 'lon', 'lat')
+
+
+@case('hexbin_levels[facility coordinates]', scales=(1, 100, 1000))
+def _(scale):
+    points = jittered_facilities(scale)
+    return lambda: hexbin_levels(points['lon'], points['lat'])
+
+
+@case('access_metrics[sales at ZIP centroids]', scales=SCALES)
+def _(scale):
+    from modules._Health import load_health_facilities
+    facilities = load_health_facilities()
+    sales = attach_zip_info(scaled_sales(2023, scale)[['ZIP CODE']], columns=('latitude', 'longitude'))
+
+    def run():
+        index = build_point_index(facilities['LONGITUDE'], facilities['LATITUDE'])
+        access_metrics(index, sales['longitude'], sales['latitude'])
+    return run
+
+
+@case('PriceMap.create_price_choropleth[build]')
+def _(scale):
+    from modules._PriceMap import create_price_choropleth, load_neighborhood_stats
+    return lambda: create_price_choropleth(load_neighborhood_stats("2023"), "2023")
@@ -0,0 +1,136 @@
+# benchmarks/harness.py
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.figure_cache import figure_cache
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# A case only counts as a regression when it is both this much slower (or
+# bigger) than the baseline and slower by more than the noise floor
+DEFAULT_THRESHOLD = 0.5
+MIN_SECONDS_DELTA = 0.02
+MIN_MB_DELTA = 1.0
+
+CASES = []
+
+
+def case(name, scales=(1,)):
+    """Register a benchmark. The decorated function takes a scale factor, does
+    any setup that should not be timed, and returns the zero-argument callable
+    to time."""
+    def register(setup):
+        for scale in scales:
+            CASES.append((name, scale, setup))
+        return setup
+    return register
+
+
+def clear_streamlit_caches():
+    # Every timed call starts cold, as on a freshly started worker
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    figure_cache.clear()
+
+
+def measure(func, repeat):
+    """Best wall time over ``repeat`` cold runs, then peak traced memory of one more.
+
+    The fastest run is the one least disturbed by the rest of the machine, so
+    it is the most repeatable number to compare against a baseline.
+    """
+    timings = []
+    for _ in range(repeat):
+        clear_streamlit_caches()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocation-heavy code a lot, so memory gets its own run.
+    # numpy and pandas buffers are traced; pyarrow's own allocator is not.
+    clear_streamlit_caches()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_mb': peak / 2 ** 20}
+
+
+def case_key(name, scale):
+    return f"{name}@{scale}x"
+
+
+def run_cases(repeat=3, scales=None, name_filter=None, log=print):
+    results = {}
+    for name, scale, setup in CASES:
+        if scales is not None and scale not in scales:
+            continue
+        if name_filter and name_filter not in name:
+            continue
+        func = setup(scale)
+        results[case_key(name, scale)] = measure(func, repeat)
+        log(f"  {case_key(name, scale):<44} {results[case_key(name, scale)]['seconds']:9.4f}s")
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('results', {})
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    payload = {
+        'machine': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Rows of (key, seconds, baseline seconds, peak MB, baseline MB, status)"""
+    rows = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append((key, result['seconds'], None, result['peak_mb'], None, 'new'))
+            continue
+
+        slower = (result['seconds'] > base['seconds'] * (1 + threshold)
+                  and result['seconds'] - base['seconds'] > MIN_SECONDS_DELTA)
+        bigger = (result['peak_mb'] > base['peak_mb'] * (1 + threshold)
+                  and result['peak_mb'] - base['peak_mb'] > MIN_MB_DELTA)
+        status = 'REGRESSION' if slower or bigger else 'ok'
+        rows.append((key, result['seconds'], base['seconds'], result['peak_mb'], base['peak_mb'], status))
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'case':<44} {'time':>9} {'baseline':>9} {'peak MB':>9} {'baseline':>9}  status"]
+    for key, seconds, base_seconds, peak, base_peak, status in rows:
+        base_s = f"{base_seconds:9.4f}" if base_seconds is not None else f"{'-':>9}"
+        base_m = f"{base_peak:9.1f}" if base_peak is not None else f"{'-':>9}"
+        lines.append(f"{key:<44} {seconds:9.4f} {base_s} {peak:9.1f} {base_m}  {status}")
+    return "\n".join(lines)
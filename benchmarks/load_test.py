@@ -0,0 +1,303 @@
+# benchmarks/load_test.py
+"""Concurrent-session load test against a local Streamlit server.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test                        # ramp 1, 2, 4, 8 sessions
+    python -m benchmarks.load_test --sessions 1 8 32 --loops 3
+    SALES_DIR=/tmp/sales-1m python -m benchmarks.load_test
+
+Starts ``streamlit run app.py`` on a free local port and drives it the way a
+browser does, over the app's websocket: every simulated analyst clicks through
+the sidebar pages and changes widgets on them. Latency is measured from
+sending a rerun until the server reports the script finished; memory is the
+resident size of the server process. Nothing leaves the machine.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import psutil
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+# One pass of a session: the sidebar button to click, then the widgets on that
+# page (element type, label) to set to a random value, one rerun each
+SCENARIO = [
+    ("Data Overview", [("radio", "Select Visualization"), ("selectbox", "Sort By"), ("checkbox", "Sort Ascending")]),
+    ("Price Map", [("selectbox", "Select Year")]),
+    ("Price Change", [("multiselect", "Select Neighborhoods"), ("radio", "Price Metric"),
+                      ("selectbox", "Select First Year")]),
+    ("Demographics", [("selectbox", "Select Year for Analysis")]),
+    ("Health", [("radio", "Hexagon Size:"), ("multiselect", "Select Neighborhoods:"),
+                 ("multiselect", "Facility Types:")]),
+    ("Home", []),
+]
+
+SIDEBAR = 1          # first delta_path entry of elements in st.sidebar
+PERCENTILES = [50, 95, 99]
+MEMORY_SAMPLE_SECONDS = 0.25
+
+
+class Session:
+    """One browser tab: a websocket plus the widget values it would send back"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = {}
+        self.values = {}
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, subprotocols=["streamlit"])
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def rerun(self, trigger=None):
+        """Rerun the script with the current widget values; returns (seconds, error messages)"""
+        msg = BackMsg()
+        states = list(self.values.values())
+        if trigger is not None:
+            states.append(WidgetState(id=trigger, trigger_value=True))
+        msg.rerun_script.widget_states.widgets.extend(states)
+
+        start = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        widgets, errors = await asyncio.wait_for(self._read_run(), self.timeout)
+        seconds = time.perf_counter() - start
+
+        # The browser only reports widgets that are still on the page
+        self.widgets = widgets
+        ids = {element.id for _, element in widgets.values()}
+        self.values = {key: state for key, state in self.values.items() if key in ids}
+        return seconds, errors
+
+    async def _read_run(self):
+        widgets, errors = {}, []
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise ConnectionError("server closed the websocket")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "script_finished":
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    errors.append("script failed to compile")
+                return widgets, errors
+            if kind != "delta" or msg.delta.WhichOneof("type") != "new_element":
+                continue
+
+            element_type = msg.delta.new_element.WhichOneof("type")
+            if element_type == "exception":
+                exception = msg.delta.new_element.exception
+                errors.append(f"{exception.type}: {exception.message}")
+                continue
+            element = getattr(msg.delta.new_element, element_type)
+            if getattr(element, "id", ""):
+                in_sidebar = msg.metadata.delta_path[0] == SIDEBAR
+                # Same-labelled widgets (one per tab) keep the first one drawn
+                widgets.setdefault((in_sidebar, element_type, getattr(element, "label", "")),
+                                   (element_type, element))
+
+    def click(self, label):
+        _, button = self.widgets[(True, "button", label)]
+        return self.rerun(trigger=button.id)
+
+    def change(self, element_type, label, rng):
+        """Set a widget on the page to a random value; None if it is not shown"""
+        found = self.widgets.get((False, element_type, label))
+        if found is None:
+            return None
+        _, element = found
+        state = WidgetState(id=element.id)
+        if element_type == "checkbox":
+            state.bool_value = rng.random() < 0.5
+        elif element_type == "multiselect":
+            count = rng.randint(1, min(3, len(element.options)))
+            state.int_array_value.data.extend(rng.sample(range(len(element.options)), count))
+        else:
+            state.int_value = rng.randrange(len(element.options))
+        self.values[element.id] = state
+        return self.rerun()
+
+
+async def run_session(url, loops, think, timeout, seed, record):
+    """Open the app and run the scenario ``loops`` times, recording (page, seconds, error messages)"""
+    rng = random.Random(seed)
+    session = Session(url, timeout)
+    await asyncio.sleep(rng.uniform(0, think))
+    try:
+        await session.connect()
+        record("Home", *await session.rerun())
+        for _ in range(loops):
+            for page, changes in SCENARIO:
+                await asyncio.sleep(rng.uniform(0, think))
+                record(page, *await session.click(page))
+                for element_type, label in changes:
+                    await asyncio.sleep(rng.uniform(0, think))
+                    rerun = session.change(element_type, label, rng)
+                    if rerun is not None:
+                        record(page, *await rerun)
+    except Exception as e:
+        record("(session)", float("nan"), [f"session {seed} failed: {type(e).__name__}: {e}"])
+    finally:
+        session.close()
+
+
+def server_rss(process):
+    """Resident memory of the server and any worker processes it started, in bytes"""
+    try:
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes)
+    except psutil.Error:
+        return 0
+
+
+async def sample_memory(process, samples):
+    while True:
+        samples.append(server_rss(process))
+        await asyncio.sleep(MEMORY_SAMPLE_SECONDS)
+
+
+async def run_level(url, process, sessions, loops, think, timeout):
+    """Run ``sessions`` concurrent sessions; returns the level's summary"""
+    records, samples = [], []
+
+    def record(page, seconds, errors):
+        records.append((page, seconds, errors))
+
+    sampler = asyncio.create_task(sample_memory(process, samples))
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(url, loops, think, timeout, seed, record)
+                           for seed in range(sessions)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    samples.append(server_rss(process))
+
+    pages = {}
+    for page, seconds, _ in records:
+        if page != "(session)":
+            pages.setdefault(page, []).append(seconds)
+    return {
+        'sessions': sessions,
+        'seconds': elapsed,
+        'reruns': sum(len(latencies) for latencies in pages.values()),
+        'errors': sum(len(errors) for _, _, errors in records),
+        'error_messages': sorted({error for _, _, errors in records for error in errors}),
+        'rss_peak_mb': max(samples) / 2 ** 20,
+        'rss_end_mb': samples[-1] / 2 ** 20,
+        'pages': {
+            page: dict(reruns=len(latencies),
+                       **{f"p{q}": float(np.percentile(latencies, q)) for q in PERCENTILES})
+            for page, latencies in pages.items()
+        },
+    }
+
+
+def format_level(level):
+    lines = [
+        f"{level['sessions']} concurrent sessions: {level['reruns']} reruns in {level['seconds']:.1f}s "
+        f"({level['reruns'] / level['seconds']:.1f}/s), {level['errors']} errors, "
+        f"server RSS peak {level['rss_peak_mb']:.0f} MB (end {level['rss_end_mb']:.0f} MB)",
+        f"  {'page':<16} {'reruns':>7}" + "".join(f" {f'p{q}':>8}" for q in PERCENTILES),
+    ]
+    for page, stats in level['pages'].items():
+        lines.append(f"  {page:<16} {stats['reruns']:>7}"
+                     + "".join(f" {stats[f'p{q}']:7.3f}s" for q in PERCENTILES))
+    for error in level['error_messages']:
+        lines.append(f"  error: {error}")
+    return "\n".join(lines)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, startup_timeout=60):
+    """``streamlit run app.py`` on ``port``, returned once it answers its health check"""
+    env = dict(os.environ)
+    # One JSON line per rerun would flood the console at this volume
+    env.setdefault("LOG_RERUNS", "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with status {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"streamlit did not start within {startup_timeout}s")
+
+
+async def run_load_test(args):
+    port = _free_port()
+    server = start_server(port)
+    process = psutil.Process(server.pid)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        print(f"Server started (pid {server.pid}), RSS {server_rss(process) / 2 ** 20:.0f} MB")
+        if not args.no_warmup:
+            # Fill the process-wide caches first so level 1 is not all cold starts
+            warm = await run_level(url, process, 1, 1, 0, args.timeout)
+            print(f"Warm-up: {warm['reruns']} reruns in {warm['seconds']:.1f}s, "
+                  f"{warm['errors']} errors, RSS {warm['rss_end_mb']:.0f} MB")
+
+        levels = []
+        for sessions in args.sessions:
+            level = await run_level(url, process, sessions, args.loops, args.think, args.timeout)
+            print(format_level(level))
+            levels.append(level)
+        return levels
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="concurrency levels to ramp through")
+    parser.add_argument("--loops", type=int, default=2, help="scenario passes per session")
+    parser.add_argument("--think", type=float, default=0.5,
+                        help="longest pause between actions, in seconds")
+    parser.add_argument("--timeout", type=float, default=120, help="longest a single rerun may take")
+    parser.add_argument("--no-warmup", action="store_true", help="start the ramp on cold caches")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    levels = asyncio.run(run_load_test(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(levels, f, indent=2)
+    return 1 if any(level['errors'] for level in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,145 +3,63 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 from utils.data_loader import load_data
+from utils.sales_store import sales_view, sales_workbook_path
+from utils.ingest import source_sha256
+from utils.export import EXPORT_FORMATS, export_rows, filter_fingerprint
+from utils.neighborhoods import CONSOLIDATED_KEYWORDS, classify_neighborhoods, zip_neighborhood_map
+from utils.price_cube import cube_stats, merged_sketch
+from utils.sketch import SKETCH_ALPHA, restrict_sketch, sketch_quantile
+from utils.table import paginated_table
+from utils.filter_index import build_filter_index, query_filter_index
+from utils.instrumentation import plotly_chart, timed, tracked_cache
 
-def show():
-    st.title("Manhattan Real Estate Sales Data Overview (2023)")
+@timed("DataOverview.approximate_median")
+def approximate_median(year, price_range, selected_neighborhoods):
+    """Median sale price for the current filters, merged from the price cube's sketches"""
+    # Cube cells are keyed by the workbook's own neighborhood names; pick the ones
+    # whose consolidated name (or the raw name, if unmatched) was selected
+    names = cube_stats(year, 'sales', 'over_10k')['neighborhood']
+    if selected_neighborhoods:
+        consolidated = classify_neighborhoods(names, CONSOLIDATED_KEYWORDS, keep_unmatched=True)
+        names = names[consolidated.isin(selected_neighborhoods)]
 
-    @st.cache_data
-    def load_sales_data():
-        file_path = "datasets/2023_manhattan.xlsx"
-        df = pd.read_excel(file_path)
-        # Basic data cleaning
-        df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce')
-        df = df[df['sale_price'] > 10000] 
-        
-        neighborhood_mapping = {
-            'UPPER EAST SIDE (59-79)': 'Upper East Side',
-            'UPPER EAST SIDE (79-96)': 'Upper East Side',
-            'UPPER EAST SIDE (96-110)': 'Upper East Side',
-            'ROOSEVELT ISLAND': 'Upper East Side',
-            'YORKVILLE': 'Upper East Side',
-            
-            'UPPER WEST SIDE (59-79)': 'Upper West Side', 
-            'UPPER WEST SIDE (79-96)': 'Upper West Side',
-            'UPPER WEST SIDE (96-116)': 'Upper West Side',
-            'MANHATTAN VALLEY': 'Upper West Side',
-            'LINCOLN CENTER': 'Upper West Side',
-            
-            'MIDTOWN EAST': 'Midtown East',
-            'MURRAY HILL': 'Midtown East',
-            'SUTTON PLACE': 'Midtown East',
-            
-            'MIDTOWN WEST': 'Midtown',
-            'MIDTOWN CBD': 'Midtown',
-            'CLINTON': 'Midtown',
-            "HELL'S KITCHEN": "Midtown",
-            'FASHION': 'Midtown',
-            
-            'GRAMERCY': 'Gramercy',
-            'KIPS BAY': 'Gramercy',
-            'FLATIRON': 'Gramercy',
-            
-            'GREENWICH VILLAGE-CENTRAL': 'Greenwich Village', 
-            'GREENWICH VILLAGE-WEST': 'Greenwich Village',
-            'WEST VILLAGE': 'Greenwich Village',
-            
-            'CHELSEA': 'Chelsea',
-            
-            'SOHO': 'SoHo/TriBeCa',
-            'TRIBECA': 'SoHo/TriBeCa',
-            'LITTLE ITALY': 'SoHo/TriBeCa',
-            
-            'FINANCIAL': 'Financial District',
-            'CIVIC CENTER': 'Financial District',
-            'SEAPORT': 'Financial District',
-            'SOUTHBRIDGE': 'Financial District',
-            
-            'BATTERY PARK CITY': 'Battery Park City',
-            
-            'EAST VILLAGE': 'East Village',
-            'ALPHABET CITY': 'East Village',
-            
-            'LOWER EAST SIDE': 'Lower East Side',
-            'CHINATOWN': 'Lower East Side',
-            
-            'HARLEM-CENTRAL': 'Harlem',
-            'HARLEM-EAST': 'Harlem',
-            'HARLEM-UPPER': 'Harlem',
-            'HARLEM-WEST': 'Harlem',
-            'MORNINGSIDE HEIGHTS': 'Harlem',
-            
-            'WASHINGTON HEIGHTS LOWER': 'Washington Heights',
-            'WASHINGTON HEIGHTS UPPER': 'Washington Heights',
-            'INWOOD': 'Washington Heights'
-        }
-        
-        st.markdown("""
-        <p style="font-size: 20px;">
-        The main dataset, the rolling sales data, we used for the analysis was released by the New York City Department of Finance. The dataset provides detailed records of property sales across the city. For simplicity because of the project scope, we chose to dive deeply into the prices of Manhattan. We offer a streamlined summary of the original dataset to help users better understand trends in Manhattan's real estate market.
-        </p>
-        """, unsafe_allow_html=True)
+    sketch = merged_sketch([year], 'sales', 'over_10k', names)
+    return sketch_quantile(restrict_sketch(sketch, *price_range), 0.5)
 
-        # Apply the mapping to create a consolidated neighborhood column
-        if 'neighborhood' in df.columns:
-            df['consolidated_neighborhood'] = df['neighborhood'].map(
-                lambda x: next((v for k, v in neighborhood_mapping.items() if k in str(x).upper()), x)
-            )
-        else:
-            # If neighborhood doesn't exist, create it based on ZIP CODE
-            zip_to_neighborhood = {
-                10001: "Chelsea",
-                10002: "Lower East Side",
-                10003: "East Village",
-                10004: "Financial District",
-                10005: "Financial District",
-                10006: "Financial District",
-                10007: "SoHo/TriBeCa",
-                10009: "East Village",
-                10010: "Gramercy",
-                10011: "Chelsea",
-                10012: "SoHo/TriBeCa",
-                10013: "SoHo/TriBeCa",
-                10014: "Greenwich Village",
-                10016: "Gramercy",
-                10017: "Midtown East",
-                10018: "Midtown",
-                10019: "Midtown",
-                10020: "Midtown",
-                10021: "Upper East Side",
-                10022: "Midtown East",
-                10023: "Upper West Side",
-                10024: "Upper West Side",
-                10025: "Upper West Side",
-                10026: "Harlem",
-                10027: "Harlem",
-                10028: "Upper East Side",
-                10029: "Harlem",
-                10030: "Harlem",
-                10031: "Harlem",
-                10032: "Washington Heights",
-                10033: "Washington Heights",
-                10034: "Washington Heights",
-                10035: "Harlem",
-                10036: "Midtown",
-                10037: "Harlem",
-                10038: "Financial District",
-                10039: "Harlem",
-                10040: "Washington Heights",
-                10044: "Upper East Side",
-                10065: "Upper East Side",
-                10069: "Upper West Side",
-                10075: "Upper East Side",
-                10128: "Upper East Side",
-                10280: "Battery Park City",
-                10282: "Battery Park City",
-            }
-            df['consolidated_neighborhood'] = df['ZIP CODE'].map(zip_to_neighborhood)
-        
-        return df
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_sales_data():
+    """2023 sales with a consolidated neighborhood column, shared by every session (do not modify)"""
+    df = sales_view(2023, min_price=10000)
+    
+    # Apply the mapping to create a consolidated neighborhood column
+    if 'neighborhood' in df.columns:
+        df['consolidated_neighborhood'] = classify_neighborhoods(
+            df['neighborhood'], CONSOLIDATED_KEYWORDS, keep_unmatched=True
+        )
+    else:
+        # If neighborhood doesn't exist, create it based on ZIP CODE
+        zip_to_neighborhood = zip_neighborhood_map('consolidated')
+        df['consolidated_neighborhood'] = df['ZIP CODE'].map(zip_to_neighborhood)
+    # A few dozen names repeated over every row, like the other text columns
+    df['consolidated_neighborhood'] = df['consolidated_neighborhood'].astype('category')
+    
+    return df
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_filter_index():
+    return build_filter_index(load_sales_data(), 'sale_price', 'consolidated_neighborhood')
+
+def show():
+    st.title("Manhattan Real Estate Sales Data Overview (2023)")
 
     with st.spinner("Loading 2023 sales data..."):
         df = load_sales_data()
+
+    st.markdown("""
+    <p style="font-size: 20px;">
+    The main dataset, the rolling sales data, we used for the analysis was released by the New York City Department of Finance. The dataset provides detailed records of property sales across the city. For simplicity because of the project scope, we chose to dive deeply into the prices of Manhattan. We offer a streamlined summary of the original dataset to help users better understand trends in Manhattan's real estate market.
+    </p>
+    """, unsafe_allow_html=True)
     
     # Display basic dataset information
     st.subheader("Dataset Summary")
@@ -172,24 +90,30 @@ def show():
         default=[]
     )
     
-    # Filters
-    filtered_df = df.copy()
+    # Price range and neighborhoods are looked up in a prebuilt index, so the
+    # cost follows the number of matching rows rather than the whole frame
+    rows = query_filter_index(load_filter_index(), price_range[0], price_range[1], selected_neighborhoods)
     
-    # Price filter data
-    filtered_df = filtered_df[(filtered_df['sale_price'] >= price_range[0]) & 
-                             (filtered_df['sale_price'] <= price_range[1])]
-    
-    # Neighborhood filter data
-    if selected_neighborhoods:
-        filtered_df = filtered_df[filtered_df['consolidated_neighborhood'].isin(selected_neighborhoods)]
+    # Only the columns the summary and charts use are copied out
+    filtered_df = df.iloc[rows, [df.columns.get_loc('sale_price'), df.columns.get_loc('consolidated_neighborhood')]]
     
     # Display Data
     st.subheader("Filtered Data Summary")
-    fcol1, fcol2 = st.columns(2)
+    fcol1, fcol2, fcol3 = st.columns(3)
     with fcol1:
         st.metric("Filtered Records", f"{len(filtered_df):,}")
     with fcol2:
         st.metric("Average Price", f"${filtered_df['sale_price'].mean():,.2f}")
+    with fcol3:
+        median_price = approximate_median(2023, price_range, selected_neighborhoods)
+        st.metric(
+            "Median Price (approx.)",
+            f"${median_price:,.0f}" if pd.notnull(median_price) else "N/A",
+            help=(
+                f"Estimated from pre-aggregated quantile sketches, within {SKETCH_ALPHA:.0%} of the exact "
+                f"median. Sales priced within {SKETCH_ALPHA:.0%} of a price bound may fall on the wrong side of it."
+            ),
+        )
     
     # Selection of visualization
     st.subheader("Data Visualizations")
@@ -225,7 +149,7 @@ def show():
                 ticktext=['0', '100M', '200M', '300M', '400M', '500M']
             )
         )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
         st.markdown("""
         <p style="font-size: 20px;">
         The Price Distribution histogram shows the overall distribution of sales prices in Manhattan. Users can filter by one or more neighborhoods to directly compare pricing trends across areas.</p>
@@ -235,7 +159,7 @@ def show():
     
     elif viz_type == "Neighborhood Comparison":
         # Use consolidated neighborhoods for more concise visualization
-        neighborhood_avg = filtered_df.groupby('consolidated_neighborhood')['sale_price'].mean().reset_index()
+        neighborhood_avg = filtered_df.groupby('consolidated_neighborhood', observed=True)['sale_price'].mean().reset_index()
         neighborhood_avg = neighborhood_avg.sort_values('sale_price', ascending=False)
             
         fig = px.bar(
@@ -253,7 +177,7 @@ def show():
                 xaxis_title="Neighborhood",
                 height=600
         )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
         st.markdown("""
         <p style="font-size: 20px;">
         The Neighborhood Comparison histogram displays the average sales price in each neighborhood, also filterable for targeted comparisons.</p>
@@ -277,14 +201,15 @@ def show():
     sort_column = st.selectbox("Sort By", options=selected_columns if selected_columns else all_columns)
     sort_ascending = st.checkbox("Sort Ascending", value=False)
     
-    if sort_column:
-        filtered_df = filtered_df.sort_values(by=sort_column, ascending=sort_ascending)
-    
-    # Display
-    if selected_columns:
-        st.dataframe(filtered_df[selected_columns], use_container_width=True)
-    else:
-        st.dataframe(filtered_df, use_container_width=True)
+    # Display one page at a time; sorting reuses a per-column order computed once
+    positions = paginated_table(
+        df,
+        "overview_sales_2023",
+        selected_columns if selected_columns else all_columns,
+        sort_column=sort_column,
+        ascending=sort_ascending,
+        rows=rows,
+    )
     
     st.markdown("""
     <p style="font-size: 20px;">
@@ -295,11 +220,30 @@ def show():
     </p>
     """, unsafe_allow_html=True)
         
-    # Download option
-    csv = filtered_df.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="Download Filtered Data as CSV",
-        data=csv,
-        file_name="manhattan_sales_2023_filtered.csv",
-        mime="text/csv",
-    )
+    # Download option: the file is only written when someone asks for it, in
+    # chunks, and reused for anyone requesting the same selection. It is read
+    # into the download button only in the rerun that prepared it, not on
+    # every rerun after that.
+    export_format = st.radio("Download Format", list(EXPORT_FORMATS), horizontal=True)
+    if st.button("Prepare Download"):
+        fingerprint = filter_fingerprint(
+            source=source_sha256(sales_workbook_path(2023)),
+            price_range=price_range,
+            neighborhoods=sorted(selected_neighborhoods),
+            sort_column=sort_column,
+            ascending=sort_ascending,
+        )
+        with st.spinner("Preparing download..."):
+            export_path = export_rows(df, positions, fingerprint, export_format)
+        ext, mime = EXPORT_FORMATS[export_format]
+        try:
+            with open(export_path, 'rb') as f:
+                st.download_button(
+                    label=f"Download Filtered Data as {export_format}",
+                    data=f,
+                    file_name=f"manhattan_sales_2023_filtered{ext}",
+                    mime=mime,
+                )
+        except FileNotFoundError:
+            # Another session evicted it between writing and reading
+            st.warning("The download was cleared before it could be sent. Please prepare it again.")
@@ -4,159 +4,26 @@ import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 from scipy import stats
-import os
-import glob
+from utils.price_cube import neighborhood_prices
+from utils.neighborhoods import COMMUNITY_DISTRICT_NAMES
+from utils.acs_loader import acs_indicator
+from utils.instrumentation import plotly_chart, timed
+from utils.figure_cache import cached_figure
+from utils.trend_lines import neighborhood_trend_traces
 
+@timed("Age.load_median_age_data")
 def load_median_age_data(min_year=2015):
+    return acs_indicator("Median age", "Median_Age", min_year=min_year)
 
-    file_pattern = os.path.join('datasets', 'Combined_*.xlsx')
-    excel_files = glob.glob(file_pattern)
-    
-    all_data = []
-    
-    for file_path in excel_files:
-        filename = os.path.basename(file_path)
-        if 'Combined_' in filename and '.xlsx' in filename:
-            year = int(filename.replace('Combined_', '').replace('.xlsx', ''))
-            if year < min_year:
-                continue
-        else:
-            continue
-        
-        df = pd.read_excel(file_path)
-        
-        median_age_rows = df[df.iloc[:, 0].str.contains("Median age", na=False, case=False)]
-        
-        if median_age_rows.empty:
-            continue
-        
-        median_age_row = median_age_rows.iloc[0]
-        
-        # Extract neighborhoods and median age data
-        for col in range(1, len(df.columns)):
-            if pd.notna(median_age_row.iloc[col]):
-                col_name = df.columns[col]
-
-                if "NYC-Manhattan Community District" in col_name and "PUMA" in col_name:
-                    neighborhood = col_name.split("--")[1].split(" PUMA")[0]
-                
-                if "Estimate" in neighborhood:
-                    neighborhood = neighborhood.split("Estimate")[0].strip()
-                
-
-                median_age = float(median_age_row.iloc[col])
-                all_data.append({
-                    "Year": year,
-                    "Neighborhood": neighborhood,
-                    "Median_Age": median_age
-                })
-    
-    # Dataframe
-    if all_data:
-        result_df = pd.DataFrame(all_data)
-        result_df = result_df.drop_duplicates(subset=['Year', 'Neighborhood'])
-        result_df = result_df.sort_values(by=['Neighborhood', 'Year'])
-        return result_df
-    
-    return pd.DataFrame(columns=["Year", "Neighborhood", "Median_Age"])
-
-def load_sales_data(year):
-    file_path = os.path.join('datasets', f'{year}_manhattan.xlsx')
-    
-    if not os.path.exists(file_path):
-        return None
-    
-    sales_df = pd.read_excel(file_path)
-    
-    sales_df['sale_price'] = pd.to_numeric(sales_df['sale_price'], errors='coerce')
-    sales_df = sales_df[sales_df['sale_price'] > 10000]
-    
-    return sales_df
-
-# Match the neighborhood
-def create_neighborhood_mapping():
-    neighborhood_mapping = {
-        'UPPER EAST SIDE (59-79)': 'Upper East Side',
-        'UPPER EAST SIDE (79-96)': 'Upper East Side',
-        'UPPER EAST SIDE (96-110)': 'Upper East Side',
-        'UPPER WEST SIDE (59-79)': 'Upper West Side & West Side',
-        'UPPER WEST SIDE (79-96)': 'Upper West Side & West Side', 
-        'UPPER WEST SIDE (96-116)': 'Upper West Side & West Side',
-        
-        'MIDTOWN EAST': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'MIDTOWN WEST': 'Chelsea, Clinton & Midtown Business District',
-        'MIDTOWN CBD': 'Chelsea, Clinton & Midtown Business District',
-        'MURRAY HILL': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'GRAMERCY': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'CLINTON': 'Chelsea, Clinton & Midtown Business District',
-        'FASHION': 'Chelsea, Clinton & Midtown Business District',
-        
-        'GREENWICH VILLAGE-CENTRAL': 'Battery Park City, Greenwich Village & Soho',
-        'GREENWICH VILLAGE-WEST': 'Battery Park City, Greenwich Village & Soho',
-        'SOHO': 'Battery Park City, Greenwich Village & Soho',
-        'TRIBECA': 'Battery Park City, Greenwich Village & Soho',
-        'FINANCIAL': 'Battery Park City, Greenwich Village & Soho',
-        'ALPHABET CITY': 'Chinatown & Lower East Side',
-        'EAST VILLAGE': 'Chinatown & Lower East Side',
-        'LOWER EAST SIDE': 'Chinatown & Lower East Side',
-        'CHINATOWN': 'Chinatown & Lower East Side',
-        
-        'HARLEM-CENTRAL': 'Central Harlem',
-        'HARLEM-EAST': 'East Harlem',
-        'HARLEM-UPPER': 'Hamilton Heights, Manhattanville & West Harlem',
-        'HARLEM-WEST': 'Hamilton Heights, Manhattanville & West Harlem',
-        'WASHINGTON HEIGHTS LOWER': 'Washington Heights, Inwood & Marble Hill',
-        'WASHINGTON HEIGHTS UPPER': 'Washington Heights, Inwood & Marble Hill',
-        'INWOOD': 'Washington Heights, Inwood & Marble Hill',
-        
-        'CHELSEA': 'Chelsea, Clinton & Midtown Business District',
-        'MANHATTAN VALLEY': 'Upper West Side & West Side',
-        'MORNINGSIDE HEIGHTS': 'Hamilton Heights, Manhattanville & West Harlem',
-        'ROOSEVELT ISLAND': 'Upper East Side',
-        'FLATIRON': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'SOUTHBRIDGE': 'Battery Park City, Greenwich Village & Soho',
-        'CIVIC CENTER': 'Battery Park City, Greenwich Village & Soho',
-        'LITTLE ITALY': 'Chinatown & Lower East Side',
-        'JAVITS CENTER': 'Chelsea, Clinton & Midtown Business District',
-        'KIPS BAY': 'Murray Hill, Gramercy & Stuyvesant Town'
-    }
-    
-    # Add case-insensitive mapping
-    return {k.upper(): v for k, v in neighborhood_mapping.items()}
-
+@cached_figure("Age.create_median_age_plot")
 def create_median_age_plot(df, selected_neighborhoods=None):
-    all_neighborhoods = sorted(df['Neighborhood'].unique())
-    
-    if selected_neighborhoods is None or len(selected_neighborhoods) == 0:
-        selected_neighborhoods = []
-    
     # Plot trace plot
-    fig = go.Figure()
-    
-    for neighborhood in all_neighborhoods:
-        neighborhood_data = df[df['Neighborhood'] == neighborhood]
-        
-        if neighborhood in selected_neighborhoods:
-            line_color = None  # Use plotly default color
-            line_width = 3
-            opacity = 1.0
-        else:
-            line_color = 'rgba(200, 200, 200, 0.5)'  # Gray
-            line_width = 1.5
-            opacity = 0.7
-        
-        fig.add_trace(go.Scatter(
-            x=neighborhood_data['Year'],
-            y=neighborhood_data['Median_Age'],
-            mode='lines+markers',
-            name=neighborhood,
-            line=dict(color=line_color, width=line_width),
-            opacity=opacity,
-            hovertemplate=
-            '<b>%{fullData.name}</b><br>' +
-            'Year: %{x}<br>' +
-            'Median Age: %{y:.1f} years<extra></extra>'
-        ))
+    fig = go.Figure(neighborhood_trend_traces(
+        df, 'Median_Age', selected_neighborhoods,
+        '<b>%{fullData.name}</b><br>' +
+        'Year: %{x}<br>' +
+        'Median Age: %{y:.1f} years<extra></extra>'
+    ))
     
     # Update layout
     fig.update_layout(
@@ -186,29 +53,9 @@ def create_median_age_plot(df, selected_neighborhoods=None):
     
     return fig
 
-def analyze_age_price_relationship(year, age_df, sales_df):
-    year_age_df = age_df[age_df['Year'] == year]
-
-    neighborhood_prices = sales_df.groupby('neighborhood').agg({
-        'sale_price': ['mean', 'median', 'count']
-    }).reset_index()
-    
-    neighborhood_prices.columns = ['neighborhood', 'mean_price', 'median_price', 'sale_count']
-    
-    neighborhood_mapping = create_neighborhood_mapping()
-    
-    neighborhood_prices['mapped_neighborhood'] = neighborhood_prices['neighborhood'].apply(
-        lambda x: neighborhood_mapping.get(x.upper(), "Unknown")
-    )
-    
-    # Merge
-    merged_df = pd.merge(
-        year_age_df,
-        neighborhood_prices,
-        left_on='Neighborhood',
-        right_on='mapped_neighborhood',
-        how='inner'
-    )
+@cached_figure("Age.create_age_price_scatter")
+def create_age_price_scatter(merged_df, year, slope, intercept, r_value):
+    x = merged_df['Median_Age']
     
     # Scatter plot
     fig = px.scatter(
@@ -232,12 +79,6 @@ def analyze_age_price_relationship(year, age_df, sales_df):
         title=f'Median Age vs. Median Sale Price ({year})'
     )
     
-    # Regression line
-    x = merged_df['Median_Age']
-    y = merged_df['median_price']
-    
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-    
     x_range = np.linspace(min(x), max(x), 100)
     y_range = slope * x_range + intercept
     
@@ -260,8 +101,34 @@ def analyze_age_price_relationship(year, age_df, sales_df):
         )
     )
     
-    # Display
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+@timed("Age.analyze_age_price_relationship")
+def analyze_age_price_relationship(year, age_df, sales_prices):
+    year_age_df = age_df[age_df['Year'] == year]
+
+    # Map sales data neighborhoods to demographic data neighborhoods, on a copy
+    sales_prices = sales_prices.assign(
+        mapped_neighborhood=sales_prices['neighborhood'].str.upper().map(COMMUNITY_DISTRICT_NAMES).fillna("Unknown")
+    )
+    
+    # Merge
+    merged_df = pd.merge(
+        year_age_df,
+        sales_prices,
+        left_on='Neighborhood',
+        right_on='mapped_neighborhood',
+        how='inner'
+    )
+    
+    # Regression line
+    x = merged_df['Median_Age']
+    y = merged_df['median_price']
+    
+    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+    
+    # Rebuilt only when the merged data or the year change
+    plotly_chart(create_age_price_scatter(merged_df, year, slope, intercept, r_value), use_container_width=True)
     
     # Correlation statistics
     st.subheader("Correlation Statistics")
@@ -338,8 +205,7 @@ def show_median_age_analysis():
             """, unsafe_allow_html=True)
 
             fig = create_median_age_plot(age_df_all, selected_neighborhoods)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
             
             if selected_neighborhoods:
                 st.subheader("Comparative Statistics")
@@ -408,10 +274,13 @@ def show_median_age_analysis():
             )
 
             with st.spinner(f"Loading {selected_year} sales data..."):
-                sales_df = load_sales_data(selected_year)
+                sales_prices = neighborhood_prices(selected_year)
 
             # Relationship between age and price
-            analyze_age_price_relationship(selected_year, age_df_recent, sales_df)
+            if sales_prices is not None:
+                analyze_age_price_relationship(selected_year, age_df_recent, sales_prices)
+            else:
+                st.warning(f"No sales data found for {selected_year}")
 
 if __name__ == "__main__":
     show()
\ No newline at end of file
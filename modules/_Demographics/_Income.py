@@ -4,159 +4,26 @@ import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 from scipy import stats
-import os
-import glob
+from utils.price_cube import neighborhood_prices
+from utils.neighborhoods import COMMUNITY_DISTRICT_NAMES
+from utils.acs_loader import acs_indicator
+from utils.instrumentation import plotly_chart, timed
+from utils.figure_cache import cached_figure
+from utils.trend_lines import neighborhood_trend_traces
 
+@timed("Income.load_median_income_data")
 def load_median_income_data(min_year=2015):
-    file_pattern = os.path.join('datasets', 'Combined_*.xlsx')
-    excel_files = glob.glob(file_pattern)
-    
-    all_data = []
-    
-    for file_path in excel_files:
-        filename = os.path.basename(file_path)
-        if 'Combined_' in filename and '.xlsx' in filename:
-            year = int(filename.replace('Combined_', '').replace('.xlsx', ''))
-            if year < min_year:
-                continue
-        else:
-            continue
-        
-        df = pd.read_excel(file_path)
-        
-        median_income_rows = df[df.iloc[:, 0].str.contains("Median household income", na=False, case=False)]
-        
-        if median_income_rows.empty:
-            continue
-        
-        median_income_row = median_income_rows.iloc[0]
-        
-        # Extract neighborhoods and median income data
-        for col in range(1, len(df.columns)):
-            if pd.notna(median_income_row.iloc[col]):
-                col_name = df.columns[col]
-
-                if "NYC-Manhattan Community District" in col_name and "PUMA" in col_name:
-                    neighborhood = col_name.split("--")[1].split(" PUMA")[0]
-                
-                # Further clean neighborhood name if it contains "Estimate"
-                if "Estimate" in neighborhood:
-                    neighborhood = neighborhood.split("Estimate")[0].strip()
-
-                median_income_str = str(median_income_row.iloc[col]).replace(',', '')
-                median_income = float(median_income_str)
-
-                all_data.append({
-                    "Year": year,
-                    "Neighborhood": neighborhood,
-                    "Median_Income": median_income
-                })
-    
-    # Dataframe
-    if all_data:
-        result_df = pd.DataFrame(all_data)
-        result_df = result_df.drop_duplicates(subset=['Year', 'Neighborhood'])
-        result_df = result_df.sort_values(by=['Neighborhood', 'Year'])
-        return result_df
-    
-    return pd.DataFrame(columns=["Year", "Neighborhood", "Median_Income"])
-
-def load_sales_data(year):
-    file_path = os.path.join('datasets', f'{year}_manhattan.xlsx')
-    
-    if not os.path.exists(file_path):
-        return None
-    
-    sales_df = pd.read_excel(file_path)
-    
-    sales_df['sale_price'] = pd.to_numeric(sales_df['sale_price'], errors='coerce')
-    sales_df = sales_df[sales_df['sale_price'] > 10000]
-    
-    return sales_df
-
-def create_neighborhood_mapping():
-    neighborhood_mapping = {
-        'UPPER EAST SIDE (59-79)': 'Upper East Side',
-        'UPPER EAST SIDE (79-96)': 'Upper East Side',
-        'UPPER EAST SIDE (96-110)': 'Upper East Side',
-        'UPPER WEST SIDE (59-79)': 'Upper West Side & West Side',
-        'UPPER WEST SIDE (79-96)': 'Upper West Side & West Side', 
-        'UPPER WEST SIDE (96-116)': 'Upper West Side & West Side',
-        
-        'MIDTOWN EAST': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'MIDTOWN WEST': 'Chelsea, Clinton & Midtown Business District',
-        'MIDTOWN CBD': 'Chelsea, Clinton & Midtown Business District',
-        'MURRAY HILL': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'GRAMERCY': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'CLINTON': 'Chelsea, Clinton & Midtown Business District',
-        'FASHION': 'Chelsea, Clinton & Midtown Business District',
-        
-        'GREENWICH VILLAGE-CENTRAL': 'Battery Park City, Greenwich Village & Soho',
-        'GREENWICH VILLAGE-WEST': 'Battery Park City, Greenwich Village & Soho',
-        'SOHO': 'Battery Park City, Greenwich Village & Soho',
-        'TRIBECA': 'Battery Park City, Greenwich Village & Soho',
-        'FINANCIAL': 'Battery Park City, Greenwich Village & Soho',
-        'ALPHABET CITY': 'Chinatown & Lower East Side',
-        'EAST VILLAGE': 'Chinatown & Lower East Side',
-        'LOWER EAST SIDE': 'Chinatown & Lower East Side',
-        'CHINATOWN': 'Chinatown & Lower East Side',
-        
-        'HARLEM-CENTRAL': 'Central Harlem',
-        'HARLEM-EAST': 'East Harlem',
-        'HARLEM-UPPER': 'Hamilton Heights, Manhattanville & West Harlem',
-        'HARLEM-WEST': 'Hamilton Heights, Manhattanville & West Harlem',
-        'WASHINGTON HEIGHTS LOWER': 'Washington Heights, Inwood & Marble Hill',
-        'WASHINGTON HEIGHTS UPPER': 'Washington Heights, Inwood & Marble Hill',
-        'INWOOD': 'Washington Heights, Inwood & Marble Hill',
-        
-        'CHELSEA': 'Chelsea, Clinton & Midtown Business District',
-        'MANHATTAN VALLEY': 'Upper West Side & West Side',
-        'MORNINGSIDE HEIGHTS': 'Hamilton Heights, Manhattanville & West Harlem',
-        'ROOSEVELT ISLAND': 'Upper East Side',
-        'FLATIRON': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'SOUTHBRIDGE': 'Battery Park City, Greenwich Village & Soho',
-        'CIVIC CENTER': 'Battery Park City, Greenwich Village & Soho',
-        'LITTLE ITALY': 'Chinatown & Lower East Side',
-        'JAVITS CENTER': 'Chelsea, Clinton & Midtown Business District',
-        'KIPS BAY': 'Murray Hill, Gramercy & Stuyvesant Town'
-    }
-    
-    # Add case-insensitive mapping
-    return {k.upper(): v for k, v in neighborhood_mapping.items()}
+    return acs_indicator("Median household income", "Median_Income", min_year=min_year)
 
+@cached_figure("Income.create_median_income_plot")
 def create_median_income_plot(df, selected_neighborhoods=None):
-    all_neighborhoods = sorted(df['Neighborhood'].unique())
-    
-    if selected_neighborhoods is None or len(selected_neighborhoods) == 0:
-        selected_neighborhoods = []
-    
     # Plot trace plot
-    fig = go.Figure()
-    
-    for neighborhood in all_neighborhoods:
-        neighborhood_data = df[df['Neighborhood'] == neighborhood]
-        
-        if neighborhood in selected_neighborhoods:
-            line_color = None  # Use plotly default color
-            line_width = 3
-            opacity = 1.0
-        else:
-            line_color = 'rgba(200, 200, 200, 0.5)'  # Gray
-            line_width = 1.5
-            opacity = 0.7
-        
-        fig.add_trace(go.Scatter(
-            x=neighborhood_data['Year'],
-            y=neighborhood_data['Median_Income'],
-            mode='lines+markers',
-            name=neighborhood,
-            line=dict(color=line_color, width=line_width),
-            opacity=opacity,
-            hovertemplate=
-            '<b>%{fullData.name}</b><br>' +
-            'Year: %{x}<br>' +
-            'Median Income: $%{y:,.0f}<extra></extra>'
-        ))
+    fig = go.Figure(neighborhood_trend_traces(
+        df, 'Median_Income', selected_neighborhoods,
+        '<b>%{fullData.name}</b><br>' +
+        'Year: %{x}<br>' +
+        'Median Income: $%{y:,.0f}<extra></extra>'
+    ))
     
     # Update layout
     fig.update_layout(
@@ -187,32 +54,9 @@ def create_median_income_plot(df, selected_neighborhoods=None):
     
     return fig
 
-def analyze_income_price_relationship(year, income_df, sales_df):
-    year_income_df = income_df[income_df['Year'] == year]
-
-    neighborhood_prices = sales_df.groupby('neighborhood').agg({
-        'sale_price': ['mean', 'median', 'count']
-    }).reset_index()
-    
-    neighborhood_prices.columns = ['neighborhood', 'mean_price', 'median_price', 'sale_count']
-    
-    neighborhood_mapping = create_neighborhood_mapping()
-    
-    neighborhood_prices['mapped_neighborhood'] = neighborhood_prices['neighborhood'].apply(
-        lambda x: neighborhood_mapping.get(x.upper(), "Unknown")
-    )
-    
-    merged_df = pd.merge(
-        year_income_df,
-        neighborhood_prices,
-        left_on='Neighborhood',
-        right_on='mapped_neighborhood',
-        how='inner'
-    )
-    
-    if len(merged_df) < 2:
-        st.warning("Not enough data for statistical analysis.")
-        return
+@cached_figure("Income.create_income_price_scatter")
+def create_income_price_scatter(merged_df, year, slope, intercept, r_value):
+    x = merged_df['Median_Income']
     
     fig = px.scatter(
         merged_df,
@@ -235,12 +79,6 @@ def analyze_income_price_relationship(year, income_df, sales_df):
         title=f'Median Income vs. Median Sale Price ({year})'
     )
     
-    x = merged_df['Median_Income']
-    y = merged_df['median_price']
-
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-
-    
     x_range = np.linspace(min(x), max(x), 100)
     y_range = slope * x_range + intercept
     
@@ -260,7 +98,36 @@ def analyze_income_price_relationship(year, income_df, sales_df):
         xaxis=dict(tickformat='$,.0f')
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+@timed("Income.analyze_income_price_relationship")
+def analyze_income_price_relationship(year, income_df, sales_prices):
+    year_income_df = income_df[income_df['Year'] == year]
+
+    # Map sales data neighborhoods to demographic data neighborhoods, on a copy
+    sales_prices = sales_prices.assign(
+        mapped_neighborhood=sales_prices['neighborhood'].str.upper().map(COMMUNITY_DISTRICT_NAMES).fillna("Unknown")
+    )
+    
+    merged_df = pd.merge(
+        year_income_df,
+        sales_prices,
+        left_on='Neighborhood',
+        right_on='mapped_neighborhood',
+        how='inner'
+    )
+    
+    if len(merged_df) < 2:
+        st.warning("Not enough data for statistical analysis.")
+        return
+    
+    x = merged_df['Median_Income']
+    y = merged_df['median_price']
+
+    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+    
+    # Rebuilt only when the merged data or the year change
+    plotly_chart(create_income_price_scatter(merged_df, year, slope, intercept, r_value), use_container_width=True)
     
     st.subheader("Correlation Statistics")
     
@@ -343,8 +210,7 @@ def show_income_analysis():
             </p>
             """, unsafe_allow_html=True)
 
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
             
             if selected_neighborhoods:
                 st.subheader("Comparative Statistics")
@@ -413,10 +279,10 @@ def show_income_analysis():
             )
 
             with st.spinner(f"Loading {selected_year} sales data..."):
-                sales_df = load_sales_data(selected_year)
+                sales_prices = neighborhood_prices(selected_year)
 
-            if sales_df is not None:
-                analyze_income_price_relationship(selected_year, income_df_recent, sales_df)
+            if sales_prices is not None:
+                analyze_income_price_relationship(selected_year, income_df_recent, sales_prices)
             else:
                 st.warning(f"No sales data found for {selected_year}")
 
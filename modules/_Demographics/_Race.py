@@ -4,180 +4,63 @@ import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 from scipy import stats
-import os
-import glob
+from utils.price_cube import neighborhood_prices
+from utils.neighborhoods import COMMUNITY_DISTRICT_NAMES
+from utils.acs_loader import load_acs_indicators, RACE_CATEGORIES
+from utils.instrumentation import plotly_chart, timed
+from utils.figure_cache import cached_figure
 
+@timed("Race.load_race_demographics_data")
 def load_race_demographics_data(min_year=2015):
-    file_pattern = os.path.join('datasets', 'Combined_*.xlsx')
-    excel_files = glob.glob(file_pattern)
-    
-    all_data = []
-    
-    race_categories = [
-        "White",
-        "Black or African American",
-        "Asian"
-    ]
-    
-    for file_path in excel_files:
-        filename = os.path.basename(file_path)
-        if 'Combined_' in filename and '.xlsx' in filename:
-            year = int(filename.replace('Combined_', '').replace('.xlsx', ''))
-            if year < min_year:
-                continue
-        else:
-            continue
-        
-        # Read Excel file
-        df = pd.read_excel(file_path)
-        
-        # Find race data rows
-        for race in race_categories:
-            race_rows = df[df.iloc[:, 0].str.contains(race, na=False, case=False)]
-            
-            if race_rows.empty:
-                continue
-            
-            race_row = race_rows.iloc[0]
-            
-            # Get total population row for percentage calculation
-            total_pop_rows = df[df.iloc[:, 0].str.contains("Total population", na=False, case=False)]
-            if total_pop_rows.empty:
-                continue
-            
-            total_pop_row = total_pop_rows.iloc[0]
-            
-            # Extract neighborhoods and race data
-            for col in range(1, len(df.columns)):
-                if pd.notna(race_row.iloc[col]) and pd.notna(total_pop_row.iloc[col]):
-                    col_name = df.columns[col]
-
-                    if "NYC-Manhattan Community District" in col_name and "PUMA" in col_name:
-                        neighborhood = col_name.split("--")[1].split(" PUMA")[0]
-                    
-                    # Further clean neighborhood name if it contains "Estimate"
-                    if "Estimate" in neighborhood:
-                        neighborhood = neighborhood.split("Estimate")[0].strip()
-                    
-                    # Extract data and calculate percentage
-                    race_count = float(str(race_row.iloc[col]).replace(',', ''))
-                    total_pop = float(str(total_pop_row.iloc[col]).replace(',', ''))
-                    
-                    # Calculate percentage (avoid division by zero)
-                    if total_pop > 0:
-                        percentage = (race_count / total_pop) * 100
-                    else:
-                        percentage = 0
-                    
-                    all_data.append({
-                        "Year": year,
-                        "Neighborhood": neighborhood,
-                        "Race": race,
-                        "Count": race_count,
-                        "Total_Population": total_pop,
-                        "Percentage": percentage
-                    })
-    
-    # Create dataframe
-    if all_data:
-        result_df = pd.DataFrame(all_data)
-        result_df = result_df.drop_duplicates(subset=['Year', 'Neighborhood', 'Race'])
-        result_df = result_df.sort_values(by=['Neighborhood', 'Year', 'Race'])
-        return result_df
+    acs_df = load_acs_indicators()
+    acs_df = acs_df[acs_df['Year'] >= min_year]
     
-    return pd.DataFrame(columns=["Year", "Neighborhood", "Race", "Count", "Total_Population", "Percentage"])
-
-def load_sales_data(year):
-    file_path = os.path.join('datasets', f'{year}_manhattan.xlsx')
+    race_df = acs_df[acs_df['Indicator'].isin(RACE_CATEGORIES)].rename(
+        columns={'Indicator': 'Race', 'Value': 'Count'}
+    )
     
-    if not os.path.exists(file_path):
-        return None
+    # Get total population for percentage calculation
+    total_pop_df = acs_df[acs_df['Indicator'] == "Total population"][['Year', 'Neighborhood', 'Value']].rename(
+        columns={'Value': 'Total_Population'}
+    )
     
-    sales_df = pd.read_excel(file_path)
+    result_df = pd.merge(race_df, total_pop_df, on=['Year', 'Neighborhood'], how='inner')
     
-    sales_df['sale_price'] = pd.to_numeric(sales_df['sale_price'], errors='coerce')
-    sales_df = sales_df[sales_df['sale_price'] > 10000]
+    # Calculate percentage (avoid division by zero)
+    total_pop = result_df['Total_Population'].where(result_df['Total_Population'] > 0)
+    result_df['Percentage'] = (result_df['Count'] / total_pop * 100).fillna(0)
     
-    return sales_df
-
-def create_neighborhood_mapping():
-    neighborhood_mapping = {
-        'UPPER EAST SIDE (59-79)': 'Upper East Side',
-        'UPPER EAST SIDE (79-96)': 'Upper East Side',
-        'UPPER EAST SIDE (96-110)': 'Upper East Side',
-        'UPPER WEST SIDE (59-79)': 'Upper West Side & West Side',
-        'UPPER WEST SIDE (79-96)': 'Upper West Side & West Side', 
-        'UPPER WEST SIDE (96-116)': 'Upper West Side & West Side',
-        
-        'MIDTOWN EAST': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'MIDTOWN WEST': 'Chelsea, Clinton & Midtown Business District',
-        'MIDTOWN CBD': 'Chelsea, Clinton & Midtown Business District',
-        'MURRAY HILL': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'GRAMERCY': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'CLINTON': 'Chelsea, Clinton & Midtown Business District',
-        'FASHION': 'Chelsea, Clinton & Midtown Business District',
-        
-        'GREENWICH VILLAGE-CENTRAL': 'Battery Park City, Greenwich Village & Soho',
-        'GREENWICH VILLAGE-WEST': 'Battery Park City, Greenwich Village & Soho',
-        'SOHO': 'Battery Park City, Greenwich Village & Soho',
-        'TRIBECA': 'Battery Park City, Greenwich Village & Soho',
-        'FINANCIAL': 'Battery Park City, Greenwich Village & Soho',
-        'ALPHABET CITY': 'Chinatown & Lower East Side',
-        'EAST VILLAGE': 'Chinatown & Lower East Side',
-        'LOWER EAST SIDE': 'Chinatown & Lower East Side',
-        'CHINATOWN': 'Chinatown & Lower East Side',
-        
-        'HARLEM-CENTRAL': 'Central Harlem',
-        'HARLEM-EAST': 'East Harlem',
-        'HARLEM-UPPER': 'Hamilton Heights, Manhattanville & West Harlem',
-        'HARLEM-WEST': 'Hamilton Heights, Manhattanville & West Harlem',
-        'WASHINGTON HEIGHTS LOWER': 'Washington Heights, Inwood & Marble Hill',
-        'WASHINGTON HEIGHTS UPPER': 'Washington Heights, Inwood & Marble Hill',
-        'INWOOD': 'Washington Heights, Inwood & Marble Hill',
-        
-        'CHELSEA': 'Chelsea, Clinton & Midtown Business District',
-        'MANHATTAN VALLEY': 'Upper West Side & West Side',
-        'MORNINGSIDE HEIGHTS': 'Hamilton Heights, Manhattanville & West Harlem',
-        'ROOSEVELT ISLAND': 'Upper East Side',
-        'FLATIRON': 'Murray Hill, Gramercy & Stuyvesant Town',
-        'SOUTHBRIDGE': 'Battery Park City, Greenwich Village & Soho',
-        'CIVIC CENTER': 'Battery Park City, Greenwich Village & Soho',
-        'LITTLE ITALY': 'Chinatown & Lower East Side',
-        'JAVITS CENTER': 'Chelsea, Clinton & Midtown Business District',
-        'KIPS BAY': 'Murray Hill, Gramercy & Stuyvesant Town'
-    }
-    
-    # Add case-insensitive mapping
-    return {k.upper(): v for k, v in neighborhood_mapping.items()}
+    result_df = result_df[["Year", "Neighborhood", "Race", "Count", "Total_Population", "Percentage"]]
+    return result_df.sort_values(by=['Neighborhood', 'Year', 'Race'])
 
+@cached_figure("Race.create_race_stacked_area_plot")
 def create_race_stacked_area_plot(df, selected_neighborhood):
     """Create a stacked area plot for race distribution over time for a single neighborhood"""
-    # Filter data for selected neighborhood
-    neighborhood_df = df[df['Neighborhood'] == selected_neighborhood].copy()
-    
+    # One Year x Race matrix for the neighborhood; each column is one layer.
+    # Stacking needs a trace per layer and is not available on WebGL traces
+    neighborhood_df = df[df['Neighborhood'] == selected_neighborhood]
     pivot_df = neighborhood_df.pivot_table(
         values='Percentage', 
         index='Year', 
         columns='Race', 
         aggfunc='first'
-    ).reset_index()
+    )
+    races = [race for race in df['Race'].unique() if race in pivot_df.columns]
     
     # Create stacked area plot
-    fig = go.Figure()
-    
-    # Add traces for each race category
-    for race in df['Race'].unique():
-        if race in pivot_df.columns:
-            fig.add_trace(go.Scatter(
-                x=pivot_df['Year'], 
-                y=pivot_df[race],
-                mode='lines',
-                stackgroup='one',  # Enable stacking
-                name=race,
-                hovertemplate=
-                f'{race}: %{{y:.1f}}%<br>' +
-                'Year: %{x}<extra></extra>'
-            ))
+    fig = go.Figure([
+        go.Scatter(
+            x=pivot_df.index,
+            y=pivot_df[race],
+            mode='lines',
+            stackgroup='one',  # Enable stacking
+            name=race,
+            hovertemplate=
+            f'{race}: %{{y:.1f}}%<br>' +
+            'Year: %{x}<extra></extra>'
+        )
+        for race in races
+    ])
     
     # Update layout
     fig.update_layout(
@@ -271,38 +154,9 @@ def create_race_comparison_plot(df, selected_year, selected_neighborhoods=None):
     
     return fig
 
-def analyze_white_percentage_price_relationship(year, race_df, sales_df):
-    # Filter data for white race and the selected year
-    white_df = race_df[(race_df['Race'] == 'White') & (race_df['Year'] == year)]
-
-    # Aggregate sales data by neighborhood
-    neighborhood_prices = sales_df.groupby('neighborhood').agg({
-        'sale_price': ['mean', 'median', 'count']
-    }).reset_index()
-    
-    neighborhood_prices.columns = ['neighborhood', 'mean_price', 'median_price', 'sale_count']
-    
-    # Get neighborhood mapping
-    neighborhood_mapping = create_neighborhood_mapping()
-    
-    # Map sales data neighborhoods to demographic data neighborhoods
-    neighborhood_prices['mapped_neighborhood'] = neighborhood_prices['neighborhood'].apply(
-        lambda x: neighborhood_mapping.get(x.upper(), "Unknown")
-    )
-    
-    # Merge datasets on neighborhood
-    merged_df = pd.merge(
-        white_df,
-        neighborhood_prices,
-        left_on='Neighborhood',
-        right_on='mapped_neighborhood',
-        how='inner'
-    )
-    
-    # Check if we have enough data for analysis
-    if len(merged_df) < 2:
-        st.warning("Not enough data for statistical analysis.")
-        return
+@cached_figure("Race.create_white_percentage_price_scatter")
+def create_white_percentage_price_scatter(merged_df, year, slope, intercept, r_value):
+    x = merged_df['Percentage']
     
     # Create scatter plot
     fig = px.scatter(
@@ -326,13 +180,6 @@ def analyze_white_percentage_price_relationship(year, race_df, sales_df):
         title=f'White Population Percentage vs. Median Sale Price ({year})'
     )
     
-    # Linear regression
-    x = merged_df['Percentage']
-    y = merged_df['median_price']
-
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-
-    
     # Create regression line
     x_range = np.linspace(min(x), max(x), 100)
     y_range = slope * x_range + intercept
@@ -355,8 +202,40 @@ def analyze_white_percentage_price_relationship(year, race_df, sales_df):
         xaxis=dict(title='White Population Percentage (%)')
     )
     
-    # Display plot
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+@timed("Race.analyze_white_percentage_price_relationship")
+def analyze_white_percentage_price_relationship(year, race_df, sales_prices):
+    # Filter data for white race and the selected year
+    white_df = race_df[(race_df['Race'] == 'White') & (race_df['Year'] == year)]
+
+    # Map sales data neighborhoods to demographic data neighborhoods, on a copy
+    sales_prices = sales_prices.assign(
+        mapped_neighborhood=sales_prices['neighborhood'].str.upper().map(COMMUNITY_DISTRICT_NAMES).fillna("Unknown")
+    )
+    
+    # Merge datasets on neighborhood
+    merged_df = pd.merge(
+        white_df,
+        sales_prices,
+        left_on='Neighborhood',
+        right_on='mapped_neighborhood',
+        how='inner'
+    )
+    
+    # Check if we have enough data for analysis
+    if len(merged_df) < 2:
+        st.warning("Not enough data for statistical analysis.")
+        return
+    
+    # Linear regression
+    x = merged_df['Percentage']
+    y = merged_df['median_price']
+
+    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+    
+    # Rebuilt only when the merged data or the year change
+    plotly_chart(create_white_percentage_price_scatter(merged_df, year, slope, intercept, r_value), use_container_width=True)
     
     # Show correlation statistics
     st.subheader("Correlation Statistics")
@@ -411,8 +290,7 @@ def show_race_demographics_analysis():
             # Display stacked area chart
             st.subheader(f"Racial Composition Trends in {selected_neighborhood}")
             fig = create_race_stacked_area_plot(race_df, selected_neighborhood)
-            if fig:
-                st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
             
             # Show statistics for the selected neighborhood
             st.subheader("Detailed Statistics")
@@ -515,7 +393,7 @@ def show_race_demographics_analysis():
             if selected_neighborhoods:
                 fig = create_race_comparison_plot(race_df, selected_year, selected_neighborhoods)
                 if fig:
-                    st.plotly_chart(fig, use_container_width=True)
+                    plotly_chart(fig, use_container_width=True)
             else:
                 st.info("Please select at least one neighborhood to display the chart")
         
@@ -534,11 +412,11 @@ def show_race_demographics_analysis():
             
             # Load sales data for the selected year
             with st.spinner(f"Loading {selected_year} sales data..."):
-                sales_df = load_sales_data(selected_year)
+                sales_prices = neighborhood_prices(selected_year)
             
             # Relationship between white percentage and property prices
-            if sales_df is not None:
-                analyze_white_percentage_price_relationship(selected_year, race_df_recent, sales_df)
+            if sales_prices is not None:
+                analyze_white_percentage_price_relationship(selected_year, race_df_recent, sales_prices)
             else:
                 st.warning(f"No sales data found for {selected_year}")
 
@@ -4,62 +4,20 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import json
-import shapely.wkt
 from shapely.geometry import Point
-import geopandas as gpd
-import os
+from utils.price_cube import cube_stats
+from utils.geometry import load_neighborhood_geometries, load_neighborhood_geojson
+from utils.neighborhoods import zip_reference
+from utils.spatial import (
+    ACCESS_RADII_KM, HEXBIN_SIZES_KM, access_metrics, build_point_index, hexbin_levels, join_points,
+)
+from utils.instrumentation import plotly_chart, timed, tracked_cache
+from utils.figure_cache import cached_figure
 
-@st.cache_data
-def get_manhattan_zip_map():
-    return {
-        10001: "Chelsea",
-        10002: "Lower East Side",
-        10003: "East Village",
-        10004: "Financial District",
-        10005: "Financial District",
-        10006: "Financial District",
-        10007: "TriBeCa",
-        10009: "East Village",
-        10010: "Gramercy",
-        10011: "Chelsea",
-        10012: "SoHo/NoHo",
-        10013: "TriBeCa/SoHo",
-        10014: "West Village",
-        10016: "Murray Hill",
-        10017: "Midtown East",
-        10018: "Midtown",
-        10019: "Midtown West",
-        10020: "Midtown",
-        10021: "Upper East Side",
-        10022: "Midtown East",
-        10023: "Upper West Side",
-        10024: "Upper West Side",
-        10025: "Upper West Side",
-        10026: "Harlem",
-        10027: "Harlem",
-        10028: "Upper East Side",
-        10029: "East Harlem",
-        10030: "Harlem",
-        10031: "Hamilton Heights",
-        10032: "Washington Heights",
-        10033: "Washington Heights",
-        10034: "Inwood",
-        10035: "East Harlem",
-        10036: "Hell's Kitchen",
-        10037: "Harlem",
-        10038: "South Street Seaport",
-        10039: "Harlem",
-        10040: "Washington Heights",
-        10044: "Roosevelt Island",
-        10065: "Upper East Side",
-        10069: "Upper West Side",
-        10075: "Upper East Side",
-        10128: "Upper East Side",
-        10280: "Battery Park City",
-        10282: "Battery Park City",
-    }
+# Facility selections larger than this are mapped as counts per hexagon
+RAW_POINTS_MAX = 100
 
-@st.cache_data
+@tracked_cache(st.cache_data)
 def get_neighborhood_coordinates():
     """Return coordinates for Manhattan neighborhoods"""
     return {
@@ -89,59 +47,151 @@ def get_neighborhood_coordinates():
         "Battery Park City": (40.7105, -74.0158),
     }
 
-@st.cache_data
+@tracked_cache(st.cache_data)
 def load_health_facilities():
     file_path = "datasets/Health_Facility_General_Information.csv"       
 
     df = pd.read_csv(file_path)
         
-    df['ZIP_CODE'] = df['Facility Zip Code']   
+    df['ZIP_CODE'] = pd.to_numeric(df['Facility Zip Code'], errors='coerce')
     df['FACILITY_NAME'] = df['Facility Name']
-    df['LATITUDE'] = df['Facility Latitude']
-    df['LONGITUDE'] = df['Facility Longitude']
+    df['LATITUDE'] = pd.to_numeric(df['Facility Latitude'], errors='coerce')
+    df['LONGITUDE'] = pd.to_numeric(df['Facility Longitude'], errors='coerce')
 
-    df['ZIP_CODE'] = pd.to_numeric(df['ZIP_CODE'], errors='coerce')
-        
-    manhattan_zips = list(get_manhattan_zip_map().keys())
-    df_manhattan = df[df['ZIP_CODE'].isin(manhattan_zips)]
-        
-    zip_to_neighborhood = get_manhattan_zip_map()
-    df_manhattan['NEIGHBORHOOD'] = df_manhattan['ZIP_CODE'].map(zip_to_neighborhood)
-        
-    df_manhattan['LATITUDE'] = pd.to_numeric(df_manhattan['LATITUDE'], errors='coerce')
-    df_manhattan['LONGITUDE'] = pd.to_numeric(df_manhattan['LONGITUDE'], errors='coerce')
+    # Neighborhood comes from where the facility is, not the ZIP on its mailing
+    # address; facilities outside the Manhattan MODZCTA polygons are dropped
+    df = join_points(df, 'LONGITUDE', 'LATITUDE', neighborhood_col='NEIGHBORHOOD', scheme='zip')
         
-    df_manhattan = df_manhattan.dropna(subset=['LATITUDE', 'LONGITUDE', 'NEIGHBORHOOD'])
-        
-    return df_manhattan
+    return df.dropna(subset=['NEIGHBORHOOD'])
+
+@tracked_cache(st.cache_data)
+def load_facility_hexbins(neighborhoods=()):
+    """Hexbinned facility counts at every size in HEXBIN_SIZES_KM, for a neighborhood selection"""
+    facilities_df = load_health_facilities()
+    if neighborhoods:
+        facilities_df = facilities_df[facilities_df['NEIGHBORHOOD'].isin(neighborhoods)]
+    return hexbin_levels(facilities_df['LONGITUDE'], facilities_df['LATITUDE'])
 
-@st.cache_data
+@timed("Health.load_geospatial_data")
 def load_geospatial_data():
-    file_path = 'datasets/Modified_Zip_Code_Tabulation_Areas__MODZCTA__20250421.csv'
-            
-    # Load data
-    modzcta_df = pd.read_csv(file_path)
-        
-    # Check if dataset has geometry information
-    if 'the_geom' in modzcta_df.columns:
-        geometries = modzcta_df['the_geom'].apply(shapely.wkt.loads)
-        modzcta_gdf = gpd.GeoDataFrame(modzcta_df, geometry=geometries, crs="EPSG:4326")
-            
-        modzcta_gdf['zipcode'] = modzcta_gdf['MODZCTA'].astype(int)
-            
-        manhattan_zips = list(get_manhattan_zip_map().keys())
-        manhattan_gdf = modzcta_gdf[modzcta_gdf['zipcode'].isin(manhattan_zips)]
-            
-        zip_to_neighborhood = get_manhattan_zip_map()
-        manhattan_gdf['neighborhood'] = manhattan_gdf['zipcode'].map(zip_to_neighborhood)
-            
-        manhattan_gdf['neighborhood'].fillna('Other', inplace=True)
-            
-        manhattan_gdf_dissolved = manhattan_gdf.dissolve(by='neighborhood').reset_index()
-            
-        return manhattan_gdf_dissolved
+    # Dissolved neighborhood polygons, built once and shared with the Price Map page
+    geo_data = load_neighborhood_geometries('zip')
+    
+    if geo_data is None:
+        return None
+    
+    return geo_data[geo_data['neighborhood'] != 'Other']
+
+@cached_figure("Health.create_facility_choropleth")
+def create_facility_choropleth(neighborhood_counts):
+    """Choropleth of facility counts per neighborhood"""
+    geo_data = load_geospatial_data()
+    
+    # Merge facility counts with geo data
+    geo_data_with_counts = geo_data.merge(
+        neighborhood_counts,
+        left_on='neighborhood',
+        right_on='NEIGHBORHOOD',
+        how='left'
+    ).fillna(0)
+    
+    # Choropleth map using neighborhood boundaries
+    fig = px.choropleth_mapbox(
+        geo_data_with_counts,
+        geojson=load_neighborhood_geojson('zip', zoom=11),
+        locations='neighborhood',
+        featureidkey='properties.neighborhood',
+        color='FACILITY_COUNT',
+        color_continuous_scale='Viridis',
+        hover_name='neighborhood',
+        hover_data={'FACILITY_COUNT': True},
+        zoom=11,
+        center={"lat": 40.78, "lon": -73.97},
+        opacity=0.7,
+        labels={'FACILITY_COUNT': 'Number of Facilities'},
+        title="Health Facilities in Manhattan by Neighborhood (2023)"
+    )
     
-    return None
+    # Update layout for better visibility
+    fig.update_layout(
+        mapbox_style="carto-positron",
+        margin={"r": 0, "t": 30, "l": 0, "b": 0},
+        height=700,
+    )
+    
+    return fig
+
+@cached_figure("Health.create_facility_density_map")
+def create_facility_density_map(neighborhoods, hex_size):
+    """Facility counts per hexagon for a neighborhood selection"""
+    bins, hex_geojson = load_facility_hexbins(tuple(neighborhoods))[hex_size]
+    
+    fig = px.choropleth_mapbox(
+        bins,
+        geojson=hex_geojson,
+        locations='hex_id',
+        color='count',
+        color_continuous_scale='Viridis',
+        hover_data={'hex_id': False, 'count': True},
+        zoom=11,
+        center={"lat": 40.78, "lon": -73.97},
+        opacity=0.7,
+        labels={'count': 'Number of Facilities'},
+        title="Health Facility Density in Manhattan (2023)"
+    )
+    fig.update_traces(marker_line_width=0)
+    
+    fig.update_layout(
+        mapbox_style="carto-positron",
+        margin={"r": 0, "t": 30, "l": 0, "b": 0},
+        height=700
+    )
+    
+    return fig
+
+@cached_figure("Health.create_facility_bar_chart")
+def create_facility_bar_chart(sorted_counts):
+    fig = px.bar(
+        sorted_counts,
+        x='NEIGHBORHOOD',
+        y='FACILITY_COUNT',
+        color='FACILITY_COUNT',
+        color_continuous_scale='Viridis',
+        title="Number of Health Facilities by Manhattan Neighborhood (2023)",
+        labels={
+            'NEIGHBORHOOD': 'Neighborhood',
+            'FACILITY_COUNT': 'Number of Facilities'
+        }
+    )
+    
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        xaxis_title="Neighborhood",
+        yaxis_title="Number of Facilities"
+    )
+    
+    return fig
+
+@cached_figure("Health.create_facility_price_treemap")
+def create_facility_price_treemap(merged_df):
+    fig = px.treemap(
+        merged_df,
+        path=['NEIGHBORHOOD'],
+        values='FACILITY_COUNT',
+        color='MEDIAN_PRICE',
+        color_continuous_scale='Blues',
+        hover_data=['MEDIAN_PRICE', 'SALES_COUNT'],
+        title="Neighborhood Comparison: Facility Count (size) vs. Property Price (color)",
+        labels={
+            'NEIGHBORHOOD': 'Neighborhood',
+            'FACILITY_COUNT': 'Facility Count',
+            'MEDIAN_PRICE': 'Median Price ($)'
+        }
+    )
+    
+    fig.update_layout(height=600)
+    
+    return fig
 
 def create_facility_map(facilities_df, geo_data=None):
     
@@ -169,39 +219,8 @@ def create_facility_map(facilities_df, geo_data=None):
         st.subheader("Health Facilities by Manhattan Neighborhood (2023)")
         
         if geo_data is not None:
-            # Merge facility counts with geo data
-            geo_data_with_counts = geo_data.merge(
-                neighborhood_counts,
-                left_on='neighborhood',
-                right_on='NEIGHBORHOOD',
-                how='left'
-            ).fillna(0)
-            
-            # Choropleth map using neighborhood boundaries
-            fig = px.choropleth_mapbox(
-                geo_data_with_counts,
-                geojson=geo_data_with_counts.geometry.__geo_interface__,
-                locations=geo_data_with_counts.index,
-                color='FACILITY_COUNT',
-                color_continuous_scale='Viridis',
-                hover_name='neighborhood',
-                hover_data={'FACILITY_COUNT': True},
-                zoom=11,
-                center={"lat": 40.78, "lon": -73.97},
-                opacity=0.7,
-                labels={'FACILITY_COUNT': 'Number of Facilities'},
-                title="Health Facilities in Manhattan by Neighborhood (2023)"
-            )
-            
-            # Update layout for better visibility
-            fig.update_layout(
-                mapbox_style="carto-positron",
-                margin={"r": 0, "t": 30, "l": 0, "b": 0},
-                height=700,
-            )
-            
-            # Display the map
-            st.plotly_chart(fig, use_container_width=True)
+            # Rebuilt only when the per-neighborhood counts change
+            plotly_chart(create_facility_choropleth(neighborhood_counts), use_container_width=True)
         else:
             # Bubble map using neighborhood centroids
             fig = px.scatter_mapbox(
@@ -228,7 +247,7 @@ def create_facility_map(facilities_df, geo_data=None):
             )
             
 
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(fig, use_container_width=True)
         
         st.subheader("Health Facility Statistics by Neighborhood (2023)")
         
@@ -250,26 +269,7 @@ def create_facility_map(facilities_df, geo_data=None):
         st.markdown("### Distribution by Neighborhood")
         sorted_counts = neighborhood_counts.sort_values('FACILITY_COUNT', ascending=False)
         
-        fig = px.bar(
-            sorted_counts,
-            x='NEIGHBORHOOD',
-            y='FACILITY_COUNT',
-            color='FACILITY_COUNT',
-            color_continuous_scale='Viridis',
-            title="Number of Health Facilities by Manhattan Neighborhood (2023)",
-            labels={
-                'NEIGHBORHOOD': 'Neighborhood',
-                'FACILITY_COUNT': 'Number of Facilities'
-            }
-        )
-        
-        fig.update_layout(
-            xaxis_tickangle=-45,
-            xaxis_title="Neighborhood",
-            yaxis_title="Number of Facilities"
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(create_facility_bar_chart(sorted_counts), use_container_width=True)
         
         st.markdown("### Detailed Neighborhood Facility Counts")
         
@@ -297,33 +297,44 @@ def create_facility_map(facilities_df, geo_data=None):
         
         st.write(f"Displaying {len(filtered_facilities)} facilities")
         
-        fig = px.scatter_mapbox(
-            filtered_facilities,
-            lat='LATITUDE',
-            lon='LONGITUDE',
-            hover_name='FACILITY_NAME',
-            hover_data={
-                'NEIGHBORHOOD': True,
-                'ZIP_CODE': True,
-                'LATITUDE': False,
-                'LONGITUDE': False
-            },
-            zoom=11,
-            center={"lat": 40.78, "lon": -73.97},
-            opacity=0.7,
-            color_discrete_sequence=['green'],
-            title="Health Facility Locations in Manhattan (2023)"
-        )
-        
-        # Update layout for better visibility
-        fig.update_layout(
-            mapbox_style="carto-positron",
-            margin={"r": 0, "t": 30, "l": 0, "b": 0},
-            height=700
-        )
-        
-        # Display the map
-        st.plotly_chart(fig, use_container_width=True)
+        if len(filtered_facilities) <= RAW_POINTS_MAX:
+            fig = px.scatter_mapbox(
+                filtered_facilities,
+                lat='LATITUDE',
+                lon='LONGITUDE',
+                hover_name='FACILITY_NAME',
+                hover_data={
+                    'NEIGHBORHOOD': True,
+                    'ZIP_CODE': True,
+                    'LATITUDE': False,
+                    'LONGITUDE': False
+                },
+                zoom=11,
+                center={"lat": 40.78, "lon": -73.97},
+                opacity=0.7,
+                color_discrete_sequence=['green'],
+                title="Health Facility Locations in Manhattan (2023)"
+            )
+            
+            # Update layout for better visibility
+            fig.update_layout(
+                mapbox_style="carto-positron",
+                margin={"r": 0, "t": 30, "l": 0, "b": 0},
+                height=700
+            )
+            
+            # Display the map
+            plotly_chart(fig, use_container_width=True)
+        else:
+            # Large selections are drawn as facility counts per hexagon
+            hex_size = st.radio(
+                "Hexagon Size:",
+                options=list(HEXBIN_SIZES_KM),
+                index=1,
+                format_func=lambda km: f"{km * 1000:g} m" if km < 1 else f"{km:g} km",
+                horizontal=True
+            )
+            plotly_chart(create_facility_density_map(selected_neighborhoods, hex_size), use_container_width=True)
         
         # Show data table
         try:
@@ -333,59 +344,30 @@ def create_facility_map(facilities_df, geo_data=None):
             display_columns = ['FACILITY_NAME', 'NEIGHBORHOOD', 'ZIP_CODE']
             st.dataframe(filtered_facilities[display_columns], use_container_width=True)
 
-@st.cache_data
-def load_property_data():
-    file_path = "datasets/2023_manhattan.xlsx"
-        
-    if not os.path.exists(file_path):
-        st.warning(f"Property price data file not found: {file_path}")
-        return pd.DataFrame()
-            
-    df = pd.read_excel(file_path)
-        
-    df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce')
-    df = df[df['sale_price'] > 10000]  
+@timed("Health.load_price_stats")
+def load_price_stats():
+    # 2023 sales over $10,000 per ZIP neighborhood, from the pre-aggregated price cube
+    price_stats = cube_stats(2023, 'zip', 'over_10k')
         
-    zip_to_neighborhood = get_manhattan_zip_map()
-    df['NEIGHBORHOOD'] = df['ZIP CODE'].map(zip_to_neighborhood)
+    if price_stats.empty:
+        st.warning("Property price data file not found for 2023")
         
-    df = df.dropna(subset=['NEIGHBORHOOD'])
-        
-    return df
+    price_stats = price_stats[['neighborhood', 'median', 'mean', 'count']]
+    price_stats.columns = ['NEIGHBORHOOD', 'MEDIAN_PRICE', 'MEAN_PRICE', 'SALES_COUNT']
+    return price_stats
 
-def analyze_facility_price_relationship(facilities_df, property_df):
+@timed("Health.analyze_facility_price_relationship")
+def analyze_facility_price_relationship(facilities_df, price_stats):
     
     st.subheader("Health Facilities vs. Property Prices (2023)")
     
     facility_counts = facilities_df.groupby('NEIGHBORHOOD').size().reset_index(name='FACILITY_COUNT')
     
-    price_stats = property_df.groupby('NEIGHBORHOOD').agg({
-        'sale_price': ['median', 'mean', 'count']
-    }).reset_index()
-    
-    price_stats.columns = ['NEIGHBORHOOD', 'MEDIAN_PRICE', 'MEAN_PRICE', 'SALES_COUNT']
-    
     merged_df = pd.merge(facility_counts, price_stats, on='NEIGHBORHOOD', how='inner')
     
     sorted_df = merged_df.sort_values('FACILITY_COUNT', ascending=False)
     
-    fig3 = px.treemap(
-        merged_df,
-        path=['NEIGHBORHOOD'],
-        values='FACILITY_COUNT',
-        color='MEDIAN_PRICE',
-        color_continuous_scale='Blues',
-        hover_data=['MEDIAN_PRICE', 'SALES_COUNT'],
-        title="Neighborhood Comparison: Facility Count (size) vs. Property Price (color)",
-        labels={
-            'NEIGHBORHOOD': 'Neighborhood',
-            'FACILITY_COUNT': 'Facility Count',
-            'MEDIAN_PRICE': 'Median Price ($)'
-        }
-    )
-    
-    fig3.update_layout(height=600)
-    st.plotly_chart(fig3, use_container_width=True)
+    plotly_chart(create_facility_price_treemap(merged_df), use_container_width=True)
     
     # Correlation
     correlation = merged_df['FACILITY_COUNT'].corr(merged_df['MEDIAN_PRICE'])
@@ -423,6 +405,109 @@ def analyze_facility_price_relationship(facilities_df, property_df):
     
     st.dataframe(sorted_display_df, use_container_width=True)
 
+@tracked_cache(st.cache_data)
+def load_zip_price_stats(year=2023):
+    """Median price and sales count of a year's sales over $10,000 per ZIP, at the ZIP centroid"""
+    stats = cube_stats(year, 'zip_code', 'over_10k')
+    if stats.empty:
+        return pd.DataFrame()
+    stats = stats.set_index(stats['neighborhood'].astype('int64'))[['median', 'count']]
+    stats.columns = ['MEDIAN_PRICE', 'SALES_COUNT']
+
+    zip_stats = zip_reference('zip').join(stats, how='inner')
+    zip_stats.index.name = 'ZIP_CODE'
+    return zip_stats.rename(columns={'neighborhood': 'NEIGHBORHOOD'}).reset_index()
+
+@timed("Health.analyze_facility_access")
+def analyze_facility_access(facilities_df, zip_prices):
+    
+    st.subheader("Access to Health Facilities vs. Property Prices (2023)")
+    
+    st.markdown("""
+    Counting facilities per neighborhood ignores where they sit. Here every ZIP code is measured from its
+    center: the distance to the nearest facility of the selected types, and how many lie within walking
+    and short-trip distances. Each ZIP's 2023 median sale price is then compared against those measures.
+    """)
+    
+    facility_types = sorted(facilities_df['Short Description'].dropna().unique())
+    selected_types = st.multiselect(
+        "Facility Types:",
+        options=facility_types,
+        default=facility_types
+    )
+    
+    if not selected_types:
+        st.info("Select at least one facility type.")
+        return
+    
+    selected = facilities_df[facilities_df['Short Description'].isin(selected_types)]
+    access = access_metrics(
+        build_point_index(selected['LONGITUDE'], selected['LATITUDE']),
+        zip_prices['longitude'],
+        zip_prices['latitude']
+    )
+    access_df = pd.concat([zip_prices, access], axis=1)
+    access_df['NEAREST_FACILITY'] = selected['FACILITY_NAME'].to_numpy()[access['nearest']]
+    
+    radius_columns = [f"within_{radius:g}km" for radius in ACCESS_RADII_KM]
+    metric_labels = {'nearest_km': 'Distance to Nearest Facility (km)'}
+    metric_labels.update({
+        column: f"Facilities within {radius:g} km" for column, radius in zip(radius_columns, ACCESS_RADII_KM)
+    })
+    
+    correlations = pd.DataFrame({
+        'Access Measure': list(metric_labels.values()),
+        'Correlation with Median Price': [
+            access_df[column].corr(access_df['MEDIAN_PRICE']) for column in metric_labels
+        ]
+    })
+    
+    fig = px.scatter(
+        access_df,
+        x='nearest_km',
+        y='MEDIAN_PRICE',
+        size='SALES_COUNT',
+        color=radius_columns[-1],
+        color_continuous_scale='Viridis',
+        hover_name='ZIP_CODE',
+        hover_data={'NEIGHBORHOOD': True, 'NEAREST_FACILITY': True},
+        title="ZIP Median Price vs. Distance to the Nearest Selected Facility (size: sales count)",
+        labels={
+            'MEDIAN_PRICE': 'Median Price ($)',
+            'SALES_COUNT': 'Sales',
+            'NEIGHBORHOOD': 'Neighborhood',
+            'NEAREST_FACILITY': 'Nearest Facility',
+            **metric_labels
+        }
+    )
+    
+    fig.update_layout(height=600)
+    plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(
+        correlations.style.format({'Correlation with Median Price': '{:.3f}'}),
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    display_df = access_df[['ZIP_CODE', 'NEIGHBORHOOD', 'NEAREST_FACILITY', 'nearest_km'] + radius_columns
+                           + ['MEDIAN_PRICE', 'SALES_COUNT']].copy()
+    display_df['MEDIAN_PRICE'] = display_df['MEDIAN_PRICE'].apply(lambda x: f"${x:,.2f}")
+    display_df = display_df.rename(columns={
+        'ZIP_CODE': 'ZIP Code',
+        'NEIGHBORHOOD': 'Neighborhood',
+        'NEAREST_FACILITY': 'Nearest Facility',
+        'MEDIAN_PRICE': 'Median Property Price',
+        'SALES_COUNT': 'Property Sales Count',
+        **metric_labels
+    })
+    
+    st.dataframe(
+        display_df.sort_values('Distance to Nearest Facility (km)').round(2),
+        hide_index=True,
+        use_container_width=True
+    )
+
 def show():
     """Display Manhattan health facilities map and analysis"""
     st.title("Manhattan Health Facilities Interactive Map (2023)")
@@ -440,7 +525,7 @@ def show():
         geo_data = load_geospatial_data()
     
     with st.spinner("Loading property price data..."):
-        property_df = load_property_data()
+        price_stats = load_price_stats()
     
     tab1, tab2 = st.tabs(["Facility Distribution", "Facility vs. Property Prices"])
     
@@ -450,8 +535,12 @@ def show():
         create_facility_map(facilities_df, geo_data)
     
     with tab2:
-        if not property_df.empty and not facilities_df.empty:
-            analyze_facility_price_relationship(facilities_df, property_df)
+        if not price_stats.empty and not facilities_df.empty:
+            analyze_facility_price_relationship(facilities_df, price_stats)
+            
+            zip_prices = load_zip_price_stats()
+            if not zip_prices.empty:
+                analyze_facility_access(facilities_df, zip_prices)
         else:
             st.error("Cannot perform analysis: Missing property price data or facility data")
 
@@ -1,16 +1,12 @@
 import streamlit as st
-import base64
 import os
-
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+from utils.images import responsive_background_css
 
 def show():
     image_path = os.path.join("img", "New-York.jpg")
     
-    img_base64 = get_base64_of_bin_file(image_path)
+    # Resized WebP/JPEG variants served from static/, picked per viewport width
+    background_css = responsive_background_css(".image-div", image_path)
     
     page_bg_img = f'''
     <style>
@@ -31,7 +27,6 @@ def show():
     }}
     .image-div {{
         flex: 1;
-        background-image: url("data:image/jpeg;base64,{img_base64}");
         background-size: cover;
         background-position: center;
         height: 100%;
@@ -43,6 +38,7 @@ def show():
         justify-content: center;
         padding: 2rem;
     }}
+    {background_css}
     </style>
     '''
     st.markdown(page_bg_img, unsafe_allow_html=True)
@@ -3,220 +3,121 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import os
 from utils.data_loader import load_data
+from utils.price_cube import cube_stats, cube_years, load_price_cube
+from utils.instrumentation import plotly_chart, tracked_cache
+from utils.figure_cache import cached_figure
 
-def show():
-    st.title("Manhattan Property Price Changes (2015-2023)")
-    
+@tracked_cache(st.cache_data, show_spinner=False)
+def load_yearly_data():
+    """Per-year consolidated neighborhood stats from the price cube; returns (yearly_data, failed years)"""
+    _, failures = load_price_cube()
+    yearly_data = {}
 
-    @st.cache_data
-    def load_yearly_data():
-        years = list(range(2015, 2024)) 
-        yearly_data = {}
-        neighborhood_mapping = get_neighborhood_mapping()
-        
-        for year in years:
-            file_path = None
-            if year <= 2017:
-                temp_path = f"datasets/{year}_manhattan.xls"
-                if os.path.exists(temp_path):
-                    file_path = temp_path
-            else:
-                temp_path = f"datasets/{year}_manhattan.xlsx"
-                if os.path.exists(temp_path):
-                    file_path = temp_path
-            
-            if not file_path:
-                for ext in ['.xlsx', '.xls']:
-                    temp_path = f"datasets/{year}_manhattan{ext}"
-                    if os.path.exists(temp_path):
-                        file_path = temp_path
-                        break
-                
-            try:
-                df = pd.read_excel(file_path)
-                
-                if 'sale_price' in df.columns:
-                    df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce')
-                else:
-                    price_candidates = [col for col in df.columns if 'price' in str(col).lower() or 'sale' in str(col).lower()]
-                    if price_candidates:
-                        df['sale_price'] = pd.to_numeric(df[price_candidates[0]], errors='coerce')
-                    else:
-                        continue
-                
-                df = df[df['sale_price'] > 10000]
-                
-                if 'neighborhood' in df.columns:
-                    df['consolidated_neighborhood'] = df['neighborhood'].map(
-                        lambda x: next((v for k, v in neighborhood_mapping.items() 
-                                      if k in str(x).upper()), None)
-                    )
-                else:
-                    zip_col = None
-                    
-                    if 'ZIP CODE' in df.columns:
-                        zip_col = 'ZIP CODE'
-                    
-                    if not zip_col:
-                        zip_variations = ['ZIP', 'ZIPCODE', 'Zip Code', 'zip_code', 'zip', 'Zip']
-                        for col in zip_variations:
-                            if col in df.columns:
-                                zip_col = col
-                                break
-                    
-                    if not zip_col:
-                        for col in df.columns:
-                            if 'zip' in str(col).lower():
-                                zip_col = col
-                                break
-                    
+    for year in cube_years('consolidated', 'over_10k'):
+        stats = cube_stats(year, 'consolidated', 'over_10k')
+        neighborhood_stats = stats[['neighborhood', 'median', 'mean', 'count']].rename(
+            columns={'median': 'median_price', 'mean': 'mean_price'}
+        )
+        neighborhood_stats['year'] = year
+        yearly_data[year] = neighborhood_stats
 
-                    if zip_col:
-                        zip_to_neighborhood = get_zip_to_neighborhood_mapping()
-                        def safe_map(code):
-                            try:
-                                int_code = int(float(code))
-                                return zip_to_neighborhood.get(int_code, None)
-                            except (ValueError, TypeError):
-                                return None
-                        
-                        # Apply the mapping
-                        df['consolidated_neighborhood'] = df[zip_col].apply(safe_map)
-                
-                df = df.dropna(subset=['consolidated_neighborhood'])
-                
-                neighborhood_stats = df.groupby('consolidated_neighborhood').agg({
-                    'sale_price': ['median', 'mean', 'count']
-                }).reset_index()
-                
-                neighborhood_stats.columns = ['neighborhood', 'median_price', 'mean_price', 'count']
-                
-                neighborhood_stats['year'] = year
-                
-                yearly_data[year] = neighborhood_stats
-                
-            except Exception as e:
-                pass
-        
-        return yearly_data
+    return yearly_data, failures
+
+
+@cached_figure("Pricechanges.create_price_trend_chart")
+def create_price_trend_chart(filtered_data, price_metric):
+    """Price per year, one line per neighborhood"""
+    fig = px.line(
+        filtered_data,
+        x="year",
+        y=price_metric,
+        color="neighborhood",
+        markers=True,
+        title=f"{'Median' if price_metric == 'median_price' else 'Mean'} Price by Neighborhood (2015-2023)",
+        labels={
+            "year": "Year",
+            price_metric: f"{'Median' if price_metric == 'median_price' else 'Mean'} Price ($)",
+            "neighborhood": "Neighborhood"
+        },
+        template="plotly_white" 
+    )
     
-    def get_neighborhood_mapping():
-        """Define the consolidated neighborhoods - using the same mapping as in other modules"""
-        return {
-            'UPPER EAST SIDE (59-79)': 'Upper East Side',
-            'UPPER EAST SIDE (79-96)': 'Upper East Side',
-            'UPPER EAST SIDE (96-110)': 'Upper East Side',
-            'ROOSEVELT ISLAND': 'Upper East Side',
-            'YORKVILLE': 'Upper East Side',
-            
-            'UPPER WEST SIDE (59-79)': 'Upper West Side', 
-            'UPPER WEST SIDE (79-96)': 'Upper West Side',
-            'UPPER WEST SIDE (96-116)': 'Upper West Side',
-            'MANHATTAN VALLEY': 'Upper West Side',
-            'LINCOLN CENTER': 'Upper West Side',
-            
-            'MIDTOWN EAST': 'Midtown East',
-            'MURRAY HILL': 'Midtown East',
-            'SUTTON PLACE': 'Midtown East',
-            
-            'MIDTOWN WEST': 'Midtown',
-            'MIDTOWN CBD': 'Midtown',
-            'CLINTON': 'Midtown',
-            "HELL'S KITCHEN": "Midtown",
-            'FASHION': 'Midtown',
-            
-            'GRAMERCY': 'Gramercy',
-            'KIPS BAY': 'Gramercy',
-            'FLATIRON': 'Gramercy',
-            
-            'GREENWICH VILLAGE-CENTRAL': 'Greenwich Village', 
-            'GREENWICH VILLAGE-WEST': 'Greenwich Village',
-            'WEST VILLAGE': 'Greenwich Village',
-            
-            'CHELSEA': 'Chelsea',
-            
-            'SOHO': 'SoHo/TriBeCa',
-            'TRIBECA': 'SoHo/TriBeCa',
-            'LITTLE ITALY': 'SoHo/TriBeCa',
-            
-            'FINANCIAL': 'Financial District',
-            'CIVIC CENTER': 'Financial District',
-            'SEAPORT': 'Financial District',
-            'SOUTHBRIDGE': 'Financial District',
-            
-            'BATTERY PARK CITY': 'Battery Park City',
-            
-            'EAST VILLAGE': 'East Village',
-            'ALPHABET CITY': 'East Village',
-            
-            'LOWER EAST SIDE': 'Lower East Side',
-            'CHINATOWN': 'Lower East Side',
-            
-            'HARLEM-CENTRAL': 'Harlem',
-            'HARLEM-EAST': 'Harlem',
-            'HARLEM-UPPER': 'Harlem',
-            'HARLEM-WEST': 'Harlem',
-            'MORNINGSIDE HEIGHTS': 'Harlem',
-            
-            'WASHINGTON HEIGHTS LOWER': 'Washington Heights',
-            'WASHINGTON HEIGHTS UPPER': 'Washington Heights',
-            'INWOOD': 'Washington Heights'
-        }
+    fig.update_layout(
+        yaxis=dict(
+            tickprefix="$",
+            tickformat=",",
+        ),
+        xaxis=dict(
+            tickmode='array',
+            tickvals=list(range(2015, 2024)),
+        ),
+        height=600,
+        legend=dict(
+            title="",
+            orientation="v",
+            yanchor="top",
+            y=0.99,
+            xanchor="right",
+            x=0.99,
+            bgcolor="rgba(255, 255, 255, 0.8)",
+            bordercolor="rgba(0, 0, 0, 0.3)",
+            borderwidth=1
+        )
+    )
     
-    def get_zip_to_neighborhood_mapping():
-        """Create ZIP code to neighborhood mapping"""
-        return {
-            10001: "Chelsea",
-            10002: "Lower East Side",
-            10003: "East Village",
-            10004: "Financial District",
-            10005: "Financial District",
-            10006: "Financial District",
-            10007: "SoHo/TriBeCa",
-            10009: "East Village",
-            10010: "Gramercy",
-            10011: "Chelsea",
-            10012: "SoHo/TriBeCa",
-            10013: "SoHo/TriBeCa",
-            10014: "Greenwich Village",
-            10016: "Gramercy",
-            10017: "Midtown East",
-            10018: "Midtown",
-            10019: "Midtown",
-            10020: "Midtown",
-            10021: "Upper East Side",
-            10022: "Midtown East",
-            10023: "Upper West Side",
-            10024: "Upper West Side",
-            10025: "Upper West Side",
-            10026: "Harlem",
-            10027: "Harlem",
-            10028: "Upper East Side",
-            10029: "Harlem",
-            10030: "Harlem",
-            10031: "Harlem",
-            10032: "Washington Heights",
-            10033: "Washington Heights",
-            10034: "Washington Heights",
-            10035: "Harlem",
-            10036: "Midtown",
-            10037: "Harlem",
-            10038: "Financial District",
-            10039: "Harlem",
-            10040: "Washington Heights",
-            10044: "Upper East Side",
-            10065: "Upper East Side",
-            10069: "Upper West Side",
-            10075: "Upper East Side",
-            10128: "Upper East Side",
-            10280: "Battery Park City",
-            10282: "Battery Park City",
+    return fig
+
+
+@cached_figure("Pricechanges.create_price_change_chart")
+def create_price_change_chart(comparison_data, year1, year2):
+    """Percentage price change between two years per neighborhood"""
+    fig = px.bar(
+        comparison_data,
+        x='neighborhood',
+        y=f'change_{year1}_to_{year2}',
+        color=f'change_{year1}_to_{year2}',
+        color_continuous_scale='RdBu_r', 
+        title=f"Price Change from {year1} to {year2} by Neighborhood",
+        labels={
+            'neighborhood': 'Neighborhood',
+            f'change_{year1}_to_{year2}': 'Price Change (%)'
         }
+    )
+    
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        yaxis_title="Price Change (%)",
+        coloraxis_showscale=False,
+        height=500
+    )
+    
+    fig.add_shape(
+        type="line",
+        x0=-0.5,
+        y0=0,
+        x1=len(comparison_data) - 0.5,
+        y1=0,
+        line=dict(
+            color="black",
+            width=1,
+            dash="dash",
+        )
+    )
+    
+    return fig
+
+
+def show():
+    st.title("Manhattan Property Price Changes (2015-2023)")
     
-    with st.spinner("Loading data for all years (2018-2023)..."):
-        yearly_data = load_yearly_data()
+
+    with st.spinner("Loading data for all years (2015-2023)..."):
+        yearly_data, failed_years = load_yearly_data()
+
+    if failed_years:
+        details = "; ".join(f"{year} ({reason})" for year, reason in sorted(failed_years.items()))
+        st.warning(f"Some years could not be loaded and are left out: {details}")
     
     
     st.markdown("""
@@ -267,46 +168,7 @@ def show():
         if filtered_data.empty:
             st.warning("No data available for the selected filters.")
         else:
-            # Create line chart
-            fig = px.line(
-                filtered_data,
-                x="year",
-                y=price_metric,
-                color="neighborhood",
-                markers=True,
-                title=f"{'Median' if price_metric == 'median_price' else 'Mean'} Price by Neighborhood (2015-2023)",
-                labels={
-                    "year": "Year",
-                    price_metric: f"{'Median' if price_metric == 'median_price' else 'Mean'} Price ($)",
-                    "neighborhood": "Neighborhood"
-                },
-                template="plotly_white" 
-            )
-            
-            fig.update_layout(
-                yaxis=dict(
-                    tickprefix="$",
-                    tickformat=",",
-                ),
-                xaxis=dict(
-                    tickmode='array',
-                    tickvals=list(range(2015, 2024)),
-                ),
-                height=600,
-                legend=dict(
-                    title="",
-                    orientation="v",
-                    yanchor="top",
-                    y=0.99,
-                    xanchor="right",
-                    x=0.99,
-                    bgcolor="rgba(255, 255, 255, 0.8)",
-                    bordercolor="rgba(0, 0, 0, 0.3)",
-                    borderwidth=1
-                )
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            plotly_chart(create_price_trend_chart(filtered_data, price_metric), use_container_width=True)
             
             st.markdown("""
             <p style="font-size: 20px;">
@@ -375,7 +237,9 @@ def show():
             with col2:
                 year2 = st.selectbox("Select Second Year", options=years_available, index=len(years_available)-1)
             
-            if year1 in yearly_data and year2 in yearly_data:
+            if year1 == year2:
+                st.info("Select two different years to compare.")
+            elif year1 in yearly_data and year2 in yearly_data:
                 data_year1 = yearly_data[year1]
                 data_year2 = yearly_data[year2]
                 
@@ -399,40 +263,7 @@ def show():
                 
                 comparison_data = comparison_data.sort_values(f'change_{year1}_to_{year2}', ascending=False)
                 
-                fig = px.bar(
-                    comparison_data,
-                    x='neighborhood',
-                    y=f'change_{year1}_to_{year2}',
-                    color=f'change_{year1}_to_{year2}',
-                    color_continuous_scale='RdBu_r', 
-                    title=f"Price Change from {year1} to {year2} by Neighborhood",
-                    labels={
-                        'neighborhood': 'Neighborhood',
-                        f'change_{year1}_to_{year2}': 'Price Change (%)'
-                    }
-                )
-                
-                fig.update_layout(
-                    xaxis_tickangle=-45,
-                    yaxis_title="Price Change (%)",
-                    coloraxis_showscale=False,
-                    height=500
-                )
-                
-                fig.add_shape(
-                    type="line",
-                    x0=-0.5,
-                    y0=0,
-                    x1=len(comparison_data) - 0.5,
-                    y1=0,
-                    line=dict(
-                        color="black",
-                        width=1,
-                        dash="dash",
-                    )
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                plotly_chart(create_price_change_chart(comparison_data, year1, year2), use_container_width=True)
                 
                 st.markdown("""
                 <p style="font-size: 20px;">
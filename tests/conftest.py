@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+
+# The pages read datasets/ relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,38 @@
+# tests/test_benchmarks.py
+import pytest
+
+from benchmarks.harness import (MIN_MB_DELTA, MIN_SECONDS_DELTA, compare, format_report, load_baseline,
+                                save_baseline)
+
+BASELINE = {'case@1x': {'seconds': 0.1, 'peak_mb': 10.0}}
+
+
+@pytest.mark.parametrize('seconds, peak_mb, status', [
+    (0.1, 10.0, 'ok'),
+    (0.149, 14.9, 'ok'),                             # under the 50% threshold
+    (0.2, 10.0, 'REGRESSION'),
+    (0.1, 20.0, 'REGRESSION'),
+    (0.01 + MIN_SECONDS_DELTA / 2, 10.0, 'ok'),      # faster is never a regression
+])
+def test_compare_flags_slower_or_bigger_cases(seconds, peak_mb, status):
+    rows = compare({'case@1x': {'seconds': seconds, 'peak_mb': peak_mb}}, BASELINE)
+    assert rows == [('case@1x', seconds, 0.1, peak_mb, 10.0, status)]
+
+
+def test_small_absolute_changes_are_noise():
+    baseline = {'tiny@1x': {'seconds': 0.001, 'peak_mb': 0.1}}
+    result = {'tiny@1x': {'seconds': 0.001 + MIN_SECONDS_DELTA / 2, 'peak_mb': 0.1 + MIN_MB_DELTA / 2}}
+    assert compare(result, baseline)[0][-1] == 'ok'
+
+
+def test_cases_missing_from_the_baseline_are_new():
+    rows = compare({'other@10x': {'seconds': 1.0, 'peak_mb': 1.0}}, BASELINE)
+    assert rows[0][-1] == 'new'
+    assert 'new' in format_report(rows)
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / 'baseline.json'
+    assert load_baseline(str(path)) == {}
+    save_baseline(BASELINE, str(path))
+    assert load_baseline(str(path)) == BASELINE
@@ -0,0 +1,18 @@
+# tests/test_dataoverview.py
+from streamlit.testing.v1 import AppTest
+
+PAGE = "from modules._DataOverview import show\nshow()\n"
+
+
+def test_download_is_only_attached_in_the_rerun_that_prepared_it():
+    at = AppTest.from_string(PAGE, default_timeout=120).run()
+    assert not at.get('download_button')
+
+    prepare = next(button for button in at.button if button.label == "Prepare Download")
+    prepare.click().run()
+    assert not at.exception
+    assert len(at.get('download_button')) == 1
+
+    # Any other rerun leaves the file alone
+    at.run()
+    assert not at.get('download_button')
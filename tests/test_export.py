@@ -0,0 +1,102 @@
+# tests/test_export.py
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import export
+from utils.export import export_rows, filter_fingerprint
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'neighborhood': rng.choice(['CHELSEA', 'SOHO', None], 500),
+        'ZIP CODE': rng.integers(10001, 10040, 500),
+        'sale_price': rng.integers(0, 5000000, 500).astype(float),
+    })
+
+
+@pytest.mark.parametrize('fmt', ['CSV', 'CSV (gzip)', 'Parquet'])
+def test_export_matches_selected_rows(tmp_path, sales, fmt):
+    positions = np.flatnonzero(sales['sale_price'] > 1000000)[::-1]
+    path = export_rows(sales, positions, 'sel', fmt, export_dir=tmp_path, chunk_rows=37)
+
+    if fmt == 'Parquet':
+        written = pd.read_parquet(path)
+    else:
+        written = pd.read_csv(path)
+    expected = sales.iloc[positions].reset_index(drop=True)
+    # CSV reads missing names back as NaN and Parquet as None
+    pd.testing.assert_frame_equal(written.fillna(-1), expected.fillna(-1), check_dtype=False)
+
+
+def test_empty_selection_keeps_header(tmp_path, sales):
+    path = export_rows(sales, np.array([], dtype=int), 'none', 'CSV', export_dir=tmp_path)
+    assert list(pd.read_csv(path).columns) == list(sales.columns)
+
+
+def test_cached_export_is_reused(tmp_path, sales):
+    first = export_rows(sales, np.arange(10), 'same', 'CSV', export_dir=tmp_path)
+    # Different rows under the same fingerprint: the cached file wins
+    second = export_rows(sales, np.arange(20), 'same', 'CSV', export_dir=tmp_path)
+    assert first == second
+    assert len(pd.read_csv(second)) == 10
+
+
+def test_fingerprint_depends_on_every_parameter():
+    base = filter_fingerprint(price_range=(0, 10), neighborhoods=['A'])
+    assert base == filter_fingerprint(neighborhoods=['A'], price_range=(0, 10))
+    assert base != filter_fingerprint(price_range=(0, 11), neighborhoods=['A'])
+    assert base != filter_fingerprint(price_range=(0, 10), neighborhoods=['A', 'B'])
+
+
+def test_eviction_keeps_most_recent(tmp_path, sales, monkeypatch):
+    monkeypatch.setattr(export, 'MAX_EXPORTS', 3)
+    for i in range(5):
+        path = export_rows(sales, np.arange(5), f"f{i}", 'CSV', export_dir=tmp_path)
+        os.utime(path, (i, i))
+    export_rows(sales, np.arange(5), 'f5', 'CSV', export_dir=tmp_path)
+    assert sorted(os.listdir(tmp_path)) == ['f3.csv', 'f4.csv', 'f5.csv']
+
+
+def test_eviction_skips_files_removed_by_another_session(tmp_path, monkeypatch):
+    for name in ['a.csv', 'b.csv', 'c.csv']:
+        (tmp_path / name).write_text('x')
+    getmtime = os.path.getmtime
+
+    def vanishing_getmtime(path):
+        if path.endswith('b.csv'):
+            os.remove(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, 'getmtime', vanishing_getmtime)
+    export._evict_old_exports(str(tmp_path), keep=1)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_sessions_exporting_the_same_selection_at_once(tmp_path, sales):
+    # Sessions are threads of one process; each must write its own temporary file
+    positions = np.arange(0, 500, 3)
+    results, errors = [], []
+
+    def export():
+        try:
+            results.append(export_rows(sales, positions, 'same', 'CSV', export_dir=tmp_path, chunk_rows=7))
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=export) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(results) == {str(tmp_path / 'same.csv')}
+    assert os.listdir(tmp_path) == ['same.csv']
+    expected = sales.iloc[positions].reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.read_csv(results[0]).fillna(-1), expected.fillna(-1), check_dtype=False)
@@ -0,0 +1,135 @@
+# tests/test_figure_cache.py
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from streamlit.testing.v1 import AppTest
+
+from utils import figure_cache as fc
+from utils.figure_cache import FigureCache, cached_figure, fingerprint
+
+
+def test_lru_evicts_least_recently_used_first():
+    cache = FigureCache(max_bytes=30)
+    for key in 'abc':
+        cache.put(key, key.upper(), 10)
+    assert cache.get('a') == 'A'          # 'b' is now the oldest
+    cache.put('d', 'D', 10)
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert cache.nbytes == 30
+
+
+def test_memory_cap_is_kept():
+    cache = FigureCache(max_bytes=100)
+    for i in range(50):
+        cache.put(i, i, 7 + i % 5)
+        assert cache.nbytes <= 100
+    assert cache.nbytes == sum(7 + i % 5 for i in range(50)[-len(cache):])
+
+
+def test_entries_larger_than_the_cap_are_not_stored():
+    cache = FigureCache(max_bytes=10)
+    cache.put('small', 1, 5)
+    cache.put('huge', 2, 11)
+    assert cache.get('huge') is None
+    assert cache.get('small') == 1
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = FigureCache(max_bytes=100)
+    cache.put('a', 1, 40)
+    cache.put('a', 2, 10)
+    assert (cache.get('a'), cache.nbytes, len(cache)) == (2, 10, 1)
+
+
+def test_fingerprint_tracks_values_dtypes_and_names():
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    assert fingerprint(df) == fingerprint(df.copy())
+    assert fingerprint(df) != fingerprint(df.assign(a=[1, 3]))
+    assert fingerprint(df) != fingerprint(df.astype({'a': 'float64'}))
+    assert fingerprint(df[['a']]) != fingerprint(df[['a']].rename(columns={'a': 'z'}))
+    assert fingerprint(np.arange(6)) != fingerprint(np.arange(6).reshape(2, 3))
+    assert fingerprint(['x'], {'k': 1}) != fingerprint(['y'], {'k': 1})
+    assert fingerprint({'k': 1, 'j': 2}) == fingerprint({'j': 2, 'k': 1})
+
+
+def test_cached_figure_builds_once_per_input(monkeypatch):
+    monkeypatch.setattr(fc, 'figure_cache', FigureCache(2 ** 20))
+    builds = []
+
+    @cached_figure("test.bar")
+    def bar(df):
+        builds.append(len(df))
+        return go.Figure(go.Bar(x=df['x'], y=df['y']))
+
+    df = pd.DataFrame({'x': ['a', 'b'], 'y': [1, 2]})
+    first = bar(df)
+    assert bar(df.copy()) is first
+    bar(df.assign(y=[3, 4]))
+    assert builds == [2, 2]
+
+
+def test_cached_figure_is_serialized_once(monkeypatch):
+    monkeypatch.setattr(fc, 'figure_cache', FigureCache(2 ** 20))
+    built = go.Figure(go.Scatter(x=np.arange(5), y=np.linspace(0, 1, 5), name='line'))
+    built.update_layout(title="Line")
+
+    @cached_figure("test.line")
+    def line():
+        return built
+
+    fig = line()
+    assert fig.to_dict() == json.loads(pio.to_json(built, validate=False))
+    assert fc.figure_cache.nbytes == len(fig.to_json())
+    # Every render gets its own copy of the stored JSON
+    fig.to_dict()['layout']['title']['text'] = "Changed"
+    assert line().to_dict()['layout']['title']['text'] == "Line"
+
+
+def _chart_in_column():
+    import plotly.graph_objects as go
+    import streamlit as st
+    from utils.figure_cache import cached_figure
+    from utils.instrumentation import plotly_chart
+
+    @cached_figure("test.column_chart")
+    def chart():
+        return go.Figure(go.Bar(x=['a'], y=[1]))
+
+    st.markdown("main")
+    with st.columns(2)[1]:
+        plotly_chart(chart())
+
+
+def test_cached_chart_renders_in_the_active_container():
+    at = AppTest.from_function(_chart_in_column).run()
+    assert not at.exception
+    # Cached on the first run, so this rerun draws the stored figure
+    at.run()
+    column = at.columns[1]
+    assert len(column.get('plotly_chart')) == 1
+    assert len(at.main.get('plotly_chart')) == 1
+
+
+def _cached_and_fresh_chart():
+    import plotly.graph_objects as go
+    from utils.figure_cache import cached_figure
+    from utils.instrumentation import plotly_chart
+
+    def build():
+        return go.Figure(go.Bar(x=['a', 'b'], y=[1.5, 2]), layout={'title': "Bars"})
+
+    plotly_chart(cached_figure("test.same_chart")(build)(), key='cached')
+    plotly_chart(build(), key='fresh')
+
+
+def test_cached_chart_sends_the_same_spec_as_the_figure():
+    at = AppTest.from_function(_cached_and_fresh_chart).run()
+    at.run()
+    assert not at.exception
+    cached, fresh = at.get('plotly_chart')
+    assert cached.proto.spec == fresh.proto.spec
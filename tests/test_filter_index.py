@@ -0,0 +1,54 @@
+# tests/test_filter_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filter_index import build_filter_index, query_filter_index
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    prices = rng.integers(0, 40, 2000) * 50000.0
+    prices[rng.random(2000) < 0.05] = np.nan
+    return pd.DataFrame({
+        'neighborhood': rng.choice(['CHELSEA', 'SOHO', 'HARLEM', None], 2000),
+        'sale_price': prices,
+    })
+
+
+def _pandas_filter(df, low, high, groups):
+    mask = pd.Series(True, index=df.index)
+    if low is not None:
+        mask &= df['sale_price'] >= low
+    if high is not None:
+        mask &= df['sale_price'] <= high
+    if groups:
+        mask &= df['neighborhood'].isin(groups)
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('low, high, groups', [
+    (None, None, None),
+    (500000, 1000000, None),
+    (500000, 500000, None),   # both bounds inclusive
+    (None, 250000, ['SOHO']),
+    (1000000, None, ['CHELSEA', 'HARLEM']),
+    (0, 2000000, ['NOT A NEIGHBORHOOD']),
+    (3000000, 1000000, ['SOHO']),
+])
+def test_query_matches_pandas_filter(sales, low, high, groups):
+    index = build_filter_index(sales)
+    rows = query_filter_index(index, low, high, groups)
+    if low is None and high is None:
+        # An unbounded range keeps rows without a price, which a comparison would drop
+        expected = np.flatnonzero(sales['neighborhood'].isin(groups)) if groups else np.arange(len(sales))
+    else:
+        expected = _pandas_filter(sales, low, high, groups)
+    np.testing.assert_array_equal(rows, expected)
+
+
+def test_empty_frame():
+    index = build_filter_index(pd.DataFrame({'neighborhood': [], 'sale_price': []}))
+    assert len(query_filter_index(index, 0, 10)) == 0
+    assert len(query_filter_index(index, groups=['SOHO'])) == 0
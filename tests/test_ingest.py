@@ -0,0 +1,51 @@
+# tests/test_ingest.py
+import os
+import threading
+
+from utils.ingest import write_atomic
+
+
+def test_concurrent_writers_each_get_their_own_temp_file(tmp_path):
+    target = str(tmp_path / 'out.txt')
+    writers = 4
+    barrier = threading.Barrier(writers)
+    errors = []
+
+    def write(path):
+        with open(path, 'w') as f:
+            f.write('a' * 1000)
+            f.flush()
+            barrier.wait()  # every writer has its temporary file open at once
+            f.write('b' * 1000)
+
+    def run():
+        try:
+            write_atomic(write, target)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(target) as f:
+        assert f.read() == 'a' * 1000 + 'b' * 1000
+    assert os.listdir(tmp_path) == ['out.txt']
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    target = str(tmp_path / 'out.txt')
+
+    def fail(path):
+        with open(path, 'w') as f:
+            f.write('partial')
+        raise ValueError("write failed")
+
+    try:
+        write_atomic(fail, target)
+    except ValueError:
+        pass
+    assert os.listdir(tmp_path) == []
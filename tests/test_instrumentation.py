@@ -0,0 +1,36 @@
+# tests/test_instrumentation.py
+import streamlit as st
+
+from utils.instrumentation import finish_rerun, start_rerun, timed, tracked_cache
+
+
+@tracked_cache(st.cache_data)
+def _square(x):
+    return x * x
+
+
+@tracked_cache(st.cache_data)
+def _sum_of_squares(n):
+    return sum(_square(i) for i in range(n))
+
+
+def test_rerun_counts_hits_misses_and_calls(monkeypatch):
+    monkeypatch.setattr('utils.instrumentation.LOG_RERUNS', False)
+    _square.clear()
+    _sum_of_squares.clear()
+
+    start_rerun('test')
+    assert [_square(x) for x in (2, 2, 3, 2)] == [4, 4, 9, 4]
+    # The outer call misses; the inner calls hit or miss on their own
+    assert _sum_of_squares(4) == 14
+    assert _sum_of_squares(4) == 14
+    with timed('test.block'):
+        pass
+    summary = finish_rerun()
+
+    assert summary['page'] == 'test'
+    assert summary['cache']['test_instrumentation._square'] == {'hits': 4, 'misses': 4}
+    assert summary['cache']['test_instrumentation._sum_of_squares'] == {'hits': 1, 'misses': 1}
+    assert summary['timings']['test_instrumentation._square']['calls'] == 8
+    assert summary['timings']['test.block']['calls'] == 1
+    assert finish_rerun() is None
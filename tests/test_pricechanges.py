@@ -0,0 +1,14 @@
+# tests/test_pricechanges.py
+from streamlit.testing.v1 import AppTest
+
+PAGE = "from modules._Pricechanges import show\nshow()\n"
+
+
+def test_same_year_comparison_shows_a_note():
+    at = AppTest.from_string(PAGE, default_timeout=120).run()
+    first = next(s for s in at.selectbox if s.label == "Select First Year")
+    second = next(s for s in at.selectbox if s.label == "Select Second Year")
+    second.set_value(first.value).run()
+
+    assert not at.exception
+    assert "Select two different years to compare." in [info.value for info in at.info]
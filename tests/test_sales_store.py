@@ -0,0 +1,82 @@
+# tests/test_sales_store.py
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from utils.sales_store import POOL_START_METHOD, apply_sales_schema, map_sales_years, read_sales_year
+
+
+def _plain(values):
+    """Values as Python objects with every kind of missing value as None"""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+# 2017 is a legacy .xls, 2019 has the misspelled neighborhood header
+@pytest.mark.parametrize('year', [2017, 2019, 2023])
+def test_compact_frame_holds_the_same_values(year):
+    compact = read_sales_year(year)
+    plain = read_sales_year(year, compact=False)
+
+    assert list(compact.columns) == list(plain.columns)
+    pd.testing.assert_index_equal(compact.index, plain.index)
+    for col in compact.columns:
+        if pd.api.types.is_numeric_dtype(plain[col]) and pd.api.types.is_numeric_dtype(compact[col]):
+            np.testing.assert_array_equal(compact[col].to_numpy(float, na_value=np.nan),
+                                          plain[col].to_numpy(float, na_value=np.nan), err_msg=col)
+        else:
+            assert _plain(compact[col]) == _plain(plain[col]), col
+    neighborhood = [col for col in compact.columns if str(col).strip() in ('neighborhood', 'neighorhood')]
+    assert isinstance(compact[neighborhood[0]].dtype, pd.CategoricalDtype)
+
+
+def test_values_that_do_not_fit_keep_their_type():
+    df = pd.DataFrame({
+        'BOROUGH': [1, 300],                 # past uint8
+        'ZIP CODE': ['10001', 'unknown'],    # not all numbers
+        ' ZIP CODE': [10001.0, np.nan],      # missing values use the nullable type
+    })
+    out = apply_sales_schema(df.copy())
+    assert out['BOROUGH'].dtype == df['BOROUGH'].dtype
+    assert out['ZIP CODE'].tolist() == ['10001', 'unknown']
+    assert str(out[' ZIP CODE'].dtype) == 'UInt32'
+
+
+def _worker_process(year):
+    return os.getpid(), multiprocessing.get_start_method()
+
+
+def test_pool_workers_are_not_forked_from_the_server():
+    results = {year: result for year, result, error in map_sales_years(_worker_process, [2022, 2023], max_workers=2)}
+    assert sorted(results) == [2022, 2023]
+    assert all(pid != os.getpid() for pid, _ in results.values())
+    assert {method for _, method in results.values()} == {POOL_START_METHOD}
+    assert POOL_START_METHOD != 'fork'
+
+
+def test_pool_and_in_process_runs_agree():
+    from utils.price_cube import build_year_partition
+
+    pooled = {year: part for year, part, _ in map_sales_years(build_year_partition, [2022, 2023], max_workers=2)}
+    local = {year: part for year, part, _ in map_sales_years(build_year_partition, [2022, 2023], max_workers=1)}
+    for year in (2022, 2023):
+        pd.testing.assert_frame_equal(pooled[year], local[year])
+
+
+def test_pool_inside_a_page_does_not_rerun_the_page():
+    # Streamlit runs the page as __main__; workers that imported it again would
+    # rerun it, fail to start a pool of their own and break this one
+    at = AppTest.from_string(
+        "import os\n"
+        "import streamlit as st\n"
+        "from test_sales_store import _worker_process\n"
+        "from utils.sales_store import map_sales_years\n"
+        "runs = list(map_sales_years(_worker_process, [2022, 2023], max_workers=2))\n"
+        "st.text(all(error is None and pid != os.getpid() for _, (pid, _), error in runs))\n",
+        default_timeout=120,
+    ).run()
+    assert not at.exception
+    assert at.text[0].value == "True"
@@ -0,0 +1,57 @@
+# tests/test_sketch.py
+import numpy as np
+import pytest
+
+from utils.sketch import (SKETCH_ALPHA, merge_sketches, restrict_sketch, sketch_count, sketch_quantile,
+                          sketch_values)
+
+QUANTILES = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+
+
+def _prices(n, seed=0):
+    return np.random.default_rng(seed).lognormal(13.5, 1.2, n)
+
+
+def _exact(values, q):
+    # The value at rank floor(q * (n - 1)), the rank sketch_quantile reads at
+    return np.quantile(values, q, method='lower')
+
+
+@pytest.mark.parametrize('q', QUANTILES)
+def test_quantile_within_alpha(q):
+    values = _prices(5000)
+    estimate = sketch_quantile(sketch_values(values), q)
+    assert abs(estimate - _exact(values, q)) <= SKETCH_ALPHA * _exact(values, q)
+
+
+@pytest.mark.parametrize('q', QUANTILES)
+def test_merged_sketch_matches_sketch_of_all_values(q):
+    parts = [_prices(n, seed) for seed, n in enumerate([10, 700, 2500])]
+    merged = merge_sketches([sketch_values(part) for part in parts])
+    whole = sketch_values(np.concatenate(parts))
+
+    np.testing.assert_array_equal(merged.keys, whole.keys)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    exact = _exact(np.concatenate(parts), q)
+    assert abs(sketch_quantile(merged, q) - exact) <= SKETCH_ALPHA * exact
+
+
+def test_non_positive_and_missing_values_are_skipped():
+    sketch = sketch_values([0, -5, np.nan, 100, 200])
+    assert sketch_count(sketch) == 2
+    assert np.isnan(sketch_quantile(sketch_values([0, np.nan]), 0.5))
+
+
+def test_restrict_counts_values_in_range_up_to_the_edge_buckets():
+    values = _prices(5000)
+    low, high = 500000, 2000000
+    restricted = sketch_count(restrict_sketch(sketch_values(values), low, high))
+    # Only values within alpha of a bound can land on the wrong side
+    inner = np.sum((values >= low * (1 + SKETCH_ALPHA)) & (values <= high * (1 - SKETCH_ALPHA)))
+    outer = np.sum((values >= low * (1 - SKETCH_ALPHA)) & (values <= high * (1 + SKETCH_ALPHA)))
+    assert inner <= restricted <= outer
+
+
+def test_merging_different_alphas_fails():
+    with pytest.raises(ValueError):
+        merge_sketches([sketch_values([1.0], alpha=0.01), sketch_values([1.0], alpha=0.02)])
@@ -0,0 +1,132 @@
+# tests/test_spatial.py
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+from utils.geometry import read_modzcta
+from utils.spatial import (EARTH_RADIUS_KM, HEXBIN_ORIGIN, KM_PER_DEGREE_LAT, access_metrics, build_point_index,
+                           build_polygon_index, haversine_km, hexbin_geojson, hexbin_points, label_points,
+                           locate_points)
+
+
+@pytest.fixture(scope='module')
+def modzcta():
+    return read_modzcta()
+
+
+def _random_points(n, bounds, seed=0):
+    rng = np.random.default_rng(seed)
+    min_lon, min_lat, max_lon, max_lat = bounds
+    return rng.uniform(min_lon, max_lon, n), rng.uniform(min_lat, max_lat, n)
+
+
+def test_locate_points_matches_brute_force(modzcta):
+    geometries = modzcta.geometry.to_numpy()
+    index = build_polygon_index(geometries, modzcta['zipcode'].to_numpy())
+    lon, lat = _random_points(5000, shapely.total_bounds(geometries))
+    lon[:3], lat[3:6] = np.nan, np.nan
+
+    found = locate_points(index, lon, lat)
+
+    hits = np.column_stack([shapely.intersects_xy(g, lon, lat) for g in geometries])
+    inside = np.column_stack([shapely.contains_xy(g, lon, lat) for g in geometries])
+    assert (found[~hits.any(axis=1)] == -1).all()
+    matched = np.flatnonzero(found >= 0)
+    assert hits[matched, found[matched]].all()
+    # Points off every border have exactly one answer
+    strict = inside.sum(axis=1) == 1
+    np.testing.assert_array_equal(found[strict], inside[strict].argmax(axis=1))
+    assert strict.sum() > 1000
+
+
+def test_points_on_a_shared_edge_get_one_of_the_polygons():
+    squares = shapely.box([0, 1], [0, 0], [1, 2], [1, 1])
+    index = build_polygon_index(squares, ['left', 'right'])
+    labels = label_points(index, [0.5, 1.0, 1.5, 3.0, np.nan], [0.5, 0.5, 0.5, 0.5, 0.5])
+    assert labels[0] == 'left' and labels[2] == 'right'
+    assert labels[1] in ('left', 'right')
+    assert pd.isna(labels[3:]).all()
+
+
+def _great_circle_km(lon1, lat1, lon2, lat2):
+    # Vincenty's formula on a sphere, independent of the haversine form
+    lon1, lat1, lon2, lat2 = np.radians([lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    y = np.hypot(np.cos(lat2) * np.sin(dlon),
+                 np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
+    x = np.sin(lat1) * np.sin(lat2) + np.cos(lat1) * np.cos(lat2) * np.cos(dlon)
+    return EARTH_RADIUS_KM * np.arctan2(y, x)
+
+
+def test_haversine_matches_great_circle_distance():
+    lon1, lat1 = _random_points(1000, (-180, -90, 180, 90), seed=1)
+    lon2, lat2 = _random_points(1000, (-180, -90, 180, 90), seed=2)
+    np.testing.assert_allclose(haversine_km(lon1, lat1, lon2, lat2), _great_circle_km(lon1, lat1, lon2, lat2),
+                               rtol=1e-9, atol=1e-6)
+    # One degree of latitude
+    assert haversine_km(-73.97, 40.0, -73.97, 41.0) == pytest.approx(111.195, abs=0.001)
+
+
+def test_access_metrics_match_brute_force():
+    bounds = (-74.02, 40.70, -73.91, 40.88)
+    facility_lon, facility_lat = _random_points(300, bounds, seed=3)
+    lon, lat = _random_points(400, bounds, seed=4)
+    # Repeated locations, a point on a facility and rows without coordinates
+    lon, lat = np.r_[lon, lon[:50], facility_lon[0], np.nan], np.r_[lat, lat[:50], facility_lat[0], 40.8]
+
+    metrics = access_metrics(build_point_index(facility_lon, facility_lat), lon, lat, radii_km=(0.5, 1))
+
+    valid = np.isfinite(lon)
+    distances = haversine_km(lon[valid, None], lat[valid, None], facility_lon[None, :], facility_lat[None, :])
+    np.testing.assert_allclose(metrics['nearest_km'][valid], distances.min(axis=1), atol=1e-9)
+    np.testing.assert_array_equal(metrics['nearest'][valid], distances.argmin(axis=1))
+    for radius in (0.5, 1):
+        np.testing.assert_array_equal(metrics[f"within_{radius:g}km"][valid], (distances <= radius).sum(axis=1))
+    assert metrics['nearest_km'].iloc[-2] == 0
+    last = metrics.iloc[-1]
+    assert np.isnan(last['nearest_km']) and last['nearest'] == -1 and last['within_1km'] == 0
+
+
+def test_access_metrics_with_no_points_indexed():
+    metrics = access_metrics(build_point_index([np.nan], [np.nan]), [-73.97], [40.78])
+    assert metrics['nearest_km'].isna().all() and (metrics['nearest'] == -1).all()
+    assert (metrics[['within_0.5km', 'within_1km', 'within_2km']] == 0).all().all()
+
+
+def _nearest_hexagon(lon, lat, size_km, origin=HEXBIN_ORIGIN):
+    # A point belongs to the hexagon whose centre is nearest: try every centre
+    km_per_lon = 111.320 * np.cos(np.radians(origin[1]))
+    x = (lon - origin[0]) * km_per_lon
+    y = (lat - origin[1]) * KM_PER_DEGREE_LAT
+    q, r = (axis.ravel() for axis in np.meshgrid(np.arange(-40, 41), np.arange(-40, 41)))
+    centre_x, centre_y = np.sqrt(3) * (q + r / 2) * size_km, 1.5 * r * size_km
+    nearest = np.argmin((x[:, None] - centre_x) ** 2 + (y[:, None] - centre_y) ** 2, axis=1)
+    return pd.Series([f"{q[i]},{r[i]}" for i in nearest])
+
+
+@pytest.mark.parametrize('size_km', [0.25, 1])
+def test_hexbin_counts_match_nearest_centre(size_km):
+    lon, lat = _random_points(3000, (-74.02, 40.70, -73.91, 40.88), seed=5)
+    bins = hexbin_points(np.r_[lon, np.nan], np.r_[lat, 40.8], size_km)
+
+    expected = _nearest_hexagon(lon, lat, size_km).value_counts()
+    assert bins.set_index('hex_id')['count'].sort_index().to_dict() == expected.sort_index().to_dict()
+    assert bins['count'].sum() == len(lon)
+
+
+def test_hexbin_polygons_hold_their_points_and_do_not_overlap():
+    size_km = 0.5
+    lon, lat = _random_points(3000, (-74.02, 40.70, -73.91, 40.88), seed=6)
+    bins = hexbin_points(lon, lat, size_km)
+    geojson = hexbin_geojson(bins, size_km)
+
+    assert [feature['id'] for feature in geojson['features']] == list(bins['hex_id'])
+    polygons = shapely.polygons([feature['geometry']['coordinates'][0] for feature in geojson['features']])
+    assert shapely.is_valid(polygons).all()
+    polygon_of = dict(zip(bins['hex_id'], polygons))
+    points = shapely.points(lon, lat)
+    owners = [polygon_of[hex_id] for hex_id in _nearest_hexagon(lon, lat, size_km)]
+    # Corners are rounded to 5 decimals, about a metre
+    assert shapely.dwithin(owners, points, 2e-5).all()
+    np.testing.assert_allclose(shapely.area(shapely.union_all(polygons)), shapely.area(polygons).sum(), rtol=1e-3)
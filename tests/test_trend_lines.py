@@ -0,0 +1,43 @@
+# tests/test_trend_lines.py
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from utils.trend_lines import HIGHLIGHT_WIDTH, neighborhood_trend_traces, split_lines
+
+
+def _trends():
+    rng = np.random.default_rng(0)
+    rows = [(year, f"N{k}", rng.random()) for k in range(12) for year in rng.permutation(np.arange(2010, 2020))]
+    return pd.DataFrame(rows, columns=['Year', 'Neighborhood', 'Value']).sample(frac=1, random_state=0)
+
+
+def test_split_lines_matches_per_group_filter():
+    df = _trends()
+    lines = split_lines(df, 'Neighborhood', 'Year', 'Value')
+    assert sorted(lines) == sorted(df['Neighborhood'].unique())
+    for name, (x, y) in lines.items():
+        expected = df[df['Neighborhood'] == name].sort_values('Year')
+        np.testing.assert_array_equal(x, expected['Year'])
+        np.testing.assert_array_equal(y, expected['Value'])
+
+
+def test_one_named_trace_per_neighborhood():
+    df = _trends()
+    traces = neighborhood_trend_traces(df, 'Value', ['N3'], '%{fullData.name}: %{y}')
+    assert [trace.name for trace in traces] == sorted(df['Neighborhood'].unique())
+    for trace in traces:
+        expected = df[df['Neighborhood'] == trace.name].sort_values('Year')
+        np.testing.assert_array_equal(trace.y, expected['Value'])
+        assert trace.customdata is None
+    highlighted = [trace.name for trace in traces if trace.line.width == HIGHLIGHT_WIDTH]
+    assert highlighted == ['N3']
+
+
+def test_serialized_size_grows_with_points_not_names():
+    df = _trends()
+    long_names = df.assign(Neighborhood=df['Neighborhood'] + ' ' + 'x' * 200)
+    sizes = [len(pio.to_json({'data': neighborhood_trend_traces(frame, 'Value', [], '')}, validate=False))
+             for frame in (df, long_names)]
+    # Each name is written once per trace, never once per point
+    assert sizes[1] - sizes[0] == len(' ' + 'x' * 200) * df['Neighborhood'].nunique()
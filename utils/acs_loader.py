@@ -0,0 +1,90 @@
+# utils/acs_loader.py
+import glob
+import os
+import pandas as pd
+import streamlit as st
+from utils.ingest import read_workbook
+from utils.instrumentation import tracked_cache
+
+ACS_FILE_PATTERN = os.path.join('datasets', 'Combined_*.xlsx')
+
+# Indicator rows pulled from each DP-03/DP-05 workbook. A row matches when its
+# label contains the indicator (case-insensitive); the first match wins.
+ACS_INDICATORS = [
+    "Total population",
+    "Median age",
+    "Median household income",
+    "White",
+    "Black or African American",
+    "Asian",
+]
+
+RACE_CATEGORIES = ["White", "Black or African American", "Asian"]
+
+
+def _acs_year(file_path):
+    filename = os.path.basename(file_path)
+    return int(filename.replace('Combined_', '').replace('.xlsx', ''))
+
+
+def _neighborhood_from_column(col_name):
+    # e.g. "NYC-Manhattan Community District 3--Chinatown & Lower East Side PUMA, New York Estimate"
+    if "NYC-Manhattan Community District" not in col_name or "PUMA" not in col_name:
+        return None
+    neighborhood = col_name.split("--")[1].split(" PUMA")[0]
+    if "Estimate" in neighborhood:
+        neighborhood = neighborhood.split("Estimate")[0].strip()
+    return neighborhood
+
+
+def extract_acs_indicators(df, year):
+    """Pull every indicator row out of one combined ACS workbook as long-format records"""
+    labels = df.iloc[:, 0]
+    neighborhoods = {col: _neighborhood_from_column(str(col)) for col in df.columns[1:]}
+    neighborhood_cols = [col for col, name in neighborhoods.items() if name is not None]
+
+    records = []
+    for indicator in ACS_INDICATORS:
+        matches = labels.str.contains(indicator, na=False, case=False, regex=False)
+        if not matches.any():
+            continue
+
+        row = df.loc[matches.idxmax(), neighborhood_cols]
+        values = pd.to_numeric(row.astype(str).str.replace(',', ''), errors='coerce')
+        values = values[row.notna()].dropna()
+
+        for col, value in values.items():
+            records.append({
+                "Year": year,
+                "Neighborhood": neighborhoods[col],
+                "Indicator": indicator,
+                "Value": float(value),
+            })
+    return records
+
+
+@tracked_cache(st.cache_data, show_spinner=False)
+def load_acs_indicators(file_pattern=ACS_FILE_PATTERN):
+    """Tidy long table (Year, Neighborhood, Indicator, Value) of every ACS indicator.
+
+    Each Combined_*.xlsx workbook is parsed exactly once and all indicators are
+    extracted in the same pass; the age, income and race tabs all read from here.
+    """
+    records = []
+    for file_path in sorted(glob.glob(file_pattern)):
+        records.extend(extract_acs_indicators(read_workbook(file_path), _acs_year(file_path)))
+
+    if not records:
+        return pd.DataFrame(columns=["Year", "Neighborhood", "Indicator", "Value"])
+
+    acs_df = pd.DataFrame(records)
+    return acs_df.drop_duplicates(subset=['Year', 'Neighborhood', 'Indicator'])
+
+
+def acs_indicator(indicator, value_name, min_year=2015):
+    """Year/Neighborhood/value frame for one indicator, sorted like the trend charts expect"""
+    acs_df = load_acs_indicators()
+    subset = acs_df[(acs_df['Indicator'] == indicator) & (acs_df['Year'] >= min_year)]
+
+    result_df = subset[['Year', 'Neighborhood', 'Value']].rename(columns={'Value': value_name})
+    return result_df.sort_values(by=['Neighborhood', 'Year'])
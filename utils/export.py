@@ -0,0 +1,106 @@
+# utils/export.py
+import gzip
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.ingest import CACHE_DIR, write_atomic
+
+# Exported selections are written here once and reused while the same
+# filters (and the same source data) are requested again
+EXPORT_DIR = os.path.join(CACHE_DIR, 'exports')
+MAX_EXPORTS = 20
+EXPORT_CHUNK_ROWS = 10000
+
+# label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def filter_fingerprint(**params):
+    """Stable short hash of everything that decides an export's contents"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _chunks(df, positions, chunk_rows):
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows]]
+
+
+def _write_csv(df, positions, path, chunk_rows, compress):
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        # Header goes out even for an empty selection
+        df.iloc[:0].to_csv(f, index=False)
+        for chunk in _chunks(df, positions, chunk_rows):
+            chunk.to_csv(f, index=False, header=False)
+
+
+def _write_parquet(df, positions, path, chunk_rows):
+    # Types come from the first chunk; a column that is all missing there would
+    # be typed null, which later chunks cannot be written as, so store it as text
+    schema = pa.Schema.from_pandas(df.iloc[positions[:chunk_rows]], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(df, positions, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _evict_old_exports(export_dir, keep):
+    # Other sessions evict too, so any file can vanish between listing and removal
+    exports = []
+    for name in os.listdir(export_dir):
+        if name.endswith('.tmp'):
+            continue
+        path = os.path.join(export_dir, name)
+        try:
+            exports.append((os.path.getmtime(path), path))
+        except FileNotFoundError:
+            continue
+    exports.sort(reverse=True)
+    for _, path in exports[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def cached_export_path(fingerprint, fmt, export_dir=EXPORT_DIR):
+    """Path of an already written export, or None"""
+    path = os.path.join(export_dir, f"{fingerprint}{EXPORT_FORMATS[fmt][0]}")
+    return path if os.path.exists(path) else None
+
+
+def export_rows(df, positions, fingerprint, fmt, export_dir=EXPORT_DIR, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Path of ``df.iloc[positions]`` exported as ``fmt``, writing it only if not cached.
+
+    Rows are written ``chunk_rows`` at a time, so only one chunk is ever held
+    in memory next to ``df``.
+    """
+    ext, _ = EXPORT_FORMATS[fmt]
+    path = os.path.join(export_dir, f"{fingerprint}{ext}")
+    if cached_export_path(fingerprint, fmt, export_dir):
+        try:
+            # Touch so eviction treats it as recently used
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass  # evicted in the meantime; write it again
+
+    os.makedirs(export_dir, exist_ok=True)
+    if fmt == 'Parquet':
+        write_atomic(lambda tmp: _write_parquet(df, positions, tmp, chunk_rows), path)
+    else:
+        write_atomic(lambda tmp: _write_csv(df, positions, tmp, chunk_rows, compress=ext.endswith('.gz')), path)
+
+    _evict_old_exports(export_dir, MAX_EXPORTS)
+    return path
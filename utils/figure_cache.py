@@ -0,0 +1,140 @@
+# utils/figure_cache.py
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.instrumentation import record_cache, timed
+
+# Built Plotly figures, shared by every session and evicted least recently used
+# first once their serialized size adds up to more than FIGURE_CACHE_MB. A figure
+# is stored as the JSON it is drawn from, so a rerun that asks for one it already
+# built (switching tabs, changing an unrelated widget) skips both the build and
+# Plotly's conversion of the figure in st.plotly_chart.
+FIGURE_CACHE_MB = float(os.environ.get("FIGURE_CACHE_MB", "64"))
+
+
+class FigureCache:
+    """LRU of values with a known size in bytes, capped at ``max_bytes`` in total"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+figure_cache = FigureCache(int(FIGURE_CACHE_MB * 2 ** 20))
+
+
+class SerializedFigure(go.Figure):
+    """A built figure kept as its Plotly JSON.
+
+    st.plotly_chart takes any Plotly figure and calls ``to_dict()`` on it; here
+    that decodes the stored JSON instead of copying, converting and validating
+    every trace again. Only ``to_dict``, ``to_plotly_json`` and ``to_json`` are
+    available, so use ``go.Figure(fig.to_dict())`` to change a copy.
+    """
+
+    def __init__(self, spec):
+        # No go.Figure state is set up: the traces live in the JSON
+        self._spec = spec
+
+    def to_dict(self):
+        return json.loads(self._spec)
+
+    def to_plotly_json(self):
+        return self.to_dict()
+
+    def to_json(self, *args, **kwargs):
+        return self._spec
+
+    def __repr__(self):
+        return f"SerializedFigure({len(self._spec)} bytes)"
+
+
+def _update(digest, part):
+    if isinstance(part, (pd.DataFrame, pd.Series, pd.Index)):
+        schema = part.dtypes.to_dict() if isinstance(part, pd.DataFrame) else {part.name: part.dtype}
+        digest.update(repr(sorted((str(k), str(v)) for k, v in schema.items())).encode())
+        digest.update(pd.util.hash_pandas_object(part, index=not isinstance(part, pd.Index)).to_numpy().tobytes())
+    elif isinstance(part, np.ndarray):
+        _update(digest, pd.Series(part.ravel()))
+        digest.update(repr(part.shape).encode())
+    elif isinstance(part, (list, tuple)):
+        digest.update(f"{type(part).__name__}{len(part)}".encode())
+        for item in part:
+            _update(digest, item)
+    elif isinstance(part, dict):
+        _update(digest, sorted(part.items(), key=lambda item: str(item[0])))
+    else:
+        digest.update(json.dumps(part, default=str).encode())
+
+
+def fingerprint(*parts):
+    """Hash of frames, arrays and plain values, stable across reruns and sessions"""
+    digest = hashlib.sha256()
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+
+def cached_figure(label):
+    """Decorator for a function that builds a Plotly figure from its arguments.
+
+    The figure is only built when that set of arguments has not been seen;
+    otherwise the stored one is returned. Either way it comes back as a
+    SerializedFigure, serialized once when it was built, to pass to
+    st.plotly_chart as it is. Pass the aggregated data a figure is drawn from,
+    not large static inputs such as GeoJSON; those should be loaded inside.
+    """
+    def decorate(build):
+        @functools.wraps(build)
+        def call(*args, **kwargs):
+            key = fingerprint(label, args, kwargs)
+            fig = figure_cache.get(key)
+            record_cache(label, hit=fig is not None)
+            if fig is None:
+                with timed(label):
+                    fig = SerializedFigure(pio.to_json(build(*args, **kwargs), validate=False))
+                figure_cache.put(key, fig, len(fig._spec))
+            return fig
+        return call
+    return decorate
+
@@ -0,0 +1,54 @@
+# utils/filter_index.py
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Price-range and category filters answered without scanning the frame.
+#
+# Rows are kept in price order, once for the whole frame and once per category
+# (a posting list per neighborhood). A price range is two binary searches into
+# those lists, and a set of neighborhoods is the union of their slices, so the
+# work grows with the number of matching rows rather than the frame size.
+FilterIndex = namedtuple('FilterIndex', ['size', 'prices', 'positions', 'groups'])
+
+
+def _price_sorted(prices, positions):
+    order = np.argsort(prices, kind='stable')
+    return prices[order], positions[order]
+
+
+def build_filter_index(df, price_col='sale_price', group_col='neighborhood'):
+    """Index ``df``'s rows by ``price_col`` overall and within each ``group_col`` value"""
+    prices = df[price_col].to_numpy(dtype=float)
+    positions = np.arange(len(df))
+
+    codes, names = pd.factorize(df[group_col])
+    groups = {}
+    # One stable sort by group code keeps each group's rows contiguous
+    by_group = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[by_group], np.arange(len(names) + 1))
+    for code, name in enumerate(names):
+        rows = by_group[bounds[code]:bounds[code + 1]]
+        groups[name] = _price_sorted(prices[rows], rows)
+
+    return FilterIndex(len(df), *_price_sorted(prices, positions), groups)
+
+
+def _price_slice(prices, positions, low, high):
+    if low is None and high is None:
+        return positions
+    start = 0 if low is None else np.searchsorted(prices, low, side='left')
+    # Rows without a price sort last and fail any bound, the lower one included
+    stop = np.searchsorted(prices, np.inf if high is None else high, side='right')
+    return positions[start:stop]
+
+
+def query_filter_index(index, low=None, high=None, groups=None):
+    """Row positions (ascending) with ``low <= price <= high`` and, if given, a group in ``groups``"""
+    if not groups:
+        rows = _price_slice(index.prices, index.positions, low, high)
+    else:
+        parts = [_price_slice(*index.groups[name], low, high) for name in groups if name in index.groups]
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+    return np.sort(rows)
@@ -0,0 +1,188 @@
+# utils/geometry.py
+import hashlib
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+import streamlit as st
+
+from utils.ingest import CACHE_DIR, file_sha256, write_atomic
+from utils.instrumentation import tracked_cache
+from utils.neighborhoods import scheme_key, zip_neighborhood_map
+
+MODZCTA_PATH = os.path.join('datasets', 'Modified_Zip_Code_Tabulation_Areas__MODZCTA__20250421.csv')
+GEOMETRY_CACHE_DIR = os.path.join(CACHE_DIR, 'geometry')
+
+# Manhattan MODZCTAs all fall in this ZIP range
+MANHATTAN_ZIP_RANGE = (10001, 10282)
+
+# Neighborhood schemes that are drawn on a map. Each one gets its own dissolved
+# geometry artifact; ZIPs a scheme does not cover are grouped as "Other".
+GEOMETRY_SCHEMES = {
+    'zip': zip_neighborhood_map('zip'),
+}
+
+# Simplified GeoJSON levels sent to the browser: (tolerance in degrees, coordinate
+# decimals). At Manhattan's latitude 0.0001 degrees is roughly 10 meters.
+GEOJSON_LEVELS = {
+    'full': (0, 6),
+    'high': (0.00002, 5),
+    'medium': (0.00005, 5),
+    'low': (0.0001, 5),
+    'overview': (0.0004, 4),
+}
+
+
+def _mapping_hash(zip_to_neighborhood):
+    payload = json.dumps(sorted((int(k), v) for k, v in zip_to_neighborhood.items()))
+    return hashlib.sha256(payload.encode()).hexdigest()[:8]
+
+
+def read_modzcta(path=MODZCTA_PATH):
+    """Manhattan MODZCTA polygons as a GeoDataFrame (one row per ZIP)"""
+    modzcta_df = pd.read_csv(path)
+    geometries = shapely.from_wkt(modzcta_df['the_geom'].to_numpy())
+    modzcta_gdf = gpd.GeoDataFrame(
+        modzcta_df.drop(columns=['the_geom']), geometry=geometries, crs="EPSG:4326"
+    )
+    modzcta_gdf['zipcode'] = modzcta_gdf['MODZCTA'].astype(int)
+
+    low, high = MANHATTAN_ZIP_RANGE
+    return modzcta_gdf[modzcta_gdf['zipcode'].between(low, high)]
+
+
+def dissolve_neighborhoods(manhattan_gdf, zip_to_neighborhood):
+    """Dissolve ZIP polygons into one polygon per neighborhood"""
+    manhattan_gdf = manhattan_gdf.copy()
+    manhattan_gdf['neighborhood'] = manhattan_gdf['zipcode'].map(zip_to_neighborhood).fillna('Other')
+    dissolved = manhattan_gdf.dissolve(by='neighborhood').reset_index()
+    return dissolved[['neighborhood', 'MODZCTA', 'zipcode', 'geometry']]
+
+
+def _clear_stale_artifacts(scheme, artifact_path, cache_dir):
+    """Remove artifacts left behind by older versions of a scheme, including the
+    unversioned "<scheme>-<hashes>" names written before schemes had a version"""
+    for name in os.listdir(cache_dir):
+        if name.startswith((f"{scheme}_v", f"{scheme}-")) and name.endswith(".parquet"):
+            path = os.path.join(cache_dir, name)
+            if path != artifact_path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # another process cleared it first
+
+
+def build_neighborhood_geometries(scheme, source=MODZCTA_PATH, cache_dir=GEOMETRY_CACHE_DIR):
+    """Write (if needed) and return the GeoParquet artifact path for a scheme.
+
+    The file name carries the source CSV hash and the scheme's mapping hash, so
+    editing either one produces a fresh artifact instead of a stale read.
+    """
+    zip_to_neighborhood = GEOMETRY_SCHEMES[scheme]
+    source_hash = file_sha256(source)[:16]
+    artifact_path = os.path.join(
+        cache_dir, f"{scheme_key(scheme)}-{source_hash}-{_mapping_hash(zip_to_neighborhood)}.parquet"
+    )
+    if os.path.exists(artifact_path):
+        _clear_stale_artifacts(scheme, artifact_path, cache_dir)
+        return artifact_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    dissolved = dissolve_neighborhoods(read_modzcta(source), zip_to_neighborhood)
+
+    write_atomic(lambda tmp: dissolved.to_parquet(tmp, index=False), artifact_path)
+
+    _clear_stale_artifacts(scheme, artifact_path, cache_dir)
+    return artifact_path
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_neighborhood_geometries(scheme='zip'):
+    """Dissolved neighborhood polygons for a scheme, loaded once per process.
+
+    Shared between sessions: callers that need to add columns should merge
+    into a new frame rather than modify this one.
+    """
+    if not os.path.exists(MODZCTA_PATH):
+        return None
+    try:
+        return gpd.read_parquet(build_neighborhood_geometries(scheme))
+    except OSError:
+        # Cache directory not writable: dissolve in memory instead
+        return dissolve_neighborhoods(read_modzcta(), GEOMETRY_SCHEMES[scheme])
+
+
+def simplify_polygons(geometries, tolerance):
+    """Topology-preserving simplification of an array of polygons"""
+    if tolerance <= 0:
+        return geometries
+    # Coverage simplification keeps shared borders shared, but it needs GEOS 3.12
+    # and polygons that tile cleanly (no gaps or overlaps between neighbors)
+    if shapely.geos_version >= (3, 12, 0) and shapely.coverage_is_valid(geometries):
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def quantize(geometries, decimals):
+    """Round coordinates so the serialized GeoJSON carries no spurious precision"""
+    return shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+
+
+def pick_geojson_level(zoom=11):
+    """Coarsest level whose tolerance stays under half a pixel at ``zoom``.
+
+    Mapbox maps are drawn on 512-pixel tiles, so one pixel spans
+    360 / (512 * 2**zoom) degrees of longitude whatever the container size;
+    a bigger chart shows more area, not finer detail.
+    """
+    half_pixel = 360 / (512 * 2 ** zoom) / 2
+    candidates = [(tolerance, level) for level, (tolerance, _) in GEOJSON_LEVELS.items()
+                  if tolerance <= half_pixel]
+    return max(candidates)[1]
+
+
+def geometries_to_geojson(names, geometries):
+    """FeatureCollection with each feature's id and ``properties.neighborhood`` set to its name"""
+    features = [
+        {
+            "type": "Feature",
+            "id": name,
+            "properties": {"neighborhood": name},
+            "geometry": json.loads(shapely.to_geojson(geometry)),
+        }
+        for name, geometry in zip(names, geometries)
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_neighborhood_geojson_levels(scheme='zip'):
+    """Every simplification level of a scheme's polygons, precomputed together"""
+    gdf = load_neighborhood_geometries(scheme)
+    if gdf is None:
+        return None
+
+    levels = {}
+    for level, (tolerance, decimals) in GEOJSON_LEVELS.items():
+        geometries = quantize(simplify_polygons(gdf.geometry.values, tolerance), decimals)
+        levels[level] = geometries_to_geojson(gdf['neighborhood'], geometries)
+    return levels
+
+
+def load_neighborhood_geojson(scheme='zip', level=None, zoom=11):
+    """Simplified GeoJSON for a map; match features with ``featureidkey='properties.neighborhood'``"""
+    levels = load_neighborhood_geojson_levels(scheme)
+    if levels is None:
+        return None
+    return levels[level or pick_geojson_level(zoom)]
+
+
+if __name__ == "__main__":
+    for scheme_name in GEOMETRY_SCHEMES:
+        print(f"{scheme_name} -> {build_neighborhood_geometries(scheme_name)}")
+        for level_name, geojson in load_neighborhood_geojson_levels(scheme_name).items():
+            size = len(json.dumps(geojson, separators=(',', ':')))
+            print(f"  {level_name}: {size / 1024:.0f} KB")
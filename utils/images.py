@@ -0,0 +1,114 @@
+# utils/images.py
+import base64
+import glob
+import os
+
+import streamlit as st
+from PIL import Image
+
+from utils.ingest import file_sha256, write_atomic
+from utils.instrumentation import tracked_cache
+
+# Files here are served by Streamlit at app/static/... (server.enableStaticServing)
+STATIC_DIR = "static"
+HERO_IMAGE = os.path.join("img", "New-York.jpg")
+
+# The hero fills half the viewport, so 960px covers a 1920px screen at 1x
+HERO_WIDTHS = (640, 960, 1280, 1920)
+
+# Encoder settings per output format, in order of preference. No AVIF: Streamlit's
+# static file handler only sends a proper Content-Type for a fixed list of
+# extensions, and .avif is not on it.
+IMAGE_FORMATS = {
+    "webp": {"quality": 80, "method": 6},
+    "jpeg": {"quality": 80, "progressive": True, "optimize": True},
+}
+
+MIME_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def build_image_variants(source, widths=HERO_WIDTHS, out_dir=None):
+    """Write resized copies of ``source`` in every format; returns ``{(fmt, width): path}``.
+
+    File names carry a hash of the source, so replacing the image produces new
+    URLs (browsers may cache the old ones forever) and stale copies are removed.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    out_dir = out_dir or os.path.join(STATIC_DIR, stem)
+    prefix = f"{stem}-{file_sha256(source)[:8]}"
+
+    paths = {}
+    for fmt in IMAGE_FORMATS:
+        ext = "jpg" if fmt == "jpeg" else fmt
+        for width in widths:
+            paths[(fmt, width)] = os.path.join(out_dir, f"{prefix}-{width}w.{ext}")
+
+    missing = {key: path for key, path in paths.items() if not os.path.exists(path)}
+    if missing:
+        os.makedirs(out_dir, exist_ok=True)
+        with Image.open(source) as image:
+            image = image.convert("RGB")
+            for (fmt, width), path in missing.items():
+                height = round(image.height * width / image.width)
+                resized = image if width >= image.width else image.resize((width, height), Image.LANCZOS)
+                write_atomic(lambda tmp: resized.save(tmp, format=fmt.upper(), **IMAGE_FORMATS[fmt]), path)
+
+        for old_path in glob.glob(os.path.join(out_dir, f"{stem}-*")):
+            # Skip files other sessions are still writing
+            if old_path not in paths.values() and not old_path.endswith('.tmp'):
+                os.remove(old_path)
+
+    return paths
+
+
+def _static_url(path):
+    return "app/" + os.path.relpath(path).replace(os.sep, "/")
+
+
+def _data_uri(path, fmt):
+    with open(path, "rb") as f:
+        return f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(f.read()).decode()}"
+
+
+def _image_set(urls):
+    # Browsers pick the first format they support from the list
+    options = ", ".join(f'url("{url}") type("{MIME_TYPES[fmt]}")' for fmt, url in urls.items())
+    return f"image-set({options})"
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def responsive_background_css(selector, source=HERO_IMAGE):
+    """CSS that sets ``selector``'s background to the right-sized variant of ``source``.
+
+    Built once per process. With static serving on, the browser downloads only
+    the variant that fits its viewport and caches it; otherwise a single small
+    WebP is inlined as a data URI.
+    """
+    try:
+        paths = build_image_variants(source)
+    except OSError:
+        # Read-only checkout: inline the original as before
+        return f'{selector} {{ background-image: url("{_data_uri(source, "jpeg")}"); }}'
+
+    if not st.get_option("server.enableStaticServing"):
+        return f'{selector} {{ background-image: url("{_data_uri(paths[("webp", HERO_WIDTHS[0])], "webp")}"); }}'
+
+    rules = []
+    # Each width serves viewports up to twice its size (the image fills half)
+    breakpoints = [None] + [2 * width for width in HERO_WIDTHS[:-1]]
+    for width, min_viewport in zip(HERO_WIDTHS, breakpoints):
+        jpeg_url = _static_url(paths[("jpeg", width)])
+        urls = {fmt: _static_url(paths[(fmt, width)]) for fmt in IMAGE_FORMATS}
+        rule = (
+            f'{selector} {{ background-image: url("{jpeg_url}"); '
+            f'background-image: {_image_set(urls)}; }}'
+        )
+        if min_viewport is not None:
+            rule = f"@media (min-width: {min_viewport + 1}px) {{ {rule} }}"
+        rules.append(rule)
+    return "\n".join(rules)
+
+
+if __name__ == "__main__":
+    for (image_format, image_width), variant_path in sorted(build_image_variants(HERO_IMAGE).items()):
+        print(f"{image_format} {image_width}w -> {variant_path} ({os.path.getsize(variant_path) / 1024:.0f} KB)")
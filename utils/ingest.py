@@ -0,0 +1,152 @@
+# utils/ingest.py
+import glob
+import hashlib
+import json
+import os
+import uuid
+
+import pandas as pd
+
+# Sales workbooks are read from SALES_DIR, which can be pointed at a generated
+# data set (see utils.synthetic_sales) without touching the bundled one.
+SALES_DIR = os.environ.get("SALES_DIR", "datasets")
+
+# Columnar copies of the Excel workbooks live here, one Parquet file per
+# source version plus a small JSON manifest describing the source it came from.
+# Everything derived from the sales data is cached next to it, so switching
+# SALES_DIR never evicts another data set's caches.
+CACHE_DIR = os.path.join(SALES_DIR, "_cache")
+SALES_WORKBOOK_PATTERN = os.path.join(SALES_DIR, "*_manhattan.xls*")
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hash a file in chunks so large workbooks never have to sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_path(path, cache_dir):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.json")
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(write, target):
+    """Call ``write(path)`` on a new temporary file next to ``target``, then swap it in.
+
+    Streamlit sessions are threads of one process and several workers may build
+    the same file at once, so every writer gets its own temporary file and
+    readers only ever see a complete one.
+    """
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _typed_frame(df):
+    # Excel hands back object columns for anything it cannot type; Parquet
+    # needs a single type per column, so mixed columns are stored as text.
+    for col in df.columns:
+        if df[col].dtype == object:
+            values = df[col].dropna()
+            if not values.map(lambda v: isinstance(v, str)).all():
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def ingest_workbook(path, cache_dir=CACHE_DIR):
+    """Return the Parquet copy of an Excel workbook, rebuilding it if the workbook changed.
+
+    The cached copy is keyed by the SHA-256 of the source file. The manifest also
+    records size and mtime so the common case (nothing changed) only costs a stat.
+    """
+    stat = os.stat(path)
+    manifest_path = _manifest_path(path, cache_dir)
+    manifest = _read_manifest(manifest_path)
+
+    if (manifest is not None
+            and manifest.get("size") == stat.st_size
+            and manifest.get("mtime_ns") == stat.st_mtime_ns
+            and os.path.exists(manifest.get("parquet", ""))):
+        return manifest["parquet"]
+
+    sha256 = file_sha256(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    parquet_path = os.path.join(cache_dir, f"{stem}-{sha256[:16]}.parquet")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if not os.path.exists(parquet_path):
+        df = _typed_frame(pd.read_excel(path))
+        write_atomic(lambda tmp: df.to_parquet(tmp, index=False), parquet_path)
+
+        # Drop copies built from earlier versions of the same workbook
+        if manifest is not None and manifest.get("parquet") != parquet_path:
+            old_path = manifest.get("parquet", "")
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+    manifest = {
+        "source": path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha256,
+        "parquet": parquet_path,
+    }
+    write_atomic(lambda tmp: _dump_json(manifest, tmp), manifest_path)
+    return parquet_path
+
+
+def source_sha256(path, cache_dir=CACHE_DIR):
+    """SHA-256 of a workbook, taken from its manifest when the file is unchanged."""
+    stat = os.stat(path)
+    manifest = _read_manifest(_manifest_path(path, cache_dir))
+    if (manifest is not None
+            and manifest.get("size") == stat.st_size
+            and manifest.get("mtime_ns") == stat.st_mtime_ns
+            and "sha256" in manifest):
+        return manifest["sha256"]
+    return file_sha256(path)
+
+
+def _dump_json(data, path):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def read_workbook(path, cache_dir=CACHE_DIR):
+    """Drop-in replacement for ``pd.read_excel(path)`` backed by the Parquet cache.
+
+    Sources that are already Parquet (e.g. generated sales) are read as they are.
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    try:
+        parquet_path = ingest_workbook(path, cache_dir)
+    except OSError:
+        # Read-only checkout or full disk: fall back to parsing the workbook
+        return pd.read_excel(path)
+    return pd.read_parquet(parquet_path)
+
+
+def ingest_all(pattern=SALES_WORKBOOK_PATTERN, cache_dir=CACHE_DIR):
+    """Build (or refresh) the Parquet copy of every workbook matching ``pattern``."""
+    return {path: ingest_workbook(path, cache_dir) for path in sorted(glob.glob(pattern))}
+
+
+if __name__ == "__main__":
+    for source, parquet_path in ingest_all().items():
+        print(f"{source} -> {parquet_path}")
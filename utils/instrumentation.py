@@ -0,0 +1,168 @@
+# utils/instrumentation.py
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Set LOG_RERUNS=0 to stop writing one JSON line per rerun
+LOG_RERUNS = os.environ.get("LOG_RERUNS", "1") != "0"
+
+# The admin panel is only drawn for URLs ending in ?admin=1
+ADMIN_QUERY_PARAM = "admin"
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Each session's script runs on its own thread, so the rerun being recorded is
+# thread-local; the totals since the process started are shared
+_local = threading.local()
+_totals_lock = threading.Lock()
+_totals = {'timings': {}, 'cache': {}}
+
+
+def _add(table, key, values):
+    row = table.setdefault(key, [0] * len(values))
+    for i, value in enumerate(values):
+        row[i] += value
+
+
+def _record(section, key, values):
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is not None:
+        _add(rerun[section], key, values)
+    with _totals_lock:
+        _add(_totals[section], key, values)
+
+
+def function_label(func):
+    """Short name for a function, e.g. ``Health.load_health_facilities``"""
+    module = func.__module__.rsplit('.', 1)[-1].lstrip('_')
+    return f"{module}.{func.__qualname__}"
+
+
+@contextmanager
+def timed(label):
+    """Record the wall time of a block under ``label``.
+
+    Works as ``with timed("label"):`` and as a ``@timed("label")`` decorator.
+    Times are inclusive, so a timed loader called from a timed page counts
+    towards both.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record('timings', label, (1, time.perf_counter() - start))
+
+
+def record_cache(label, hit):
+    """Count one lookup of a cache under ``label`` as a hit or a miss"""
+    _record('cache', label, (1, 0) if hit else (0, 1))
+
+
+def tracked_cache(cache, **options):
+    """``cache(**options)`` (st.cache_data or st.cache_resource) that also times
+    each call and counts it as a hit or a miss.
+
+    The wrapped body only runs on a miss, so it flags the call it belongs to;
+    calls are kept on a stack so cached functions calling each other are
+    counted separately.
+    """
+    def decorate(func):
+        label = function_label(func)
+
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            _local.calls[-1] = True
+            return func(*args, **kwargs)
+
+        cached = cache(**options)(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            if not hasattr(_local, 'calls'):
+                _local.calls = []
+            _local.calls.append(False)
+            try:
+                with timed(label):
+                    return cached(*args, **kwargs)
+            finally:
+                record_cache(label, hit=not _local.calls.pop())
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def plotly_chart(fig, *args, **kwargs):
+    """st.plotly_chart, timed; serialising a large figure is most of its cost"""
+    with timed("st.plotly_chart"):
+        return st.plotly_chart(fig, *args, **kwargs)
+
+
+def start_rerun(page):
+    _local.rerun = {'page': page, 'started': time.perf_counter(), 'timings': {}, 'cache': {}}
+
+
+def finish_rerun():
+    """Close the current rerun's record, log it as one JSON line and return it"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+
+    ctx = get_script_run_ctx()
+    summary = {
+        'event': 'rerun',
+        'session': ctx.session_id if ctx else None,
+        'page': rerun['page'],
+        'seconds': round(time.perf_counter() - rerun['started'], 4),
+        'timings': {label: {'calls': calls, 'seconds': round(seconds, 4)}
+                    for label, (calls, seconds) in rerun['timings'].items()},
+        'cache': {label: {'hits': hits, 'misses': misses}
+                  for label, (hits, misses) in rerun['cache'].items()},
+    }
+    if LOG_RERUNS:
+        logger.info(json.dumps(summary))
+    return summary
+
+
+def show_admin_panel(summary):
+    """Timings and cache counts in the sidebar, for ?admin=1 only"""
+    if summary is None or st.query_params.get(ADMIN_QUERY_PARAM) != "1":
+        return
+
+    with _totals_lock:
+        timing_totals = {label: list(row) for label, row in _totals['timings'].items()}
+        cache_totals = {label: list(row) for label, row in _totals['cache'].items()}
+
+    with st.sidebar.expander("Instrumentation", expanded=True):
+        st.caption(f"Last rerun: {summary['page']} in {summary['seconds']:.3f}s")
+
+        timings = pd.DataFrame(
+            [(label, row['calls'], row['seconds'], *timing_totals.get(label, (0, 0.0)))
+             for label, row in summary['timings'].items()],
+            columns=['Timer', 'Calls', 'Seconds', 'Calls (all)', 'Seconds (all)'],
+        ).sort_values('Seconds', ascending=False)
+        st.dataframe(timings, hide_index=True, use_container_width=True)
+
+        caches = pd.DataFrame(
+            [(label, hits, misses, hits / (hits + misses))
+             for label, (hits, misses) in sorted(cache_totals.items())],
+            columns=['Cached function', 'Hits', 'Misses', 'Hit rate'],
+        )
+        st.caption("Cache hits and misses since the process started")
+        st.dataframe(caches, hide_index=True, use_container_width=True,
+                     column_config={'Hit rate': st.column_config.NumberColumn(format="percent")})
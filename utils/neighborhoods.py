@@ -0,0 +1,247 @@
+# utils/neighborhoods.py
+import numpy as np
+import pandas as pd
+
+# Each page groups Manhattan differently, so neighborhood schemes are named and
+# versioned. Bump a scheme's version whenever its groupings change so anything
+# keyed on the scheme (geometry artifacts, aggregates) is rebuilt.
+NEIGHBORHOOD_SCHEMES = {
+    'zip': 1,                 # ZIP-level names (Price Map, Health)
+    'consolidated': 1,        # broader groupings (Data Overview, Price Changes)
+    'community_district': 1,  # ACS community districts (Demographics)
+    'sales': 1,               # names exactly as the sales workbooks record them
+    'zip_code': 1,            # every ZIP on its own (Health facility access)
+}
+
+# Reference table: one row per Manhattan ZIP with its approximate centroid and
+# its neighborhood under each ZIP-based scheme
+# (zip code, latitude, longitude, 'zip' name, 'consolidated' name)
+ZIP_REFERENCE_ROWS = [
+    (10001, 40.7503, -73.9967, "Chelsea", "Chelsea"),
+    (10002, 40.7153, -73.9865, "Lower East Side", "Lower East Side"),
+    (10003, 40.7320, -73.9874, "East Village", "East Village"),
+    (10004, 40.7032, -74.0132, "Financial District", "Financial District"),
+    (10005, 40.7048, -74.0092, "Financial District", "Financial District"),
+    (10006, 40.7076, -74.0113, "Financial District", "Financial District"),
+    (10007, 40.7143, -74.0070, "TriBeCa", "SoHo/TriBeCa"),
+    (10009, 40.7265, -73.9802, "East Village", "East Village"),
+    (10010, 40.7383, -73.9824, "Gramercy", "Gramercy"),
+    (10011, 40.7420, -73.9992, "Chelsea", "Chelsea"),
+    (10012, 40.7254, -73.9984, "SoHo/NoHo", "SoHo/TriBeCa"),
+    (10013, 40.7221, -74.0050, "TriBeCa/SoHo", "SoHo/TriBeCa"),
+    (10014, 40.7339, -74.0055, "West Village", "Greenwich Village"),
+    (10016, 40.7474, -73.9787, "Murray Hill", "Gramercy"),
+    (10017, 40.7520, -73.9739, "Midtown East", "Midtown East"),
+    (10018, 40.7551, -73.9911, "Midtown", "Midtown"),
+    (10019, 40.7656, -73.9825, "Midtown West", "Midtown"),
+    (10020, 40.7588, -73.9795, "Midtown", "Midtown"),
+    (10021, 40.7692, -73.9612, "Upper East Side", "Upper East Side"),
+    (10022, 40.7587, -73.9677, "Midtown East", "Midtown East"),
+    (10023, 40.7767, -73.9825, "Upper West Side", "Upper West Side"),
+    (10024, 40.7897, -73.9705, "Upper West Side", "Upper West Side"),
+    (10025, 40.7994, -73.9674, "Upper West Side", "Upper West Side"),
+    (10026, 40.8023, -73.9527, "Harlem", "Harlem"),
+    (10027, 40.8122, -73.9556, "Harlem", "Harlem"),
+    (10028, 40.7768, -73.9549, "Upper East Side", "Upper East Side"),
+    (10029, 40.7928, -73.9434, "East Harlem", "Harlem"),
+    (10030, 40.8187, -73.9444, "Harlem", "Harlem"),
+    (10031, 40.8247, -73.9496, "Hamilton Heights", "Harlem"),
+    (10032, 40.8381, -73.9464, "Washington Heights", "Washington Heights"),
+    (10033, 40.8501, -73.9341, "Washington Heights", "Washington Heights"),
+    (10034, 40.8669, -73.9252, "Inwood", "Washington Heights"),
+    (10035, 40.8021, -73.9309, "East Harlem", "Harlem"),
+    (10036, 40.7598, -73.9897, "Hell's Kitchen", "Midtown"),
+    (10037, 40.8125, -73.9394, "Harlem", "Harlem"),
+    (10038, 40.7095, -74.0023, "South Street Seaport", "Financial District"),
+    (10039, 40.8270, -73.9368, "Harlem", "Harlem"),
+    (10040, 40.8585, -73.9297, "Washington Heights", "Washington Heights"),
+    (10044, 40.7618, -73.9506, "Roosevelt Island", "Upper East Side"),
+    (10065, 40.7645, -73.9601, "Upper East Side", "Upper East Side"),
+    (10069, 40.7751, -73.9883, "Upper West Side", "Upper West Side"),
+    (10075, 40.7706, -73.9537, "Upper East Side", "Upper East Side"),
+    (10128, 40.7808, -73.9494, "Upper East Side", "Upper East Side"),
+    (10280, 40.7105, -74.0158, "Battery Park City", "Battery Park City"),
+    (10282, 40.7168, -74.0130, "Battery Park City", "Battery Park City"),
+]
+
+# 'consolidated' scheme for sales neighborhood names: the first key contained in
+# the upper-cased name wins, so order matters
+CONSOLIDATED_KEYWORDS = {
+    'UPPER EAST SIDE (59-79)': 'Upper East Side',
+    'UPPER EAST SIDE (79-96)': 'Upper East Side',
+    'UPPER EAST SIDE (96-110)': 'Upper East Side',
+    'ROOSEVELT ISLAND': 'Upper East Side',
+    'YORKVILLE': 'Upper East Side',
+
+    'UPPER WEST SIDE (59-79)': 'Upper West Side',
+    'UPPER WEST SIDE (79-96)': 'Upper West Side',
+    'UPPER WEST SIDE (96-116)': 'Upper West Side',
+    'MANHATTAN VALLEY': 'Upper West Side',
+    'LINCOLN CENTER': 'Upper West Side',
+
+    'MIDTOWN EAST': 'Midtown East',
+    'MURRAY HILL': 'Midtown East',
+    'SUTTON PLACE': 'Midtown East',
+
+    'MIDTOWN WEST': 'Midtown',
+    'MIDTOWN CBD': 'Midtown',
+    'CLINTON': 'Midtown',
+    "HELL'S KITCHEN": "Midtown",
+    'FASHION': 'Midtown',
+
+    'GRAMERCY': 'Gramercy',
+    'KIPS BAY': 'Gramercy',
+    'FLATIRON': 'Gramercy',
+
+    'GREENWICH VILLAGE-CENTRAL': 'Greenwich Village',
+    'GREENWICH VILLAGE-WEST': 'Greenwich Village',
+    'WEST VILLAGE': 'Greenwich Village',
+
+    'CHELSEA': 'Chelsea',
+
+    'SOHO': 'SoHo/TriBeCa',
+    'TRIBECA': 'SoHo/TriBeCa',
+    'LITTLE ITALY': 'SoHo/TriBeCa',
+
+    'FINANCIAL': 'Financial District',
+    'CIVIC CENTER': 'Financial District',
+    'SEAPORT': 'Financial District',
+    'SOUTHBRIDGE': 'Financial District',
+
+    'BATTERY PARK CITY': 'Battery Park City',
+
+    'EAST VILLAGE': 'East Village',
+    'ALPHABET CITY': 'East Village',
+
+    'LOWER EAST SIDE': 'Lower East Side',
+    'CHINATOWN': 'Lower East Side',
+
+    'HARLEM-CENTRAL': 'Harlem',
+    'HARLEM-EAST': 'Harlem',
+    'HARLEM-UPPER': 'Harlem',
+    'HARLEM-WEST': 'Harlem',
+    'MORNINGSIDE HEIGHTS': 'Harlem',
+
+    'WASHINGTON HEIGHTS LOWER': 'Washington Heights',
+    'WASHINGTON HEIGHTS UPPER': 'Washington Heights',
+    'INWOOD': 'Washington Heights',
+}
+
+# 'community_district' scheme: exact (upper-cased) sales neighborhood name to the
+# ACS community district PUMA it falls in
+COMMUNITY_DISTRICT_NAMES = {
+    'UPPER EAST SIDE (59-79)': 'Upper East Side',
+    'UPPER EAST SIDE (79-96)': 'Upper East Side',
+    'UPPER EAST SIDE (96-110)': 'Upper East Side',
+    'UPPER WEST SIDE (59-79)': 'Upper West Side & West Side',
+    'UPPER WEST SIDE (79-96)': 'Upper West Side & West Side',
+    'UPPER WEST SIDE (96-116)': 'Upper West Side & West Side',
+
+    'MIDTOWN EAST': 'Murray Hill, Gramercy & Stuyvesant Town',
+    'MIDTOWN WEST': 'Chelsea, Clinton & Midtown Business District',
+    'MIDTOWN CBD': 'Chelsea, Clinton & Midtown Business District',
+    'MURRAY HILL': 'Murray Hill, Gramercy & Stuyvesant Town',
+    'GRAMERCY': 'Murray Hill, Gramercy & Stuyvesant Town',
+    'CLINTON': 'Chelsea, Clinton & Midtown Business District',
+    'FASHION': 'Chelsea, Clinton & Midtown Business District',
+
+    'GREENWICH VILLAGE-CENTRAL': 'Battery Park City, Greenwich Village & Soho',
+    'GREENWICH VILLAGE-WEST': 'Battery Park City, Greenwich Village & Soho',
+    'SOHO': 'Battery Park City, Greenwich Village & Soho',
+    'TRIBECA': 'Battery Park City, Greenwich Village & Soho',
+    'FINANCIAL': 'Battery Park City, Greenwich Village & Soho',
+    'ALPHABET CITY': 'Chinatown & Lower East Side',
+    'EAST VILLAGE': 'Chinatown & Lower East Side',
+    'LOWER EAST SIDE': 'Chinatown & Lower East Side',
+    'CHINATOWN': 'Chinatown & Lower East Side',
+
+    'HARLEM-CENTRAL': 'Central Harlem',
+    'HARLEM-EAST': 'East Harlem',
+    'HARLEM-UPPER': 'Hamilton Heights, Manhattanville & West Harlem',
+    'HARLEM-WEST': 'Hamilton Heights, Manhattanville & West Harlem',
+    'WASHINGTON HEIGHTS LOWER': 'Washington Heights, Inwood & Marble Hill',
+    'WASHINGTON HEIGHTS UPPER': 'Washington Heights, Inwood & Marble Hill',
+    'INWOOD': 'Washington Heights, Inwood & Marble Hill',
+
+    'CHELSEA': 'Chelsea, Clinton & Midtown Business District',
+    'MANHATTAN VALLEY': 'Upper West Side & West Side',
+    'MORNINGSIDE HEIGHTS': 'Hamilton Heights, Manhattanville & West Harlem',
+    'ROOSEVELT ISLAND': 'Upper East Side',
+    'FLATIRON': 'Murray Hill, Gramercy & Stuyvesant Town',
+    'SOUTHBRIDGE': 'Battery Park City, Greenwich Village & Soho',
+    'CIVIC CENTER': 'Battery Park City, Greenwich Village & Soho',
+    'LITTLE ITALY': 'Chinatown & Lower East Side',
+    'JAVITS CENTER': 'Chelsea, Clinton & Midtown Business District',
+    'KIPS BAY': 'Murray Hill, Gramercy & Stuyvesant Town',
+}
+
+
+def scheme_key(scheme):
+    """Versioned name of a scheme, e.g. ``'zip_v1'``, for keying cached artifacts"""
+    return f"{scheme}_v{NEIGHBORHOOD_SCHEMES[scheme]}"
+
+
+def _build_zip_reference():
+    table = pd.DataFrame(
+        ZIP_REFERENCE_ROWS,
+        columns=['zip_code', 'latitude', 'longitude', 'zip', 'consolidated'],
+    ).set_index('zip_code')
+
+    # Neighborhood names repeat across ZIPs, so store them as categoricals
+    for scheme in ('zip', 'consolidated'):
+        table[scheme] = pd.Categorical(table[scheme])
+    return table
+
+
+ZIP_REFERENCE = _build_zip_reference()
+
+
+def zip_reference(scheme='zip'):
+    """ZIP-indexed frame with ``neighborhood`` (Categorical), ``latitude`` and ``longitude``"""
+    return ZIP_REFERENCE[[scheme, 'latitude', 'longitude']].rename(columns={scheme: 'neighborhood'})
+
+
+def zip_neighborhood_map(scheme='zip'):
+    """Plain ``{zip code: neighborhood}`` dict for a ZIP-based scheme"""
+    return {int(zip_code): str(name) for zip_code, name in ZIP_REFERENCE[scheme].items()}
+
+
+def attach_zip_info(df, scheme='zip', zip_col='ZIP CODE', columns=('neighborhood', 'latitude', 'longitude')):
+    """Join neighborhood and ZIP centroid onto ``df`` in a single merge.
+
+    Rows whose ZIP is not in the reference table are dropped; the original
+    index is kept.
+    """
+    return df.join(zip_reference(scheme)[list(columns)], on=zip_col, how='inner')
+
+
+def classify_neighborhoods(values, keyword_mapping, default=None, keep_unmatched=False):
+    """Map each value to the first ``keyword_mapping`` entry whose key appears in its upper-cased text.
+
+    The keyword scan only runs once per distinct value and the result is
+    broadcast back through the factorized codes, so the cost grows with the
+    number of distinct names rather than the number of rows. Unmatched values
+    become ``default``, or stay as they are when ``keep_unmatched`` is set.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+
+    labels = []
+    for value in uniques:
+        text = str(value).upper()
+        fallback = value if keep_unmatched else default
+        labels.append(next((v for k, v in keyword_mapping.items() if k in text), fallback))
+
+    # Missing values get code -1, which picks up this trailing entry
+    labels.append(np.nan if keep_unmatched else default)
+
+    lookup = np.empty(len(labels), dtype=object)
+    lookup[:] = labels
+    return pd.Series(lookup[codes], index=values.index, name=values.name)
+
+
+def map_zip_codes(values, zip_to_neighborhood):
+    """Vectorized ZIP lookup; values that are not numeric ZIP codes map to NaN"""
+    zip_codes = pd.to_numeric(pd.Series(values), errors='coerce')
+    zip_codes = np.trunc(zip_codes).astype('Int64')
+    return zip_codes.map(zip_to_neighborhood)
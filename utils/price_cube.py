@@ -0,0 +1,272 @@
+# utils/price_cube.py
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.ingest import CACHE_DIR, source_sha256, write_atomic
+from utils.instrumentation import timed, tracked_cache
+from utils.neighborhoods import (
+    CONSOLIDATED_KEYWORDS, attach_zip_info, classify_neighborhoods, map_zip_codes,
+    scheme_key, zip_neighborhood_map,
+)
+from utils.sales_store import available_sales_years, map_sales_years, read_sales_year, sales_workbook_path
+from utils.sketch import SKETCH_ALPHA, PriceSketch, merge_sketches, sketch_values
+
+# Pre-aggregated sale prices, one row per year x scheme x price band x neighborhood.
+# Each year is stored as its own partition so adding or replacing one workbook
+# only rebuilds that year.
+CUBE_DIR = os.path.join(CACHE_DIR, 'cube')
+CUBE_VERSION = 2
+
+# Price filters the pages apply before aggregating: (low, high, closed side)
+PRICE_BANDS = {
+    'positive': (0, np.inf, 'right'),            # every sale with a price
+    'over_10k': (10000, np.inf, 'right'),        # drops nominal transfers
+    'market': (10000, 50000000, 'both'),         # Price Map range
+}
+
+CUBE_SCHEMES = ['zip', 'consolidated', 'sales', 'zip_code']
+
+CUBE_QUANTILES = [0.1, 0.25, 0.75, 0.9]
+
+CUBE_COLUMNS = (
+    ['year', 'scheme', 'band', 'neighborhood', 'count', 'sum', 'mean', 'median']
+    + [f"p{int(q * 100)}" for q in CUBE_QUANTILES]
+    + ['latitude', 'longitude', 'sketch_keys', 'sketch_counts']
+)
+
+
+def find_zip_column(df):
+    if 'ZIP CODE' in df.columns:
+        return 'ZIP CODE'
+
+    zip_variations = ['ZIP', 'ZIPCODE', 'Zip Code', 'zip_code', 'zip', 'Zip']
+    for col in zip_variations:
+        if col in df.columns:
+            return col
+
+    for col in df.columns:
+        if 'zip' in str(col).lower():
+            return col
+    return None
+
+
+def assign_neighborhoods(df, scheme):
+    """Rows of ``df`` that have a neighborhood under ``scheme``, with a ``neighborhood`` column.
+
+    'sales' keeps the workbook's own neighborhood names. 'consolidated' classifies
+    those names and falls back to the ZIP code when a workbook has no usable
+    neighborhood column. 'zip_code' names each row by its ZIP code. 'zip' and
+    'zip_code' also add the ZIP centroid coordinates.
+    """
+    if scheme == 'zip':
+        zip_col = find_zip_column(df)
+        if zip_col is None:
+            return None
+        return attach_zip_info(df[[zip_col, 'sale_price']], 'zip', zip_col=zip_col)
+
+    if scheme == 'zip_code':
+        zip_col = find_zip_column(df)
+        if zip_col is None:
+            return None
+        located = attach_zip_info(df[[zip_col, 'sale_price']], 'zip', zip_col=zip_col,
+                                  columns=('latitude', 'longitude'))
+        return located.assign(neighborhood=located[zip_col].astype('int64').astype(str))
+
+    if scheme == 'sales':
+        if 'neighborhood' not in df.columns:
+            return None
+        return df[['neighborhood', 'sale_price']].dropna(subset=['neighborhood'])
+
+    if scheme == 'consolidated':
+        if 'neighborhood' in df.columns:
+            neighborhoods = classify_neighborhoods(df['neighborhood'], CONSOLIDATED_KEYWORDS)
+        else:
+            zip_col = find_zip_column(df)
+            if zip_col is None:
+                return None
+            neighborhoods = map_zip_codes(df[zip_col], zip_neighborhood_map('consolidated'))
+        out = df[['sale_price']].assign(neighborhood=neighborhoods)
+        return out.dropna(subset=['neighborhood'])
+
+    raise ValueError(f"unknown cube scheme: {scheme}")
+
+
+def aggregate_prices(df):
+    """count/sum/mean/median/quantiles of ``sale_price`` per neighborhood"""
+    # Group on plain strings so neighborhoods come out in name order for every scheme
+    grouped = df.groupby(df['neighborhood'].astype(str))
+    prices = grouped['sale_price']
+
+    stats = prices.agg(['count', 'sum', 'mean', 'median'])
+    for q in CUBE_QUANTILES:
+        stats[f"p{int(q * 100)}"] = prices.quantile(q)
+
+    if 'latitude' in df.columns:
+        stats['latitude'] = grouped['latitude'].mean()
+        stats['longitude'] = grouped['longitude'].mean()
+    else:
+        stats['latitude'] = np.nan
+        stats['longitude'] = np.nan
+
+    # One mergeable quantile sketch per neighborhood, stored as bucket keys/counts
+    sketches = {name: sketch_values(group) for name, group in prices}
+    stats['sketch_keys'] = [sketches[name].keys for name in stats.index]
+    stats['sketch_counts'] = [sketches[name].counts for name in stats.index]
+
+    stats.index.name = 'neighborhood'
+    return stats.reset_index()
+
+
+def build_year_partition(year):
+    """Aggregate one year's workbook for every scheme and band (runs in a worker process)"""
+    df = read_sales_year(year)
+    if df is None:
+        raise FileNotFoundError(f"no sales workbook for {year}")
+    return aggregate_sales(df, year)
+
+
+def aggregate_sales(df, year):
+    """Cube rows for one year's cleaned sales frame"""
+    frames = []
+    for scheme in CUBE_SCHEMES:
+        assigned = assign_neighborhoods(df, scheme)
+        if assigned is None:
+            continue
+        for band, (low, high, closed) in PRICE_BANDS.items():
+            in_band = assigned[assigned['sale_price'].between(low, high, inclusive=closed)]
+            stats = aggregate_prices(in_band)
+            stats.insert(0, 'band', band)
+            stats.insert(0, 'scheme', scheme)
+            stats.insert(0, 'year', year)
+            frames.append(stats)
+
+    if not frames:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[CUBE_COLUMNS]
+
+
+def _definition_hash():
+    # Changing the bands, quantiles or any scheme's version invalidates every partition
+    definition = {
+        'version': CUBE_VERSION,
+        'bands': {name: [low, str(high), closed] for name, (low, high, closed) in PRICE_BANDS.items()},
+        'schemes': [scheme_key(scheme) for scheme in CUBE_SCHEMES],
+        'quantiles': CUBE_QUANTILES,
+        'sketch_alpha': SKETCH_ALPHA,
+    }
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()[:8]
+
+
+def partition_path(year, cube_dir=CUBE_DIR):
+    """Partition file for a year's current workbook, or None if the year has no workbook"""
+    source = sales_workbook_path(year)
+    if source is None:
+        return None
+    return os.path.join(cube_dir, f"{year}-{source_sha256(source)[:16]}-{_definition_hash()}.parquet")
+
+
+def build_price_cube(years=None, cube_dir=CUBE_DIR):
+    """Build any missing year partitions; returns ({year: path}, {year: reason})"""
+    years = available_sales_years() if years is None else [int(y) for y in years]
+    paths = {year: partition_path(year, cube_dir) for year in years}
+    missing = [year for year, path in paths.items() if path is None or not os.path.exists(path)]
+
+    failures = {}
+    if missing:
+        os.makedirs(cube_dir, exist_ok=True)
+    for year, partition, error in map_sales_years(build_year_partition, missing):
+        if error is not None:
+            failures[year] = f"{type(error).__name__}: {error}"
+            paths.pop(year, None)
+            continue
+
+        path = paths[year]
+        write_atomic(lambda tmp: partition.to_parquet(tmp, index=False), path)
+
+        # Drop partitions built from an older workbook or cube definition
+        for old_path in glob.glob(os.path.join(cube_dir, f"{year}-*.parquet")):
+            if old_path != path:
+                os.remove(old_path)
+
+    return paths, failures
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_price_cube():
+    """The whole cube plus the years that failed to build, loaded once per process.
+
+    Returns ``(cube, failures)``. Shared between sessions; use :func:`cube_stats`
+    for a copy of one slice.
+    """
+    try:
+        paths, failures = build_price_cube()
+        partitions = [pd.read_parquet(path) for _, path in sorted(paths.items())]
+    except OSError:
+        # Cache directory not writable: aggregate in memory instead
+        partitions, failures = [], {}
+        for year, partition, error in map_sales_years(build_year_partition, available_sales_years()):
+            if error is not None:
+                failures[year] = f"{type(error).__name__}: {error}"
+            else:
+                partitions.append(partition)
+        partitions.sort(key=lambda p: p['year'].iloc[0] if len(p) else 0)
+
+    if not partitions:
+        return pd.DataFrame(columns=CUBE_COLUMNS), failures
+    return pd.concat(partitions, ignore_index=True), failures
+
+
+def cube_years(scheme='zip', band='positive'):
+    """Years that have at least one neighborhood under ``scheme`` and ``band``"""
+    cube, _ = load_price_cube()
+    rows = cube[(cube['scheme'] == scheme) & (cube['band'] == band)]
+    return sorted(rows['year'].unique().tolist())
+
+
+def merged_sketch(years, scheme, band, neighborhoods=None):
+    """One quantile sketch over the union of cells, e.g. several years or neighborhoods.
+
+    Medians and percentiles read from it are approximate (see ``utils.sketch``)
+    but never touch the raw rows.
+    """
+    cube, _ = load_price_cube()
+    mask = cube['year'].isin([int(y) for y in years]) & (cube['scheme'] == scheme) & (cube['band'] == band)
+    if neighborhoods is not None:
+        mask &= cube['neighborhood'].isin(list(neighborhoods))
+
+    cells = cube.loc[mask, ['sketch_keys', 'sketch_counts']]
+    return merge_sketches(
+        PriceSketch(np.asarray(keys), np.asarray(counts), SKETCH_ALPHA)
+        for keys, counts in zip(cells['sketch_keys'], cells['sketch_counts'])
+    )
+
+
+def cube_stats(year, scheme, band):
+    """Per-neighborhood price stats for one year, scheme and band (a new frame, sorted by name)"""
+    cube, _ = load_price_cube()
+    mask = (cube['year'] == int(year)) & (cube['scheme'] == scheme) & (cube['band'] == band)
+    return cube.loc[mask, CUBE_COLUMNS[3:]].reset_index(drop=True)
+
+
+@timed("price_cube.neighborhood_prices")
+def neighborhood_prices(year, scheme='sales', band='over_10k'):
+    """``mean_price``, ``median_price`` and ``sale_count`` per neighborhood, or None if the year has no sales"""
+    prices = cube_stats(year, scheme, band)
+    if prices.empty:
+        return None
+    prices = prices[['neighborhood', 'mean', 'median', 'count']]
+    return prices.rename(columns={'mean': 'mean_price', 'median': 'median_price', 'count': 'sale_count'})
+
+
+if __name__ == "__main__":
+    built, failed = build_price_cube()
+    for built_year, built_path in sorted(built.items()):
+        print(f"{built_year} -> {built_path}")
+    for failed_year, reason in sorted(failed.items()):
+        print(f"{failed_year} failed: {reason}")
@@ -0,0 +1,232 @@
+# utils/sales_store.py
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.ingest import SALES_DIR, read_workbook
+from utils.instrumentation import tracked_cache
+
+SALES_YEARS = list(range(2015, 2024))
+SALES_EXTENSIONS = ('.xls', '.xlsx', '.parquet')
+
+# Compact dtypes for the sales columns, matched on header names with the stray
+# whitespace and the 2019 misspelling of older workbooks ignored. sale_price is
+# left alone: prices reach into the billions, past float32's exact integers.
+SALES_DTYPES = {
+    'BOROUGH': 'uint8',
+    'neighborhood': 'category',
+    'ADDRESS': 'string[pyarrow]',
+    'ZIP CODE': 'uint32',
+}
+_HEADER_ALIASES = {'neighorhood': 'neighborhood'}
+
+# Pool workers start from a fresh interpreter rather than a fork of the running
+# server: a forked child of a multithreaded process can inherit a lock (logging,
+# pyarrow, the Streamlit caches) held by a thread that does not exist in it.
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+_main_lock = threading.Lock()
+
+
+def sales_workbook_path(year):
+    """Locate the rolling-sales workbook for a year, or None if there is none"""
+    year = int(year)
+    # 2015-2017 were only published as legacy .xls workbooks; generated data
+    # sets too large for a worksheet are written as Parquet
+    extensions = ['.xls', '.xlsx', '.parquet'] if year <= 2017 else ['.xlsx', '.xls', '.parquet']
+    for ext in extensions:
+        path = os.path.join(SALES_DIR, f"{year}_manhattan{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def available_sales_years():
+    """Years in SALES_DIR that have a workbook, including ones added after SALES_YEARS"""
+    years = set()
+    for name in os.listdir(SALES_DIR):
+        stem, ext = os.path.splitext(name)
+        if ext in SALES_EXTENSIONS and stem.endswith('_manhattan') and stem[:4].isdigit():
+            years.add(int(stem[:4]))
+    return sorted(years)
+
+
+def _find_price_column(df):
+    if 'sale_price' in df.columns:
+        return 'sale_price'
+    # Older workbooks carry stray whitespace in their headers ("sale_price\n")
+    candidates = [col for col in df.columns if 'price' in str(col).lower() or 'sale' in str(col).lower()]
+    return candidates[0] if candidates else None
+
+
+def _compact_integers(values, dtype):
+    numbers = pd.to_numeric(values, errors='coerce')
+    if numbers.isna().sum() > values.isna().sum():
+        return values  # some values are not numbers; keep them as they are
+    info = np.iinfo(dtype)
+    present = numbers.dropna()
+    if not ((present >= info.min) & (present <= info.max) & (present == np.trunc(present))).all():
+        return values
+    if numbers.isna().any():
+        return numbers.astype(dtype.replace('uint', 'UInt'))
+    return numbers.astype(dtype)
+
+
+def apply_sales_schema(df):
+    """Cast the columns named in :data:`SALES_DTYPES`; a column whose values do not
+    fit its compact type keeps the type it had."""
+    for col in df.columns:
+        name = str(col).strip()
+        dtype = SALES_DTYPES.get(_HEADER_ALIASES.get(name, name))
+        if dtype is None:
+            continue
+        if dtype in ('category', 'string[pyarrow]'):
+            df[col] = df[col].astype(dtype)
+        else:
+            df[col] = _compact_integers(df[col], dtype)
+    return df
+
+
+def bytes_per_row(df):
+    """Memory held per row, counting the string data behind object columns"""
+    return df.memory_usage(deep=True).sum() / max(len(df), 1)
+
+
+def read_sales_year(year, compact=True):
+    """Read and clean one year of sales without touching the Streamlit cache.
+
+    Every row with a positive numeric ``sale_price`` is kept; the stricter price
+    floors some pages use are applied later by :func:`sales_view`. All other
+    columns keep the workbook's names and, with ``compact``, are cast to
+    :data:`SALES_DTYPES`.
+    """
+    path = sales_workbook_path(year)
+    if path is None:
+        return None
+
+    df = read_workbook(path)
+
+    price_col = _find_price_column(df)
+    if price_col is None:
+        return None
+    if price_col != 'sale_price':
+        df = df.rename(columns={price_col: 'sale_price'})
+
+    df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce')
+    if compact:
+        df = apply_sales_schema(df)
+    df = df[df['sale_price'] > 0]
+
+    return df
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def _load_sales_year(year):
+    return read_sales_year(year)
+
+
+def load_sales_year(year):
+    """Canonical sales frame for a year, loaded once per process and shared by every page.
+
+    The returned frame is shared between sessions and must not be modified;
+    use :func:`sales_view` to get a filtered copy that is safe to change.
+    """
+    return _load_sales_year(int(year))
+
+
+def sales_view(year, min_price=0, max_price=None, columns=None):
+    """Rows of a year's sales with ``min_price < sale_price <= max_price``.
+
+    ``columns`` limits the projection to what the caller actually uses, which
+    keeps per-page copies small. Always returns a new frame (or None when the
+    year has no workbook).
+    """
+    df = load_sales_year(year)
+    if df is None:
+        return None
+
+    mask = df['sale_price'] > min_price
+    if max_price is not None:
+        mask &= df['sale_price'] <= max_price
+
+    if columns is None:
+        return df.loc[mask].copy()
+    return df.loc[mask, list(columns)].copy()
+
+
+@contextmanager
+def _workers_without_page_main():
+    # Streamlit runs the page script as __main__, and a new worker imports
+    # __main__ again before it runs anything, which would rerun the page in
+    # every worker. Workers only need func's own module, so inside a script
+    # run they are started while __main__ is a blank module.
+    if get_script_run_ctx() is None:
+        yield
+        return
+    with _main_lock:
+        main = sys.modules['__main__']
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+
+
+def map_sales_years(func, years=SALES_YEARS, max_workers=None):
+    """Run ``func(year)`` for each year across a process pool.
+
+    Yields ``(year, result, error)`` as each year finishes, so one slow or
+    broken workbook neither blocks nor hides the others. ``func`` must be a
+    module-level function (it is pickled to the workers) and should return
+    something small, such as per-year aggregates, rather than the raw frame.
+    If a pool cannot be started the years are run in this process instead.
+    """
+    years = [int(year) for year in years]
+    if max_workers is None:
+        max_workers = min(len(years), os.cpu_count() or 1)
+
+    pending = list(years)
+    if max_workers > 1:
+        try:
+            context = multiprocessing.get_context(POOL_START_METHOD)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+                # Workers start as tasks are submitted
+                with _workers_without_page_main():
+                    futures = {pool.submit(func, year): year for year in years}
+                for future in as_completed(futures):
+                    year = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        pending.remove(year)
+                        yield year, None, e
+                    else:
+                        pending.remove(year)
+                        yield year, result, None
+            return
+        except (OSError, BrokenProcessPool):
+            # No pool available (sandboxed host, killed worker): finish in-process
+            pass
+
+    for year in pending:
+        try:
+            yield year, func(year), None
+        except Exception as e:
+            yield year, None, e
+
+
+if __name__ == "__main__":
+    for sales_year in available_sales_years():
+        workbook_frame = read_sales_year(sales_year, compact=False)
+        compact_frame = read_sales_year(sales_year)
+        print(f"{sales_year}: {len(compact_frame):,} rows, {bytes_per_row(workbook_frame):.0f} -> "
+              f"{bytes_per_row(compact_frame):.0f} bytes/row")
@@ -0,0 +1,87 @@
+# utils/sketch.py
+from collections import namedtuple
+
+import numpy as np
+
+# Mergeable quantile sketch over positive values (DDSketch-style log buckets).
+#
+# A value x lands in bucket ceil(log_gamma(x)) with gamma = (1 + alpha) / (1 - alpha),
+# and a bucket is reported as the single value within relative distance alpha of
+# everything it holds. Any quantile read from a sketch is therefore within
+# ``alpha`` relative error of the exact value at that rank, and stays so after
+# merging, because merging just adds bucket counts. At alpha = 0.01 a $1,000,000
+# median is reported as something between $990,000 and $1,010,000.
+#
+# Restricting a sketch to a price range keeps whole buckets, so values that share
+# a bucket with one of the range bounds (within alpha of it) can be counted on
+# the wrong side. That shifts the rank a quantile is read at by at most the
+# count of those two buckets; on a sparse selection the value at the shifted
+# rank can then be further than alpha from the exact one.
+SKETCH_ALPHA = 0.01
+
+PriceSketch = namedtuple('PriceSketch', ['keys', 'counts', 'alpha'])
+
+
+def _gamma(alpha):
+    return (1 + alpha) / (1 - alpha)
+
+
+def empty_sketch(alpha=SKETCH_ALPHA):
+    return PriceSketch(np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), alpha)
+
+
+def sketch_values(values, alpha=SKETCH_ALPHA):
+    """Sketch an array of positive values; non-positive and missing values are skipped"""
+    values = np.asarray(values, dtype=float)
+    values = values[values > 0]
+    if len(values) == 0:
+        return empty_sketch(alpha)
+
+    bucket = np.ceil(np.log(values) / np.log(_gamma(alpha))).astype(np.int32)
+    keys, counts = np.unique(bucket, return_counts=True)
+    return PriceSketch(keys, counts.astype(np.int64), alpha)
+
+
+def merge_sketches(sketches, alpha=SKETCH_ALPHA):
+    """Union of several sketches built with the same ``alpha``"""
+    sketches = [s for s in sketches if len(s.keys)]
+    if not sketches:
+        return empty_sketch(alpha)
+    if any(s.alpha != sketches[0].alpha for s in sketches):
+        raise ValueError("cannot merge sketches built with different alpha")
+
+    keys, inverse = np.unique(np.concatenate([s.keys for s in sketches]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([s.counts for s in sketches]))
+    return PriceSketch(keys, counts.astype(np.int64), sketches[0].alpha)
+
+
+def bucket_values(sketch):
+    """Representative value of each bucket (within ``alpha`` of anything in it)"""
+    gamma = _gamma(sketch.alpha)
+    return 2 * gamma ** sketch.keys.astype(float) / (gamma + 1)
+
+
+def restrict_sketch(sketch, low=None, high=None):
+    """Buckets whose representative value lies in ``[low, high]``"""
+    values = bucket_values(sketch)
+    mask = np.ones(len(values), dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return PriceSketch(sketch.keys[mask], sketch.counts[mask], sketch.alpha)
+
+
+def sketch_count(sketch):
+    return int(sketch.counts.sum())
+
+
+def sketch_quantile(sketch, q):
+    """Approximate ``q``-quantile (0 <= q <= 1), or NaN for an empty sketch"""
+    n = sketch_count(sketch)
+    if n == 0:
+        return np.nan
+
+    rank = q * (n - 1)
+    idx = np.searchsorted(np.cumsum(sketch.counts), rank, side='right')
+    return float(bucket_values(sketch)[min(idx, len(sketch.keys) - 1)])
@@ -0,0 +1,258 @@
+# utils/spatial.py
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import shapely
+import streamlit as st
+from scipy.spatial import cKDTree
+
+from utils.geometry import GEOMETRY_SCHEMES, MODZCTA_PATH, read_modzcta
+from utils.instrumentation import tracked_cache
+
+# Point-in-polygon joins for geocoded rows (facilities, or sales once they carry
+# coordinates).
+#
+# The polygons go into an STRtree once. A join buckets the points into small
+# grid cells and asks the tree about each occupied cell rather than each point:
+# every point in a cell that lies inside one polygon is assigned at once, and
+# only points in cells crossing a polygon edge are tested against the prepared
+# candidate polygons with intersects_xy. A few hundred thousand points take a
+# fraction of a second. A point on an edge shared by two polygons goes to one of
+# them.
+PolygonIndex = namedtuple('PolygonIndex', ['tree', 'geometries', 'labels'])
+
+# About 200 m at Manhattan's latitude, well under the size of a MODZCTA
+CELL_DEGREES = 0.002
+
+# Nearest-point and within-radius queries go through a KD-tree over the points'
+# positions on the unit sphere. Straight-line (chord) distance there ranks
+# points exactly like distance along the Earth's surface, so the tree finds the
+# nearest point and a surface radius becomes a chord radius; the reported
+# distance is then the haversine distance to the point found.
+PointIndex = namedtuple('PointIndex', ['tree', 'lon', 'lat'])
+
+EARTH_RADIUS_KM = 6371.0088
+ACCESS_RADII_KM = (0.5, 1, 2)
+
+# Density maps bin points into pointy-top hexagons on a flat projection around
+# a fixed origin, so the same point always lands in the same hexagon whatever
+# else is selected. Sizes are centre-to-corner distances; the browser gets one
+# polygon per occupied hexagon instead of one marker per point.
+HEXBIN_SIZES_KM = (0.25, 0.5, 1, 2)
+HEXBIN_ORIGIN = (-73.97, 40.78)
+KM_PER_DEGREE_LAT = 110.574
+
+
+def build_polygon_index(geometries, labels):
+    """STRtree over ``geometries``; a match is reported as the matching ``labels`` entry"""
+    geometries = np.asarray(geometries, dtype=object)
+    shapely.prepare(geometries)
+    return PolygonIndex(shapely.STRtree(geometries), geometries, np.asarray(labels))
+
+
+def _first_match(items, polygons, out):
+    # Lowest polygon position for each item that matched any
+    order = np.lexsort((polygons, items))
+    items, polygons = items[order], polygons[order]
+    first = np.unique(items, return_index=True)[1]
+    out[items[first]] = polygons[first]
+
+
+def locate_points(index, lon, lat):
+    """Position in ``index`` of the polygon containing each point, or -1 if none does"""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    found = np.full(len(lon), -1, dtype=np.intp)
+
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if not len(valid):
+        return found
+    lon, lat = lon[valid], lat[valid]
+
+    x = np.floor(lon / CELL_DEGREES).astype(np.int64)
+    y = np.floor(lat / CELL_DEGREES).astype(np.int64)
+    x0, y0 = x.min(), y.min()
+    height = y.max() - y0 + 1
+    cell_of, keys = pd.factorize((x - x0) * height + (y - y0))
+    cell_x = (keys // height + x0) * CELL_DEGREES
+    cell_y = (keys % height + y0) * CELL_DEGREES
+    boxes = shapely.box(cell_x, cell_y, cell_x + CELL_DEGREES, cell_y + CELL_DEGREES)
+
+    # Cells inside a polygon settle all of their points
+    cell_polygon = np.full(len(keys), -1, dtype=np.intp)
+    _first_match(*index.tree.query(boxes, predicate='within'), cell_polygon)
+    point_polygon = cell_polygon[cell_of]
+
+    # Points in the other cells are tested against each polygon their cell touches
+    cells, polygons = index.tree.query(boxes, predicate='intersects')
+    edge = cell_polygon[cells] < 0
+    cells, polygons = cells[edge], polygons[edge]
+    order = np.argsort(cells, kind='stable')
+    cells, polygons = cells[order], polygons[order]
+    starts = np.searchsorted(cells, np.arange(len(keys)))
+    counts = np.bincount(cells, minlength=len(keys))
+
+    pending = np.flatnonzero(point_polygon < 0)
+    repeats = counts[cell_of[pending]]
+    points = np.repeat(pending, repeats)
+    offsets = np.arange(len(points)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    candidates = polygons[np.repeat(starts[cell_of[pending]], repeats) + offsets]
+    hits = shapely.intersects_xy(index.geometries[candidates], lon[points], lat[points])
+    _first_match(points[hits], candidates[hits], point_polygon)
+
+    found[valid] = point_polygon
+    return found
+
+
+def label_points(index, lon, lat):
+    """Label of the polygon containing each point; NaN outside every polygon"""
+    found = locate_points(index, lon, lat)
+    labels = pd.Series(index.labels[np.maximum(found, 0)], dtype=object)
+    return labels.where(found >= 0).to_numpy()
+
+
+@tracked_cache(st.cache_resource, show_spinner=False)
+def load_zip_index():
+    """Index over the Manhattan MODZCTA polygons, labelled by ZIP code"""
+    modzcta = read_modzcta(MODZCTA_PATH)
+    return build_polygon_index(modzcta.geometry.to_numpy(), modzcta['zipcode'].to_numpy())
+
+
+def join_points(df, lon_col, lat_col, zip_col='MODZCTA', neighborhood_col='neighborhood', scheme='zip'):
+    """Copy of ``df`` with the MODZCTA and neighborhood each row's coordinates fall in.
+
+    Neighborhood polygons are unions of MODZCTAs, so one lookup gives both; rows
+    outside Manhattan, without coordinates or in a ZIP the scheme does not
+    cover get NaN.
+    """
+    zips = pd.Series(label_points(load_zip_index(), df[lon_col], df[lat_col]), index=df.index)
+    df = df.copy()
+    df[zip_col] = zips.astype('Int64')
+    df[neighborhood_col] = zips.map(GEOMETRY_SCHEMES[scheme])
+    return df
+
+
+def _unit_vectors(lon, lat):
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def haversine_km(lon1, lat1, lon2, lat2):
+    """Great-circle distance in km, elementwise"""
+    lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=float)) for v in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def build_point_index(lon, lat):
+    """KD-tree over points (facilities, say) for :func:`access_metrics`; points without coordinates are left out"""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    lon, lat = lon[valid], lat[valid]
+    return PointIndex(cKDTree(_unit_vectors(lon, lat)), lon, lat)
+
+
+def access_metrics(index, lon, lat, radii_km=ACCESS_RADII_KM):
+    """For each query point: km to the nearest indexed point (``nearest_km``), its
+    position in the index (``nearest``) and how many indexed points lie within
+    each radius (``within_1km`` and so on).
+
+    Query points without coordinates, or an empty index, give NaN distances,
+    position -1 and zero counts.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    nearest_km = np.full(len(lon), np.nan)
+    nearest = np.full(len(lon), -1, dtype=np.intp)
+    counts = {radius: np.zeros(len(lon), dtype=np.int64) for radius in radii_km}
+
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if len(valid) and len(index.lon):
+        # Geocoded rows repeat coordinates (sales at one address or ZIP
+        # centroid), so each distinct location is queried once
+        lon_codes, lon_values = pd.factorize(lon[valid])
+        lat_codes, lat_values = pd.factorize(lat[valid])
+        codes, places = pd.factorize(lon_codes.astype(np.int64) * len(lat_values) + lat_codes)
+        place_lon = lon_values[places // len(lat_values)]
+        place_lat = lat_values[places % len(lat_values)]
+        xyz = _unit_vectors(place_lon, place_lat)
+
+        _, found = index.tree.query(xyz, workers=-1)
+        distance = haversine_km(place_lon, place_lat, index.lon[found], index.lat[found])
+        nearest[valid] = found[codes]
+        nearest_km[valid] = distance[codes]
+        for radius in radii_km:
+            # Places whose nearest point is beyond the radius have nothing within it
+            near = np.flatnonzero(distance <= radius)
+            place_counts = np.zeros(len(xyz), dtype=np.int64)
+            chord = 2 * np.sin(radius / (2 * EARTH_RADIUS_KM))
+            place_counts[near] = index.tree.query_ball_point(xyz[near], chord, return_length=True, workers=-1)
+            counts[radius][valid] = place_counts[codes]
+
+    metrics = pd.DataFrame({'nearest_km': nearest_km, 'nearest': nearest})
+    for radius in radii_km:
+        metrics[f"within_{radius:g}km"] = counts[radius]
+    return metrics
+
+
+def _km_per_degree_lon(origin):
+    return 111.320 * np.cos(np.radians(origin[1]))
+
+
+def hexbin_points(lon, lat, size_km, origin=HEXBIN_ORIGIN):
+    """Point counts per occupied hexagon: ``hex_id``, ``count`` and the hexagon's
+    centre as ``longitude``/``latitude``. Points without coordinates are skipped."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    valid = np.isfinite(lon) & np.isfinite(lat)
+    x = (lon[valid] - origin[0]) * _km_per_degree_lon(origin) / size_km
+    y = (lat[valid] - origin[1]) * KM_PER_DEGREE_LAT / size_km
+
+    # Axial coordinates, rounded to the nearest hexagon in cube coordinates
+    q = np.sqrt(3) / 3 * x - y / 3
+    r = 2 / 3 * y
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    cells = pd.DataFrame({'q': rq.astype(np.int64), 'r': rr.astype(np.int64)})
+    bins = cells.groupby(['q', 'r']).size().rename('count').reset_index()
+    bins.insert(0, 'hex_id', bins['q'].astype(str) + ',' + bins['r'].astype(str))
+
+    centre_x = np.sqrt(3) * (bins['q'] + bins['r'] / 2) * size_km
+    centre_y = 1.5 * bins['r'] * size_km
+    bins['longitude'] = origin[0] + centre_x / _km_per_degree_lon(origin)
+    bins['latitude'] = origin[1] + centre_y / KM_PER_DEGREE_LAT
+    return bins
+
+
+def hexbin_geojson(bins, size_km, origin=HEXBIN_ORIGIN, decimals=5):
+    """GeoJSON FeatureCollection of the hexagons in ``bins``, each with ``id`` = ``hex_id``"""
+    angles = np.radians(30 + 60 * np.arange(7))
+    corner_lon = bins['longitude'].to_numpy()[:, None] + size_km * np.cos(angles) / _km_per_degree_lon(origin)
+    corner_lat = bins['latitude'].to_numpy()[:, None] + size_km * np.sin(angles) / KM_PER_DEGREE_LAT
+    corners = np.round(np.stack([corner_lon, corner_lat], axis=-1), decimals).tolist()
+
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'id': hex_id, 'properties': {},
+             'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+            for hex_id, ring in zip(bins['hex_id'], corners)
+        ],
+    }
+
+
+def hexbin_levels(lon, lat, sizes_km=HEXBIN_SIZES_KM, origin=HEXBIN_ORIGIN):
+    """``{size_km: (bins, geojson)}`` for every size, so switching sizes needs no rebinning"""
+    levels = {}
+    for size_km in sizes_km:
+        bins = hexbin_points(lon, lat, size_km, origin)
+        levels[size_km] = (bins, hexbin_geojson(bins, size_km, origin))
+    return levels
@@ -0,0 +1,180 @@
+# utils/synthetic_sales.py
+import argparse
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.ingest import read_workbook
+from utils.neighborhoods import ZIP_REFERENCE
+
+# Generated sales are fitted to the bundled workbooks, so they keep Manhattan's
+# neighborhood/ZIP mix, price spread per neighborhood and year-to-year level
+SOURCE_DIR = "datasets"
+SALES_COLUMNS = ['BOROUGH', 'neighborhood', 'ADDRESS', 'ZIP CODE', 'sale_price']
+CHUNK_ROWS = 1000000
+EXCEL_MAX_ROWS = 1048575
+
+# Neighborhoods with fewer market sales than this borrow the median spread
+MIN_FIT_SALES = 20
+NOMINAL_PRICES = [1, 10, 100, 1000, 10000]
+
+_STREET = re.compile(r'^\s*[\d-]+\s+(.+?)\s*(?:,\s*(.*))?$')
+
+
+def _read_source_year(path, cache_dir):
+    df = read_workbook(path, cache_dir)
+    # Older workbooks carry "\n" at the end of their headers and a misspelt
+    # neighborhood column
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.rename(columns={'neighorhood': 'neighborhood'})
+    if not set(SALES_COLUMNS) <= set(df.columns):
+        return None
+    df = df[SALES_COLUMNS].copy()
+    df['sale_price'] = pd.to_numeric(df['sale_price'], errors='coerce')
+    df['neighborhood'] = df['neighborhood'].astype(str).str.strip()
+    return df.dropna(subset=['sale_price', 'ZIP CODE'])
+
+
+def fit_sales_profile(source_dir=SOURCE_DIR):
+    """Distributions of the bundled sales that :func:`generate_sales_year` samples from.
+
+    Only ZIPs in the ZIP reference table are used. Prices are modelled as
+    lognormal per neighborhood around a yearly price level, so the shape comes
+    from every year and the level from each year's median.
+    """
+    cache_dir = os.path.join(source_dir, '_cache')
+    frames = []
+    for path in sorted(glob.glob(os.path.join(source_dir, '*_manhattan.xls*'))):
+        df = _read_source_year(path, cache_dir)
+        if df is not None:
+            frames.append(df.assign(year=int(os.path.basename(path)[:4])))
+    if not frames:
+        raise FileNotFoundError(f"no sales workbooks with a neighborhood column in {source_dir}")
+    sales = pd.concat(frames, ignore_index=True)
+    sales = sales[sales['ZIP CODE'].astype(int).isin(ZIP_REFERENCE.index)]
+
+    market = sales[sales['sale_price'] > 10000].copy()
+    market['log_price'] = np.log(market['sale_price'])
+    year_level = market.groupby('year')['log_price'].median()
+    market['relative'] = market['log_price'] - market['year'].map(year_level)
+
+    spread = market.groupby('neighborhood')['relative'].agg(['count', 'mean', 'std'])
+    fallback = spread.loc[spread['count'] >= MIN_FIT_SALES, 'std'].median()
+    spread['std'] = spread['std'].where(spread['count'] >= MIN_FIT_SALES, fallback)
+
+    pairs = (sales.groupby(['neighborhood', 'ZIP CODE']).size()
+             .rename('weight').reset_index())
+    pairs = pairs[pairs['neighborhood'].isin(spread.index)].reset_index(drop=True)
+
+    parsed = sales['ADDRESS'].astype(str).str.extract(_STREET)
+    streets = (pd.DataFrame({'neighborhood': sales['neighborhood'], 'street': parsed[0]})
+               .dropna().drop_duplicates())
+
+    prices = sales['sale_price']
+    return {
+        'pairs': pairs,
+        'spread': spread[['mean', 'std']],
+        'year_level': year_level,
+        'streets': streets.groupby('neighborhood')['street'].apply(list).to_dict(),
+        'unit_share': parsed[1].notna().mean(),
+        'zero_share': (prices == 0).mean(),
+        'nominal_share': ((prices > 0) & (prices <= 10000)).mean(),
+    }
+
+
+def price_level(profile, year):
+    """Median log price for a year; outside the bundled years the trend is extrapolated"""
+    level = profile['year_level']
+    if year in level.index:
+        return level[year]
+    slope, intercept = np.polyfit(level.index.to_numpy(float), level.to_numpy(), 1)
+    return intercept + slope * year
+
+
+def generate_sales_year(profile, year, rows, seed=0, chunk=0):
+    """``rows`` synthetic sales for ``year`` in the rolling-sales workbook layout"""
+    rng = np.random.default_rng([seed, year, chunk])
+    pairs = profile['pairs']
+    picked = pairs.iloc[rng.choice(len(pairs), rows, p=pairs['weight'] / pairs['weight'].sum())]
+    neighborhoods = picked['neighborhood'].to_numpy()
+
+    spread = profile['spread'].loc[neighborhoods]
+    log_price = price_level(profile, year) + spread['mean'].to_numpy() + spread['std'].to_numpy() * rng.standard_normal(rows)
+    prices = np.round(np.exp(log_price), -3)
+
+    kind = rng.random(rows)
+    nominal = kind < profile['nominal_share']
+    zero = (kind >= profile['nominal_share']) & (kind < profile['nominal_share'] + profile['zero_share'])
+    prices[nominal] = rng.choice(NOMINAL_PRICES, nominal.sum())
+    prices[zero] = 0
+
+    streets = np.empty(rows, dtype=object)
+    for name, index in pd.Series(np.arange(rows)).groupby(neighborhoods):
+        options = profile['streets'].get(name) or ['BROADWAY']
+        streets[index.to_numpy()] = rng.choice(options, len(index))
+    numbers = rng.integers(1, 1000, rows).astype(str)
+    addresses = pd.Series(numbers, dtype=object) + ' ' + streets
+    units = rng.random(rows) < profile['unit_share']
+    unit_labels = pd.Series(rng.integers(1, 40, rows).astype(str)) + pd.Series(rng.choice(list('ABCDEFGH'), rows))
+    addresses[units] = addresses[units] + ', ' + unit_labels[units]
+
+    df = pd.DataFrame({
+        'BOROUGH': np.ones(rows, dtype=np.int64),
+        'neighborhood': neighborhoods,
+        'ADDRESS': addresses.to_numpy(),
+        'ZIP CODE': picked['ZIP CODE'].to_numpy(np.int64),
+        'sale_price': prices.astype(np.int64),
+    })
+    # The published workbooks are ordered by neighborhood
+    return df.sort_values('neighborhood', kind='stable', ignore_index=True)
+
+
+def write_sales_year(profile, year, rows, out_dir, file_format='parquet', seed=0):
+    """Write one year's synthetic sales as ``{year}_manhattan.parquet`` (or ``.xlsx``)"""
+    os.makedirs(out_dir, exist_ok=True)
+    if file_format == 'xlsx':
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"{rows:,} rows do not fit in one worksheet; use parquet")
+        path = os.path.join(out_dir, f"{year}_manhattan.xlsx")
+        generate_sales_year(profile, year, rows, seed).to_excel(path, index=False)
+        return path
+
+    # Large years are generated a chunk at a time so memory stays flat
+    path = os.path.join(out_dir, f"{year}_manhattan.parquet")
+    writer = None
+    try:
+        for chunk, start in enumerate(range(0, rows, CHUNK_ROWS)):
+            df = generate_sales_year(profile, year, min(CHUNK_ROWS, rows - start), seed, chunk)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+def _year_range(text):
+    first, _, last = text.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m utils.synthetic_sales",
+                                     description="Write synthetic rolling-sales data; run the app on it with SALES_DIR=<out_dir>")
+    parser.add_argument("out_dir")
+    parser.add_argument("--rows", type=int, default=1000000, help="sales per year")
+    parser.add_argument("--years", type=_year_range, default=_year_range("2015-2023"), help="e.g. 1990-2023")
+    parser.add_argument("--format", choices=["parquet", "xlsx"], default="parquet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sales_profile = fit_sales_profile()
+    for sales_year in args.years:
+        print(f"{sales_year} -> {write_sales_year(sales_profile, sales_year, args.rows, args.out_dir, args.format, args.seed)}")
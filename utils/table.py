@@ -0,0 +1,72 @@
+# utils/table.py
+import math
+
+import numpy as np
+import streamlit as st
+
+from utils.instrumentation import tracked_cache
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+@tracked_cache(st.cache_resource, show_spinner=False, max_entries=64)
+def sorted_positions(_df, frame_key, column, ascending):
+    """Row positions of ``_df`` ordered by ``column``, computed once per process.
+
+    ``frame_key`` names the (shared, never modified) frame for the cache. The
+    sort is stable, so ties keep their original row order, and missing values
+    go last in both directions.
+    """
+    values = _df[column].reset_index(drop=True)
+    order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index
+    return order.to_numpy()
+
+
+@tracked_cache(st.cache_resource, show_spinner=False, max_entries=64)
+def sorted_ranks(_df, frame_key, column, ascending):
+    """Each row's place in :func:`sorted_positions` order"""
+    order = sorted_positions(_df, frame_key, column, ascending)
+    ranks = np.empty(len(order), dtype=np.intp)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def paginated_table(df, frame_key, columns, sort_column=None, ascending=True, mask=None, rows=None):
+    """Show one page of ``df[mask]`` (or of the row positions ``rows``) sorted by ``sort_column``.
+
+    Filtering and sorting only combine a boolean mask with a cached
+    permutation; the rows on the visible page are the only ones copied out of
+    ``df``. With ``rows`` (e.g. from a filter index) the cost follows the
+    number of rows selected instead of the frame size. Returns the filtered
+    row positions in display order.
+    """
+    if rows is not None:
+        positions = np.asarray(rows)
+        if sort_column is not None:
+            ranks = sorted_ranks(df, frame_key, sort_column, ascending)
+            positions = positions[np.argsort(ranks[positions])]
+    else:
+        if sort_column is None:
+            positions = np.arange(len(df))
+        else:
+            positions = sorted_positions(df, frame_key, sort_column, ascending)
+        if mask is not None:
+            positions = positions[np.asarray(mask)[positions]]
+
+    total = len(positions)
+    size_col, page_col = st.columns([1, 1])
+    with size_col:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{frame_key}_page_size")
+    with page_col:
+        page_count = max(1, math.ceil(total / page_size))
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, key=f"{frame_key}_page")
+
+    start = (min(page, page_count) - 1) * page_size
+    page_positions = positions[start:start + page_size]
+    st.dataframe(df.iloc[page_positions][list(columns)], use_container_width=True)
+
+    if total:
+        st.caption(f"Rows {start + 1:,}-{start + len(page_positions):,} of {total:,} (page {page} of {page_count})")
+    else:
+        st.caption("No rows match the current filters.")
+    return positions
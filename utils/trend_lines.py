@@ -0,0 +1,39 @@
+# utils/trend_lines.py
+import numpy as np
+import plotly.graph_objects as go
+
+# Line charts with one line per neighborhood, where only a few are highlighted.
+# The data is split by neighborhood in one sort instead of one boolean filter
+# per neighborhood. Every line is its own WebGL trace, so the legend and hover
+# name each neighborhood without repeating the name per point.
+BACKGROUND_LINE = dict(color='rgba(200, 200, 200, 0.5)', width=1.5)
+BACKGROUND_OPACITY = 0.7
+HIGHLIGHT_WIDTH = 3
+
+
+def split_lines(df, group_col, x_col, y_col):
+    """{group: (x, y)} for every group in ``df``, each sorted by x, in group order"""
+    ordered = df.sort_values([group_col, x_col], kind='stable')
+    groups = ordered[group_col].to_numpy()
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.empty(0, int)
+    bounds = np.r_[starts, len(groups)]
+    x = ordered[x_col].to_numpy()
+    y = ordered[y_col].to_numpy(dtype=float)
+    return {groups[start]: (x[start:end], y[start:end]) for start, end in zip(bounds[:-1], bounds[1:])}
+
+
+def neighborhood_trend_traces(df, value_col, selected, hovertemplate, group_col='Neighborhood', x_col='Year'):
+    """One trace per neighborhood, in name order, with ``selected`` highlighted.
+
+    ``hovertemplate`` gets the neighborhood name as ``%{fullData.name}``.
+    """
+    selected = set(selected or [])
+    traces = []
+    for name, (x, y) in sorted(split_lines(df, group_col, x_col, value_col).items()):
+        if name in selected:
+            style = dict(line=dict(width=HIGHLIGHT_WIDTH))  # plotly default color
+        else:
+            style = dict(line=BACKGROUND_LINE, opacity=BACKGROUND_OPACITY)
+        traces.append(go.Scattergl(x=x, y=y, mode='lines+markers', name=name,
+                                   hovertemplate=hovertemplate, **style))
+    return traces